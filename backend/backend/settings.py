@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 import os  # <-- Make sure this is imported
+import tempfile
 from dotenv import load_dotenv
 import dj_database_url
 
@@ -175,6 +176,11 @@ USE_TZ = True
 STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Resumable chunked uploads (see sme.uploads)
+UPLOAD_TEMP_DIR = os.getenv('UPLOAD_TEMP_DIR', os.path.join(tempfile.gettempdir(), 'pulsefi-uploads'))
+UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+UPLOAD_MAX_SIZES = {'video': 200 * 1024 * 1024, 'cac': 10 * 1024 * 1024}
+UPLOAD_SESSION_TTL = 24 * 60 * 60  # Seconds an unfinished upload can be resumed
 
 
 # --- ADD THIS SECTION for Production Static Files ---
@@ -223,15 +229,75 @@ SIMPLE_JWT = {
 
 # AI Configuration
 GOOGLE_AI_API_KEY = os.getenv('GOOGLE_AI_API_KEY')
+# 'gemini', 'record' (gemini + save responses) or 'replay' (offline; see core.providers)
+AI_PROVIDER = os.getenv('AI_PROVIDER', 'gemini')
+AI_REPLAY_DIR = os.getenv('AI_REPLAY_DIR', str(BASE_DIR / 'fixtures' / 'ai_replay'))
+AI_REPLAY_LATENCY_MS = float(os.getenv('AI_REPLAY_LATENCY_MS', 0))
+AI_REPLAY_LATENCY_JITTER_MS = float(os.getenv('AI_REPLAY_LATENCY_JITTER_MS', 0))
+AI_REPLAY_ERROR_RATE = float(os.getenv('AI_REPLAY_ERROR_RATE', 0))
+AI_REPLAY_ERROR_CODE = int(os.getenv('AI_REPLAY_ERROR_CODE', 503))
+AI_REPLAY_SEED = os.getenv('AI_REPLAY_SEED')
+# Shared Gemini HTTP pool (see core.clients)
+GEMINI_MAX_CONNECTIONS = 20
+GEMINI_MAX_KEEPALIVE_CONNECTIONS = 10
+GEMINI_KEEPALIVE_EXPIRY = 120
+# Gemini project quota, enforced client-side by bulk jobs (see core.ratelimit)
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv('GEMINI_REQUESTS_PER_MINUTE', 1000))
+GEMINI_TOKENS_PER_MINUTE = int(os.getenv('GEMINI_TOKENS_PER_MINUTE', 1000000))
+# Shared by every process on the host; leave empty for per-process buckets
+GEMINI_RATE_LIMIT_FILE = os.getenv('GEMINI_RATE_LIMIT_FILE', os.path.join(tempfile.gettempdir(), 'pulsefi-gemini-quota.json'))
+# After this many consecutive throttling/5xx errors, stop calling Gemini for GEMINI_BREAKER_RESET_TIMEOUT seconds
+GEMINI_BREAKER_FAILURE_THRESHOLD = 5
+GEMINI_BREAKER_RESET_TIMEOUT = 30
+# Verifications deferred by the breaker are retried after this many seconds
+PULSE_DEFERRED_RETRY_DELAY = 300
+# Verification progress stream (SSE, see core.events)
+VERIFICATION_EVENTS_POLL_INTERVAL = 0.5
+VERIFICATION_EVENTS_HEARTBEAT = 15
+VERIFICATION_EVENTS_MAX_DURATION = 600
+# Gemini Files API: seconds to wait for an uploaded video to become ACTIVE
+GEMINI_FILE_PROCESSING_TIMEOUT = float(os.getenv('GEMINI_FILE_PROCESSING_TIMEOUT', 300))
+GEMINI_FILE_POLL_INITIAL_DELAY = 1.0
+GEMINI_FILE_POLL_MAX_DELAY = 10.0
+# PulseEngine runs the CAC and video checks concurrently, each with its own deadline (seconds)
+PULSE_CHECK_WORKERS = int(os.getenv('PULSE_CHECK_WORKERS', 8))
+PULSE_CHECK_TIMEOUTS = {'cac': 60, 'video': 300}
+# CAC preprocessing before OCR (see core.preprocessing)
+CAC_PREPROCESS_ENABLED = os.getenv('CAC_PREPROCESS_ENABLED', 'True') == 'True'
+CAC_PREPROCESS_WORKERS = int(os.getenv('CAC_PREPROCESS_WORKERS', 2))
+CAC_PREPROCESS_MAX_SIDE = 1600
+CAC_PREPROCESS_JPEG_QUALITY = 70
+# Send scene-change keyframes inline instead of uploading the whole video (needs ffmpeg)
+VIDEO_KEYFRAME_MODE = os.getenv('VIDEO_KEYFRAME_MODE', 'False') == 'True'
+VIDEO_KEYFRAME_COUNT = int(os.getenv('VIDEO_KEYFRAME_COUNT', 6))
+VIDEO_KEYFRAME_SCENE_THRESHOLD = 0.3
+VIDEO_KEYFRAME_MAX_SIDE = 640
+# Cached CAC/video extraction results (see core.cache)
+AI_CACHE_TTL_DAYS = int(os.getenv('AI_CACHE_TTL_DAYS', 30))
+AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', 50000))
 
 # Mono Configuration
 MONO_SECRET_KEY = os.getenv('MONO_SECRET_KEY')
-MONO_BASE_URL = 'https://api.withmono.com'
+# Point at `manage.py runsimulators` to run without Mono (see core.simulators)
+MONO_BASE_URL = os.getenv('MONO_BASE_URL', 'https://api.withmono.com')
+# Transaction sync (see core.mono): pooled client, and how much history is kept
+MONO_TIMEOUT = 15
+MONO_MAX_CONNECTIONS = 10
+MONO_SYNC_MONTHS = 12
+MONO_MAX_PAGES = 500
+# Stored BankTransaction rows: insert batch size, and how long they are kept (`manage.py prune_transactions`)
+BANK_TRANSACTION_BATCH_SIZE = 500
+BANK_TRANSACTION_RETENTION_DAYS = int(os.getenv('BANK_TRANSACTION_RETENTION_DAYS', 730))
+# Estimated input tokens of the profit prompt; transactions are summarised to fit (see core.compaction)
+PROFIT_PROMPT_TOKEN_BUDGET = int(os.getenv('PROFIT_PROMPT_TOKEN_BUDGET', 8000))
+# Profit Scores older than this are re-scored by `manage.py refresh_profit_scores` (run hourly)
+PROFIT_SCORE_TTL_HOURS = int(os.getenv('PROFIT_SCORE_TTL_HOURS', 24))
 
 # Paystack Configuration
 PAYSTACK_SECRET_KEY = os.getenv('PAYSTACK_SECRET_KEY', 'sk_test_...')
 PAYSTACK_PUBLIC_KEY = os.getenv('PAYSTACK_PUBLIC_KEY', 'pk_test_...')
 PAYSTACK_CALLBACK_URL = os.getenv('PAYSTACK_CALLBACK_URL', 'https://yourdomain.com/api/escrow/webhook/')
+PAYSTACK_BASE_URL = os.getenv('PAYSTACK_BASE_URL', 'https://api.paystack.co')
 
 
 # --- ADDED THIS SECTION ---
@@ -0,0 +1,106 @@
+"""
+Circuit breaker for Gemini.
+
+When Gemini throttles us or has an outage, every in-flight verification
+used to fail and the SME was penalised as if their documents were bad.
+After a run of upstream failures the breaker opens and calls fail fast
+with `UpstreamUnavailable`. The PulseEngine treats that as "deferred"
+rather than failed. After `reset_timeout` a single trial call is let
+through, and its outcome decides whether the breaker closes again.
+"""
+import threading
+import time
+
+import httpx
+from django.conf import settings
+from google.genai import errors as genai_errors
+
+
+class UpstreamUnavailable(Exception):
+    """Gemini is throttling or unhealthy; the work should be retried later, not scored."""
+
+
+def is_upstream_failure(exc) -> bool:
+    """True for errors that say nothing about the SME's data: throttling, 5xx, network."""
+    if isinstance(exc, UpstreamUnavailable):
+        return True
+    if isinstance(exc, genai_errors.APIError):
+        return exc.code == 429 or (exc.code or 0) >= 500
+    return isinstance(exc, (httpx.TransportError, TimeoutError, ConnectionError))
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raises UpstreamUnavailable if calls should not go out right now."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    raise UpstreamUnavailable("Gemini circuit breaker is open")
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    raise UpstreamUnavailable("Gemini circuit breaker is waiting on a trial call")
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+    def release(self):
+        """Ends a trial call whose error was the caller's fault, not Gemini's."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+
+    def call(self, func, *args, **kwargs):
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if is_upstream_failure(e):
+                self.record_failure()
+                raise UpstreamUnavailable(str(e)) from e
+            self.release()
+            raise
+        self.record_success()
+        return result
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Process-wide breaker shared by every Gemini call."""
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker(
+                failure_threshold=getattr(settings, 'GEMINI_BREAKER_FAILURE_THRESHOLD', 5),
+                reset_timeout=getattr(settings, 'GEMINI_BREAKER_RESET_TIMEOUT', 30),
+            )
+        return _breaker
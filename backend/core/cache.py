@@ -0,0 +1,115 @@
+"""
+Content-addressed cache of AI extraction results.
+
+Entries are keyed by the SHA-256 of the file bytes plus the prompt and
+model version, so re-verifying an unchanged CAC document or video costs
+no model calls. Entries expire after a TTL and the least recently used
+ones are evicted once the table grows past `max_entries`.
+"""
+import hashlib
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AIResultCache
+from .storage import ContentAddressedStorage, digest_from_name
+
+logger = logging.getLogger(__name__)
+
+# Fraction of writes that also run eviction, so the table is trimmed
+# without a separate cron job.
+EVICTION_SAMPLE_RATE = 0.05
+
+
+def file_sha256(field_file, chunk_size=1024 * 1024) -> str:
+    """Hashes a FieldFile without loading it into memory (free for content-addressed files)."""
+    stored_digest = digest_from_name(field_file.name) if isinstance(field_file.storage, ContentAddressedStorage) else None
+    if stored_digest:
+        return stored_digest
+    digest = hashlib.sha256()
+    field_file.open(mode='rb')
+    try:
+        for chunk in field_file.chunks(chunk_size):
+            digest.update(chunk)
+    finally:
+        field_file.close()
+    return digest.hexdigest()
+
+
+def prompt_fingerprint(version: str, prompt: str) -> str:
+    """Prompt version for prompts that embed per-profile values."""
+    return f"{version}:{hashlib.sha256(prompt.encode()).hexdigest()[:16]}"
+
+
+class ExtractionCache:
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = ttl or timedelta(days=getattr(settings, 'AI_CACHE_TTL_DAYS', 30))
+        self.max_entries = max_entries or getattr(settings, 'AI_CACHE_MAX_ENTRIES', 50000)
+
+    @staticmethod
+    def make_key(kind, content_hash, prompt_version, model) -> str:
+        raw = f"{kind}|{content_hash}|{prompt_version}|{model}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, kind, content_hash, prompt_version, model) -> dict | None:
+        key = self.make_key(kind, content_hash, prompt_version, model)
+        entry = AIResultCache.objects.filter(key=key).first()
+        if entry is None:
+            return None
+        if entry.created_at < timezone.now() - self.ttl:
+            entry.delete()
+            return None
+
+        AIResultCache.objects.filter(pk=entry.pk).update(
+            hit_count=F('hit_count') + 1,
+            last_accessed_at=timezone.now()
+        )
+        return entry.result
+
+    def put(self, kind, content_hash, prompt_version, model, result, raw_response=''):
+        key = self.make_key(kind, content_hash, prompt_version, model)
+        entry, _ = AIResultCache.objects.update_or_create(
+            key=key,
+            defaults={
+                'kind': kind,
+                'content_hash': content_hash,
+                'prompt_version': prompt_version,
+                'model': model,
+                'result': result,
+                'raw_response': raw_response or '',
+                'last_accessed_at': timezone.now(),
+            }
+        )
+        if random.random() < EVICTION_SAMPLE_RATE:
+            self.evict()
+        return entry
+
+    def invalidate(self, content_hash=None, kind=None) -> int:
+        """Drops cached results for a file hash and/or kind (everything if neither is given)."""
+        entries = AIResultCache.objects.all()
+        if content_hash:
+            entries = entries.filter(content_hash=content_hash)
+        if kind:
+            entries = entries.filter(kind=kind)
+        deleted, _ = entries.delete()
+        return deleted
+
+    def evict(self) -> int:
+        """Removes expired entries, then the least recently used beyond `max_entries`."""
+        deleted, _ = AIResultCache.objects.filter(created_at__lt=timezone.now() - self.ttl).delete()
+
+        overflow = AIResultCache.objects.count() - self.max_entries
+        if overflow > 0:
+            stale_ids = list(
+                AIResultCache.objects.order_by('last_accessed_at').values_list('id', flat=True)[:overflow]
+            )
+            lru_deleted, _ = AIResultCache.objects.filter(id__in=stale_ids).delete()
+            deleted += lru_deleted
+
+        if deleted:
+            logger.info(f"Evicted {deleted} AI cache entries")
+        return deleted
@@ -0,0 +1,143 @@
+"""
+Deterministic cash-flow features for the ProfitEngine.
+
+Computed with NumPy over the transaction arrays instead of asking Gemini
+to eyeball raw JSON lines: monthly inflow/outflow, net cash flow, revenue
+consistency (coefficient of variation), growth slope, reliance on the
+largest payer, and days that ended overdrawn. The features go into the
+profit prompt, and `fallback_score` turns them into a Profit Score when
+the model call fails.
+"""
+import re
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+
+import numpy as np
+
+# Narration words that describe the channel rather than the counterparty
+_CHANNEL_WORDS = {
+    'TRF', 'TRANSFER', 'FROM', 'TO', 'NIP', 'POS', 'WEB', 'MOB', 'USSD', 'FT', 'INWARD', 'OUTWARD',
+    'CREDIT', 'DEBIT', 'CR', 'DR', 'PAYMENT', 'PMT', 'REF', 'VIA', 'FIP', 'NIBSS', 'BO', 'FOR',
+}
+_NON_LETTERS = re.compile(r'[^A-Z ]+')
+_UNIX_EPOCH_ORDINAL = 719163  # date(1970, 1, 1).toordinal()
+
+
+@lru_cache(maxsize=65536)  # Narrations repeat a lot (same payers, same channels)
+def counterparty_key(narration) -> str:
+    """'NIP TRF FROM ADEBAYO STORES/0012345' -> 'ADEBAYO STORES'"""
+    words = [
+        word for word in _NON_LETTERS.sub(' ', (narration or '').upper()).split()
+        if word not in _CHANNEL_WORDS and len(word) > 1
+    ]
+    return ' '.join(words[:3]) or 'UNKNOWN'
+
+
+@dataclass
+class CashFlowFeatures:
+    months: list              # 'YYYY-MM' labels, oldest first
+    monthly_inflow: list      # Naira per month
+    monthly_outflow: list
+    total_inflow: float
+    total_outflow: float
+    net_cash_flow: float
+    revenue_cv: float | None  # Std / mean of monthly inflow; lower is steadier
+    inflow_slope: float       # Naira per month, least-squares trend of monthly inflow
+    growth_rate: float        # inflow_slope as a share of the mean monthly inflow
+    top_counterparty: str | None
+    top_counterparty_share: float  # Share of inflow from the largest payer
+    overdraft_days: int       # Days whose closing balance was negative
+    transaction_count: int
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+    def fallback_score(self, risk_score=0) -> int:
+        """
+        Profit Score (0-100) from the features alone: cash flow 30, revenue
+        consistency 25, growth 15, payer concentration 15, overdrafts 15.
+        A narration risk sub-score (core.narrations) takes off up to 30.
+        """
+        if self.total_inflow <= 0:
+            return 0
+        margin = self.net_cash_flow / self.total_inflow
+        cv = self.revenue_cv if self.revenue_cv is not None else 1.0
+        score = (
+            30 * np.clip(0.5 + 2 * margin, 0, 1)
+            + 25 * np.clip(1 - cv, 0, 1)
+            + 15 * np.clip(0.5 + 5 * self.growth_rate, 0, 1)
+            + 15 * np.clip(1 - self.top_counterparty_share, 0, 1)
+            + 15 * np.clip(1 - self.overdraft_days / 30, 0, 1)
+            - 0.3 * risk_score
+        )
+        return int(round(float(np.clip(score, 0, 100))))
+
+
+def extract_features(transactions) -> CashFlowFeatures:
+    """
+    `transactions`: dicts with `date` (datetime/date), `type` ('credit'/'debit'),
+    `amount` (kobo), and optionally `balance` (kobo) and `narration`, oldest first.
+    """
+    rows = list(transactions)
+    n = len(rows)
+    days = (
+        np.array([row['date'].toordinal() for row in rows], dtype=np.int64) - _UNIX_EPOCH_ORDINAL
+    ).astype('datetime64[D]')
+    amounts = np.array([row['amount'] or 0 for row in rows], dtype=np.float64) / 100.0
+    is_credit = np.array([row['type'] != 'debit' for row in rows], dtype=bool)
+    balances = np.array(
+        [np.nan if row.get('balance') is None else row['balance'] for row in rows], dtype=np.float64
+    ) / 100.0
+
+    if n == 0:
+        return CashFlowFeatures([], [], [], 0.0, 0.0, 0.0, None, 0.0, 0.0, None, 0.0, 0, 0)
+
+    # Monthly series, zero-filled between the first and last month
+    months = days.astype('datetime64[M]')
+    first_month = months.min()
+    month_index = (months - first_month).astype(np.int64)
+    span = int(month_index.max()) + 1
+    inflow = np.bincount(month_index, weights=np.where(is_credit, amounts, 0.0), minlength=span)
+    outflow = np.bincount(month_index, weights=np.where(is_credit, 0.0, amounts), minlength=span)
+
+    mean_inflow = inflow.mean()
+    revenue_cv = float(inflow.std() / mean_inflow) if mean_inflow > 0 else None
+    slope = float(np.polyfit(np.arange(span), inflow, 1)[0]) if span >= 2 else 0.0
+    growth_rate = slope / mean_inflow if mean_inflow > 0 else 0.0
+
+    # Largest payer by total credits
+    top_counterparty, top_share = None, 0.0
+    if is_credit.any():
+        credit_rows = np.flatnonzero(is_credit)
+        keys = np.array([counterparty_key(rows[i].get('narration')) for i in credit_rows])
+        names, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse, weights=amounts[credit_rows])
+        if totals.sum() > 0:
+            top = int(totals.argmax())
+            top_counterparty, top_share = str(names[top]), float(totals[top] / totals.sum())
+
+    # Closing balance of each day = balance after its last transaction
+    overdraft_days = 0
+    known = ~np.isnan(balances)
+    if known.any():
+        day_known, balance_known = days[known], balances[known]
+        _, last_from_end = np.unique(day_known[::-1], return_index=True)
+        closing = balance_known[len(balance_known) - 1 - last_from_end]
+        overdraft_days = int((closing < 0).sum())
+
+    labels = np.arange(first_month, first_month + span).astype(str)
+    return CashFlowFeatures(
+        months=labels.tolist(),
+        monthly_inflow=np.round(inflow, 2).tolist(),
+        monthly_outflow=np.round(outflow, 2).tolist(),
+        total_inflow=round(float(inflow.sum()), 2),
+        total_outflow=round(float(outflow.sum()), 2),
+        net_cash_flow=round(float(inflow.sum() - outflow.sum()), 2),
+        revenue_cv=round(revenue_cv, 4) if revenue_cv is not None else None,
+        inflow_slope=round(slope, 2),
+        growth_rate=round(float(growth_rate), 4),
+        top_counterparty=top_counterparty,
+        top_counterparty_share=round(top_share, 4),
+        overdraft_days=overdraft_days,
+        transaction_count=n,
+    )
@@ -0,0 +1,124 @@
+"""
+Process-wide Gemini client registry.
+
+Building a `genai.Client` sets up a fresh httpx pool, so every engine
+instance used to pay DNS + TLS setup again. Clients here are created on
+first use, shared by every PulseEngine/ProfitEngine in the process and
+keep their HTTP connections alive between calls. The registry is reset
+in forked children (gunicorn --preload) so workers never share sockets.
+"""
+import os
+import threading
+import weakref
+
+import google.genai as genai
+import httpx
+from django.conf import settings
+
+
+class CountingTransport(httpx.HTTPTransport):
+    """httpx transport that records how often pooled connections are reused."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._seen = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+
+    def handle_request(self, request):
+        response = super().handle_request(request)
+        with self._lock:
+            self.requests += 1
+            for conn in list(self._pool.connections):
+                if conn not in self._seen:
+                    self._seen.add(conn)
+                    self.connections_opened += 1
+        return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            reused = max(0, self.requests - self.connections_opened)
+            return {
+                "requests": self.requests,
+                "connectionsOpened": self.connections_opened,
+                "reusedRequests": reused,
+                "reuseRatio": round(reused / self.requests, 3) if self.requests else 0.0,
+            }
+
+
+_clients = {}      # api_key -> (genai.Client, CountingTransport)
+_orphaned = []     # Inherited from the parent process; never closed in the child
+_owner_pid = os.getpid()
+_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    global _owner_pid, _lock
+    # Closing inherited clients would tear down sockets the parent still uses
+    _orphaned.extend(_clients.values())
+    _clients.clear()
+    _lock = threading.Lock()
+    _owner_pid = os.getpid()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _build_client(api_key):
+    transport = CountingTransport(
+        limits=httpx.Limits(
+            max_connections=getattr(settings, 'GEMINI_MAX_CONNECTIONS', 20),
+            max_keepalive_connections=getattr(settings, 'GEMINI_MAX_KEEPALIVE_CONNECTIONS', 10),
+            keepalive_expiry=getattr(settings, 'GEMINI_KEEPALIVE_EXPIRY', 120),
+        ),
+        retries=1,
+    )
+    client = genai.Client(
+        api_key=api_key,
+        http_options=genai.types.HttpOptions(client_args={'transport': transport}),
+    )
+    return client, transport
+
+
+def get_genai_client(api_key=None) -> genai.Client:
+    """Returns the shared Gemini client for this process, creating it on first use."""
+    api_key = api_key or settings.GOOGLE_AI_API_KEY
+    if os.getpid() != _owner_pid:
+        _reset_after_fork()
+    with _lock:
+        if api_key not in _clients:
+            _clients[api_key] = _build_client(api_key)
+        return _clients[api_key][0]
+
+
+def connection_stats() -> dict:
+    """Connection-reuse stats for every client created in this process."""
+    with _lock:
+        totals = {"clients": len(_clients), "requests": 0, "connectionsOpened": 0, "reusedRequests": 0}
+        for _, transport in _clients.values():
+            stats = transport.stats()
+            for key in ("requests", "connectionsOpened", "reusedRequests"):
+                totals[key] += stats[key]
+    totals["reuseRatio"] = round(totals["reusedRequests"] / totals["requests"], 3) if totals["requests"] else 0.0
+    return totals
+
+
+class PooledClientMixin:
+    """
+    Gives an engine a lazily fetched, process-wide AI client as
+    `self.client`: the configured provider (see core.providers) behind the
+    shared quota limiter and circuit breaker.
+    """
+    _client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from .providers import get_ai_client  # providers builds on this module
+            self._client = get_ai_client()
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
@@ -0,0 +1,191 @@
+"""
+Token-budgeted transaction summaries for the profit prompt.
+
+A busy SME has tens of thousands of transactions a year; one JSON line
+each overflows the context window and makes every call slow and
+expensive. `compact_transactions` builds, in priority order:
+
+  1. daily totals (weekly when there are too many days)
+  2. the largest counterparties by money in and out
+  3. transactions whose narration looks risky (betting, payday loans;
+     see core.narrations)
+  4. an evenly spaced sample of the remaining rows
+
+Each section is cut off line by line at the token budget, so the result
+always fits; the sample is sized up front so it stays evenly spread.
+Tokens are estimated like the quota limiter does (core.ratelimit).
+"""
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from .cashflow import _UNIX_EPOCH_ORDINAL, counterparty_key
+from .narrations import classify_narration
+from .ratelimit import CHARS_PER_TOKEN
+
+# Above this many active days, totals are weekly
+MAX_DAILY_ROWS = 120
+TOP_COUNTERPARTIES = 10
+NARRATION_CHARS = 60
+
+
+class PromptBudgetExceeded(ValueError):
+    """The fixed part of a prompt alone is over its token budget."""
+
+
+def estimate_text_tokens(text) -> int:
+    """Upper estimate of the tokens in `text` (matches core.ratelimit.estimate_tokens)."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+@dataclass
+class CompactedTransactions:
+    text: str
+    tokens: int           # Estimated tokens of `text`
+    raw_tokens: int       # Estimated tokens of every row written out in full
+    row_count: int
+    aggregate_period: str  # 'day' or 'week'
+    flagged_rows: int
+    sampled_rows: int     # Raw rows included besides flagged ones
+
+    @property
+    def compression_ratio(self) -> float:
+        return round(self.raw_tokens / self.tokens, 1) if self.tokens else 0.0
+
+
+def _format_row(row) -> str:
+    narration = ' '.join((row.get('narration') or '').split())[:NARRATION_CHARS]
+    sign = 'C' if row['type'] != 'debit' else 'D'
+    return f"{row['date']:%Y-%m-%d},{sign},{(row['amount'] or 0) / 100:.2f},{narration}"
+
+
+class _Budget:
+    def __init__(self, tokens):
+        self.remaining = tokens
+        self.lines = []
+
+    def add(self, line) -> bool:
+        cost = estimate_text_tokens(line + '\n')
+        if cost > self.remaining:
+            return False
+        self.remaining -= cost
+        self.lines.append(line)
+        return True
+
+    def add_section(self, title, lines) -> int:
+        """Adds a title and as many lines as fit; returns how many lines made it."""
+        if not lines or not self.add(f"## {title}"):
+            return 0
+        added = 0
+        for line in lines:
+            if not self.add(line):
+                break
+            added += 1
+        return added
+
+
+def _even_sample(indices, count) -> list:
+    if not count:
+        return []
+    return [indices[int(i)] for i in np.unique(np.linspace(0, len(indices) - 1, count).astype(np.int64))]
+
+
+def _section_tokens(title, lines) -> int:
+    return sum(estimate_text_tokens(line + '\n') for line in [f"## {title}", *lines])
+
+
+def _period_totals(days, amounts, is_credit):
+    active_days = np.unique(days)
+    if len(active_days) <= MAX_DAILY_ROWS:
+        period, starts = 'day', days
+    else:
+        # 1970-01-01 was a Thursday; shift so weeks start on Monday
+        period, starts = 'week', days - ((days.astype(np.int64) + 3) % 7)
+    labels, index = np.unique(starts, return_inverse=True)
+    credits = np.bincount(index, weights=np.where(is_credit, amounts, 0.0), minlength=len(labels))
+    debits = np.bincount(index, weights=np.where(is_credit, 0.0, amounts), minlength=len(labels))
+    counts = np.bincount(index, minlength=len(labels))
+    lines = [
+        f"{label},{credit:.2f},{debit:.2f},{count}"
+        for label, credit, debit, count in zip(labels.astype(str), credits, debits, counts)
+    ]
+    return period, lines
+
+
+def _counterparty_lines(rows, amounts, is_credit):
+    lines = []
+    for direction, mask in (('in', is_credit), ('out', ~is_credit)):
+        selected = np.flatnonzero(mask)
+        if not len(selected):
+            continue
+        keys = np.array([counterparty_key(rows[i].get('narration')) for i in selected])
+        names, index = np.unique(keys, return_inverse=True)
+        totals = np.bincount(index, weights=amounts[selected])
+        counts = np.bincount(index)
+        for top in np.argsort(totals)[::-1][:TOP_COUNTERPARTIES]:
+            lines.append(f"{direction},{names[top]},{totals[top]:.2f},{counts[top]}")
+    return lines
+
+
+def compact_transactions(transactions, budget_tokens) -> CompactedTransactions:
+    """
+    Summarises transactions (dicts with `date`, `type`, `amount` in kobo and
+    `narration`, oldest first) in at most `budget_tokens` estimated tokens.
+    """
+    rows = list(transactions)
+    formatted = [_format_row(row) for row in rows]
+    raw_tokens = estimate_text_tokens('\n'.join(formatted))
+    budget = _Budget(budget_tokens)
+    if not rows:
+        return CompactedTransactions('', 0, 0, 0, 'day', 0, 0)
+
+    days = (
+        np.array([row['date'].toordinal() for row in rows], dtype=np.int64) - _UNIX_EPOCH_ORDINAL
+    ).astype('datetime64[D]')
+    amounts = np.array([row['amount'] or 0 for row in rows], dtype=np.float64) / 100.0
+    is_credit = np.array([row['type'] != 'debit' for row in rows], dtype=bool)
+
+    period, totals = _period_totals(days, amounts, is_credit)
+    budget.add_section(f"{period.capitalize()} totals ({period} starting,credits,debits,count)", totals)
+    budget.add_section("Top counterparties (direction,name,total,count)", _counterparty_lines(rows, amounts, is_credit))
+
+    labels = [
+        row['risk_category'] if row.get('risk_category') is not None else classify_narration(row.get('narration'))
+        for row in rows
+    ]
+    flagged = [i for i, label in enumerate(labels) if label]
+    flagged_added = budget.add_section(
+        "Risk-flagged transactions (date,C/D,amount,narration,category)",
+        [f"{formatted[i]},{labels[i]}" for i in flagged]
+    )
+
+    # Fill what is left with rows spread evenly over the period
+    flagged_set = set(flagged)
+    others = [i for i in range(len(rows)) if i not in flagged_set]
+    sampled = 0
+    if others and budget.remaining > 0:
+        average = max(1, math.ceil(sum(estimate_text_tokens(formatted[i] + '\n') for i in others) / len(others)))
+        count = min(len(others), budget.remaining // average)
+        # Shrink the sample until all of it fits, rather than cutting off its newest rows
+        while count:
+            picks = _even_sample(others, count)
+            title = "All other transactions" if len(picks) == len(others) else f"Sample of {len(picks)} of {len(others)} other transactions"
+            title = f"{title} (date,C/D,amount,narration)"
+            lines = [formatted[i] for i in picks]
+            cost = _section_tokens(title, lines)
+            if cost <= budget.remaining:
+                sampled = budget.add_section(title, lines)
+                break
+            count = min(count - 1, count * budget.remaining // cost)
+
+    text = '\n'.join(budget.lines)
+    return CompactedTransactions(
+        text=text,
+        tokens=estimate_text_tokens(text),
+        raw_tokens=raw_tokens,
+        row_count=len(rows),
+        aggregate_period=period,
+        flagged_rows=flagged_added,
+        sampled_rows=sampled,
+    )
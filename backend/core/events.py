@@ -0,0 +1,101 @@
+"""
+Verification progress events.
+
+The PulseEngine reports each stage through an `on_event(stage, status, data)`
+callback. The verification job stores them as VerificationEvent rows,
+and `stream_job_events` turns those rows into a Server-Sent Events
+stream. Workers and web processes only share the database, so the stream
+polls it, using the (job, seq) index.
+"""
+import asyncio
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.db.models import Max
+
+from .models import Job, VerificationEvent
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = (Job.Status.SUCCEEDED, Job.Status.FAILED)
+
+
+class EventRecorder:
+    """`on_event` callback that stores a job's events, continuing its sequence across retries."""
+    def __init__(self, job: Job):
+        self.job = job
+        self.seq = VerificationEvent.objects.filter(job=job).aggregate(last=Max('seq'))['last'] or 0
+
+    def __call__(self, stage, status, data=None):
+        self.seq += 1
+        return VerificationEvent.objects.create(
+            job=self.job,
+            seq=self.seq,
+            stage=stage,
+            status=status,
+            data=data or {}
+        )
+
+
+def format_sse(event_id=None, event=None, data=None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data if data is not None else {})}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _format_event(event: VerificationEvent) -> str:
+    return format_sse(event.seq, event.stage, {
+        "stage": event.stage,
+        "status": event.status,
+        "data": event.data,
+        "at": event.created_at.isoformat(),
+    })
+
+
+async def _events_after(job_id, last_seq):
+    return [
+        event async for event in
+        VerificationEvent.objects.filter(job_id=job_id, seq__gt=last_seq).order_by('seq')
+    ]
+
+
+async def stream_job_events(job_id, last_seq=0, poll_interval=None, heartbeat=None, max_duration=None):
+    """
+    Yields SSE frames for a job's events after `last_seq` (the client's
+    Last-Event-ID), then an `end` frame once the job has finished.
+    """
+    poll_interval = poll_interval or getattr(settings, 'VERIFICATION_EVENTS_POLL_INTERVAL', 0.5)
+    heartbeat = heartbeat or getattr(settings, 'VERIFICATION_EVENTS_HEARTBEAT', 15)
+    max_duration = max_duration or getattr(settings, 'VERIFICATION_EVENTS_MAX_DURATION', 600)
+
+    started = last_sent = time.monotonic()
+    yield "retry: 3000\n\n"
+    while True:
+        # Read the status first: events written before it turned terminal are then fetched below
+        job = await Job.objects.filter(pk=job_id).values('status', 'error').afirst()
+        for event in await _events_after(job_id, last_seq):
+            last_seq = event.seq
+            last_sent = time.monotonic()
+            yield _format_event(event)
+
+        if job is None or job['status'] in TERMINAL_STATUSES:
+            yield format_sse(event='end', data={
+                "status": job['status'] if job else None,
+                "error": (job['error'] or None) if job else "Job no longer exists",
+            })
+            return
+
+        now = time.monotonic()
+        if now - started >= max_duration:
+            # Clients reconnect with Last-Event-ID and pick up where they left off
+            return
+        if now - last_sent >= heartbeat:
+            last_sent = now
+            yield ": keep-alive\n\n"
+        await asyncio.sleep(poll_interval)
@@ -0,0 +1,153 @@
+"""
+Monthly net cash-flow forecasts for the lender marketplace.
+
+A robust linear trend is fitted to each SME's complete months of net
+cash flow with Theil-Sen (the median of the slopes between every pair of
+months), so one unusual month barely moves it. Residual spread is the
+scaled median absolute deviation. Forecasts for the next 3 and 6 months
+come with approximate 90% bands that widen with the horizon. Holt-Winters
+would need two full seasons, and the sync window keeps 12 months.
+
+`manage.py forecast_cash_flows` runs this nightly over the stored
+BankTransaction rows and saves one CashFlowForecast per profile; the
+marketplace only reads the saved rows.
+"""
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+from .models import BankTransaction
+from .mono import window_start
+
+MIN_MONTHS = 3
+HORIZON = 6
+Z_90 = 1.645
+MAD_TO_SIGMA = 1.4826
+
+
+@dataclass
+class TrendFit:
+    slope: float
+    intercept: float
+    sigma: float   # Residual standard deviation (robust)
+    n: int
+
+    def predict(self, x):
+        return self.intercept + self.slope * np.asarray(x, dtype=np.float64)
+
+    def band(self, x) -> float:
+        """Half-width of the ~90% interval for the sum of predictions at `x`."""
+        x = np.asarray(x, dtype=np.float64)
+        observed = np.arange(self.n)
+        spread = ((observed - observed.mean()) ** 2).sum()
+        variance = (1 + 1 / self.n + (x - observed.mean()) ** 2 / spread).sum()
+        return float(Z_90 * self.sigma * np.sqrt(variance))
+
+
+def theil_sen(values) -> TrendFit:
+    y = np.asarray(values, dtype=np.float64)
+    n = len(y)
+    x = np.arange(n)
+    i, j = np.triu_indices(n, 1)
+    slope = float(np.median((y[j] - y[i]) / (j - i))) if n > 1 else 0.0
+    intercept = float(np.median(y - slope * x))
+    residuals = y - (intercept + slope * x)
+    sigma = MAD_TO_SIGMA * float(np.median(np.abs(residuals - np.median(residuals))))
+    if sigma == 0:
+        sigma = float(residuals.std())
+    return TrendFit(slope, intercept, sigma, n)
+
+
+@dataclass
+class CashFlowForecastResult:
+    months: list           # Complete months observed, 'YYYY-MM'
+    monthly_net: list      # Naira per observed month
+    monthly_forecast: list  # Naira per month for the next HORIZON months
+    net_3m: float
+    lower_3m: float
+    upper_3m: float
+    net_6m: float
+    lower_6m: float
+    upper_6m: float
+    growth_rate: float     # Inflow trend per month as a share of mean monthly inflow
+    cash_flow_status: str  # 'positive', 'negative' or 'mixed' over the next 3 months
+
+
+def forecast_cash_flow(months, inflow, outflow) -> CashFlowForecastResult | None:
+    """Forecast from complete monthly totals (Naira), oldest first; None with under MIN_MONTHS."""
+    inflow = np.asarray(inflow, dtype=np.float64)
+    outflow = np.asarray(outflow, dtype=np.float64)
+    if len(inflow) < MIN_MONTHS:
+        return None
+    net = inflow - outflow
+    fit = theil_sen(net)
+    n = len(net)
+    ahead = np.arange(n, n + HORIZON)
+    predicted = fit.predict(ahead)
+
+    net_3m, band_3m = float(predicted[:3].sum()), fit.band(ahead[:3])
+    net_6m, band_6m = float(predicted.sum()), fit.band(ahead)
+    mean_inflow = inflow.mean()
+    growth_rate = theil_sen(inflow).slope / mean_inflow if mean_inflow > 0 else 0.0
+    if net_3m - band_3m > 0:
+        status = 'positive'
+    elif net_3m + band_3m < 0:
+        status = 'negative'
+    else:
+        status = 'mixed'
+
+    return CashFlowForecastResult(
+        months=list(months),
+        monthly_net=np.round(net, 2).tolist(),
+        monthly_forecast=np.round(predicted, 2).tolist(),
+        net_3m=round(net_3m, 2),
+        lower_3m=round(net_3m - band_3m, 2),
+        upper_3m=round(net_3m + band_3m, 2),
+        net_6m=round(net_6m, 2),
+        lower_6m=round(net_6m - band_6m, 2),
+        upper_6m=round(net_6m + band_6m, 2),
+        growth_rate=round(float(growth_rate), 4),
+        cash_flow_status=status,
+    )
+
+
+def monthly_totals(account_ids, today=None, months=None) -> dict:
+    """
+    {account_id: (labels, inflow, outflow)} of complete months in the sync
+    window, zero-filled, from one grouped query over all the accounts.
+    The current month and the month the window starts in are partial,
+    so they are left out.
+    """
+    today = today or date.today()
+    start = window_start(months or getattr(settings, 'MONO_SYNC_MONTHS', 12))
+    first_month = np.datetime64(start.date(), 'M') + 1
+    last_month = np.datetime64(today, 'M') - 1
+
+    rows = (
+        BankTransaction.objects
+        .filter(account_id__in=account_ids, date__gte=start)
+        .annotate(month=TruncMonth('date'))
+        .values('account_id', 'month', 'type')
+        .annotate(total=Sum('amount'))
+    )
+    span = max(0, int((last_month - first_month).astype(np.int64)) + 1)
+    labels = np.arange(first_month, first_month + span).astype(str).tolist()
+    totals = {}
+    for row in rows:
+        index = int((np.datetime64(row['month'].date(), 'M') - first_month).astype(np.int64))
+        if not 0 <= index < span:
+            continue
+        inflow, outflow = totals.setdefault(row['account_id'], (np.zeros(span), np.zeros(span)))
+        (outflow if row['type'] == BankTransaction.Type.DEBIT else inflow)[index] += row['total'] / 100
+
+    result = {}
+    for account_id, (inflow, outflow) in totals.items():
+        # Start at the first month with any activity (newer businesses)
+        active = np.flatnonzero(inflow + outflow)
+        begin = int(active[0]) if len(active) else span
+        result[account_id] = (labels[begin:], inflow[begin:], outflow[begin:])
+    return result
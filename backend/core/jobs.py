@@ -0,0 +1,210 @@
+"""
+A small database-backed job queue.
+
+Jobs are rows in `core.Job`. Workers claim them with
+SELECT ... FOR UPDATE SKIP LOCKED on databases that support it (Postgres),
+and with an optimistic compare-and-swap UPDATE everywhere else (SQLite).
+"""
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.db import connection, transaction, close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# kind -> callable(job) returning a JSON-serialisable result
+HANDLERS = {}
+
+# Base delay before a failed job is retried (doubled on every attempt)
+RETRY_BASE_DELAY = timedelta(seconds=30)
+
+# Times a job may be deferred with RetryLater before it is failed
+# (24 at the default 5 minute delay is about two hours)
+MAX_DEFERRALS = 24
+
+# A running job whose worker has not finished it within this window is
+# assumed to belong to a dead worker and is put back on the queue.
+STALE_LOCK_TIMEOUT = timedelta(minutes=15)
+
+
+class RetryLater(Exception):
+    """
+    Raised by a handler that cannot make progress yet (e.g. an upstream API
+    is unavailable). The job is re-queued after `delay` without using up
+    one of its attempts, up to MAX_DEFERRALS times.
+    """
+    def __init__(self, message='', delay=timedelta(minutes=5)):
+        super().__init__(message)
+        self.delay = delay
+
+
+def register(kind):
+    """Decorator registering a handler for a job kind."""
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, payload=None, user=None, run_after=None, max_attempts=3) -> Job:
+    """Adds a job to the queue and returns it."""
+    return Job.objects.create(
+        kind=kind,
+        user=user,
+        payload=payload or {},
+        run_after=run_after or timezone.now(),
+        max_attempts=max_attempts,
+    )
+
+
+def worker_name(index=0) -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+def claim_next(worker_id: str) -> Job | None:
+    """
+    Atomically claims the oldest due job for `worker_id`.
+    Returns None if nothing is ready.
+    """
+    now = timezone.now()
+    ready = Job.objects.filter(
+        status=Job.Status.QUEUED,
+        run_after__lte=now
+    ).order_by('run_after', 'id')
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = ready.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            job.status = Job.Status.RUNNING
+            job.locked_by = worker_id
+            job.locked_at = now
+            job.attempts += 1
+            job.save(update_fields=['status', 'locked_by', 'locked_at', 'attempts', 'updated_at'])
+            return job
+
+    # Fallback (SQLite): whoever flips the status first owns the job
+    for job_id in ready.values_list('id', flat=True)[:10]:
+        claimed = Job.objects.filter(id=job_id, status=Job.Status.QUEUED).update(
+            status=Job.Status.RUNNING,
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+            updated_at=now,
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def run_job(job: Job) -> Job:
+    """Executes a claimed job and records the outcome."""
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'")
+        job.result = handler(job)
+        job.status = Job.Status.SUCCEEDED
+        job.error = ''
+        job.finished_at = timezone.now()
+    except RetryLater as e:
+        job.error = str(e)
+        job.attempts = max(0, job.attempts - 1)
+        job.deferrals += 1
+        if job.deferrals > MAX_DEFERRALS:
+            logger.error(f"Job {job.pk} ({job.kind}) failed after {MAX_DEFERRALS} deferrals: {e}")
+            job.error = f"Gave up after {MAX_DEFERRALS} deferrals: {e}"
+            job.status = Job.Status.FAILED
+            job.finished_at = timezone.now()
+        else:
+            logger.warning(f"Job {job.pk} ({job.kind}) deferred ({job.deferrals}/{MAX_DEFERRALS}): {e}")
+            job.status = Job.Status.QUEUED
+            job.run_after = timezone.now() + e.delay
+    except Exception as e:
+        logger.exception(f"Job {job.pk} ({job.kind}) failed on attempt {job.attempts}")
+        job.error = str(e)
+        if handler is not None and job.attempts < job.max_attempts:
+            job.status = Job.Status.QUEUED
+            job.run_after = timezone.now() + RETRY_BASE_DELAY * (2 ** (job.attempts - 1))
+        else:
+            job.status = Job.Status.FAILED
+            job.finished_at = timezone.now()
+
+    job.locked_by = ''
+    job.locked_at = None
+    job.save()
+    return job
+
+
+def run_next(worker_id: str) -> Job | None:
+    """Claims and runs a single job. Returns it, or None if the queue was empty."""
+    job = claim_next(worker_id)
+    if job is None:
+        return None
+    return run_job(job)
+
+
+def requeue_stale(timeout=STALE_LOCK_TIMEOUT) -> int:
+    """Releases jobs held by workers that died mid-run."""
+    cutoff = timezone.now() - timeout
+    return Job.objects.filter(
+        status=Job.Status.RUNNING,
+        locked_at__lt=cutoff
+    ).update(status=Job.Status.QUEUED, locked_by='', locked_at=None)
+
+
+class WorkerPool:
+    """
+    A fixed number of worker threads draining the queue.
+    Concurrency is capped at `size` jobs per process.
+    """
+    def __init__(self, size=2, poll_interval=1.0, burst=False):
+        self.size = size
+        self.poll_interval = poll_interval
+        self.burst = burst  # Exit once the queue is empty
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.processed = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        requeue_stale()
+        for index in range(self.size):
+            thread = threading.Thread(
+                target=self._work,
+                args=(worker_name(index),),
+                name=f"job-worker-{index}",
+                daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def join(self, timeout=None):
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def _work(self, worker_id):
+        try:
+            while not self.stop_event.is_set():
+                close_old_connections()
+                job = run_next(worker_id)
+                if job is not None:
+                    with self._lock:
+                        self.processed += 1
+                    continue
+                if self.burst:
+                    break
+                self.stop_event.wait(self.poll_interval)
+        finally:
+            connection.close()
@@ -0,0 +1,111 @@
+"""
+Scene-change keyframe sampling for business videos.
+
+Instead of uploading a whole clip through the Gemini Files API (and
+waiting on server-side processing), we can pull a handful of
+representative JPEG frames locally with ffmpeg's scene-change filter and
+send them inline in a single generate_content call.
+"""
+import logging
+import shutil
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+JPEG_SOI = b'\xff\xd8'
+JPEG_EOI = b'\xff\xd9'
+
+# Scene changes considered before thinning down to the requested count
+CANDIDATE_MULTIPLIER = 4
+PROBE_TIMEOUT = 10
+
+
+class KeyframeExtractionError(Exception):
+    """Keyframes could not be extracted; callers fall back to a full upload."""
+
+
+def split_jpeg_stream(stream: bytes) -> list[bytes]:
+    """Splits ffmpeg's image2pipe MJPEG output into individual JPEG images."""
+    frames = []
+    position = 0
+    while True:
+        start = stream.find(JPEG_SOI, position)
+        if start == -1:
+            break
+        end = stream.find(JPEG_EOI, start + 2)
+        if end == -1:
+            break
+        frames.append(stream[start:end + 2])
+        position = end + 2
+    return frames
+
+
+def thin_evenly(frames: list, count: int) -> list:
+    """Keeps `count` frames spread evenly across the clip (always first and last)."""
+    if count <= 0:
+        return []
+    if len(frames) <= count:
+        return frames
+    if count == 1:
+        return frames[:1]
+    step = (len(frames) - 1) / (count - 1)
+    return [frames[round(i * step)] for i in range(count)]
+
+
+def probe_duration(path) -> float | None:
+    """The clip's length in seconds, or None if ffprobe is missing or can't tell."""
+    ffprobe = shutil.which('ffprobe')
+    if ffprobe is None:
+        return None
+    command = [
+        ffprobe, '-v', 'error',
+        '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1',
+        str(path),
+    ]
+    try:
+        completed = subprocess.run(command, capture_output=True, timeout=PROBE_TIMEOUT, check=True)
+        duration = float(completed.stdout.strip())
+    except (subprocess.SubprocessError, ValueError):  # ValueError: 'N/A' for streams without a length
+        return None
+    return duration if duration > 0 else None
+
+
+def extract_keyframes(path, max_frames=6, scene_threshold=0.3, max_side=640, timeout=60) -> list[bytes]:
+    """
+    Returns up to `max_frames` JPEG keyframes: the opening frame plus
+    frames where the scene changes by more than `scene_threshold`, thinned
+    evenly across the whole clip.
+    """
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise KeyframeExtractionError("ffmpeg is not installed")
+
+    scene_change = f"gt(scene\\,{scene_threshold})"
+    duration = probe_duration(path)
+    if duration:
+        # At most one candidate per slice of the clip, so a busy opening can't crowd out the rest
+        spacing = duration / (max_frames * CANDIDATE_MULTIPLIER)
+        scene_change += f"*gte(t-prev_selected_t\\,{spacing:.3f})"
+    video_filter = (
+        f"select='eq(n\\,0)+{scene_change}',"
+        f"scale='min({max_side}\\,iw)':-2"
+    )
+    command = [
+        ffmpeg, '-hide_banner', '-loglevel', 'error',
+        '-i', str(path),
+        '-vf', video_filter,
+        '-vsync', 'vfr',
+        '-f', 'image2pipe', '-c:v', 'mjpeg', '-q:v', '5',
+        '-',
+    ]
+    try:
+        completed = subprocess.run(command, capture_output=True, timeout=timeout, check=True)
+    except subprocess.TimeoutExpired:
+        raise KeyframeExtractionError(f"ffmpeg timed out after {timeout}s")
+    except subprocess.CalledProcessError as e:
+        raise KeyframeExtractionError(f"ffmpeg failed: {e.stderr.decode(errors='replace').strip()}")
+
+    frames = split_jpeg_stream(completed.stdout)
+    if not frames:
+        raise KeyframeExtractionError("ffmpeg produced no frames")
+    return thin_evenly(frames, max_frames)
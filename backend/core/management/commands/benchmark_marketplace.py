@@ -0,0 +1,134 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from lender.views import MarketplaceViewSet, filter_marketplace
+from sme.models import BusinessProfile
+
+User = get_user_model()
+
+BENCHMARK_EMAIL_DOMAIN = 'benchmark.invalid'
+BATCH_SIZE = 5000
+PAGE_SIZE = 10  # MarketplaceViewSet.list returns the first 10
+
+# Query params a lender's marketplace page sends
+SCENARIOS = [
+    ('default', {}),
+    ('industry', {'industry': 'retail'}),
+    ('minProfitScore', {'minProfitScore': '80'}),
+    ('combined', {'industry': 'retail', 'minPulseScore': '90', 'minProfitScore': '60'}),
+]
+
+
+class Command(BaseCommand):
+    help = "Seeds synthetic profiles and compares marketplace query plans and timings without and with the marketplace indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=100000, help="Synthetic profiles to seed")
+        parser.add_argument('--verified-share', type=float, default=0.3, help="Share of seeded profiles that are verified")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed runs per query")
+        parser.add_argument('--target-ms', type=float, default=10.0, help="Median latency a query should stay under")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--allow-live', action='store_true', help="Allow running with DEBUG off (e.g. against production)")
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 2:
+            raise CommandError("--repeat must be at least 2")
+        if not settings.DEBUG and not options['allow_live']:
+            # Dropping the indexes locks the profiles table (ACCESS EXCLUSIVE on Postgres) until the run ends
+            raise CommandError(
+                "DEBUG is off: this drops the BusinessProfile indexes and holds the table locked for the whole run. "
+                "Use a development database, or pass --allow-live"
+            )
+        indexes = BusinessProfile._meta.indexes
+        existing = connection.introspection.get_constraints(connection.cursor(), BusinessProfile._meta.db_table)
+        missing = [index.name for index in indexes if index.name not in existing]
+        if missing:
+            raise CommandError(f"Indexes {', '.join(missing)} not found; run `manage.py migrate` first")
+
+        # One transaction, rolled back at the end: the seeded rows and the dropped indexes both disappear
+        with transaction.atomic():
+            started = time.perf_counter()
+            verified = self._seed(options['profiles'], options['verified_share'], random.Random(options['seed']))
+            self.stdout.write(
+                f"Seeded {options['profiles']} profile(s) ({verified} verified) in {time.perf_counter() - started:.1f}s; "
+                f"{BusinessProfile.objects.count()} in the table"
+            )
+
+            self._set_indexes(present=False)
+            before = self._run('Before (marketplace indexes dropped)', options['repeat'])
+            self._set_indexes(present=True)
+            after = self._run('After', options['repeat'])
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"\nMedian latency, target {options['target_ms']:g}ms:")
+        width = max(len(label) for label, _ in SCENARIOS)
+        for label, _ in SCENARIOS:
+            verdict = 'ok' if after[label] < options['target_ms'] else 'SLOW'
+            self.stdout.write(f"  {label:<{width}}  {before[label]:9.2f}ms -> {after[label]:7.2f}ms  {verdict}")
+
+    def _seed(self, count, verified_share, rng) -> int:
+        run_id = uuid.uuid4().hex[:8]
+        password = make_password(None)  # Unusable; hashing per user would dominate the run
+        categories = [key for key, _ in BusinessProfile.BUSINESS_CATEGORIES]
+        others = [key for key, _ in BusinessProfile.VERIFICATION_STATUS if key != 'verified']
+        verified = 0
+        for start in range(0, count, BATCH_SIZE):
+            users = User.objects.bulk_create([
+                User(email=f'market-{run_id}-{i}@{BENCHMARK_EMAIL_DOMAIN}', user_type='sme', password=password)
+                for i in range(start, min(count, start + BATCH_SIZE))
+            ])
+            profiles = []
+            for user in users:
+                is_verified = rng.random() < verified_share
+                verified += is_verified
+                profiles.append(BusinessProfile(
+                    user=user,
+                    business_name=f'Benchmark SME {user.pk}',
+                    business_category=rng.choice(categories),
+                    verification_status='verified' if is_verified else rng.choice(others),
+                    pulse_score=rng.randint(0, 100),
+                    profit_score=rng.randint(0, 100),
+                ))
+            BusinessProfile.objects.bulk_create(profiles)
+        return verified
+
+    def _set_indexes(self, present):
+        # The editor only renders SQL: entering it would end the transaction (SQLite refuses inside atomic)
+        editor = connection.schema_editor()
+        table = editor.quote_name(BusinessProfile._meta.db_table)
+        with connection.cursor() as cursor:
+            for index in BusinessProfile._meta.indexes:
+                if present:
+                    statement = index.create_sql(BusinessProfile, editor)
+                else:
+                    statement = editor.sql_delete_index % {'table': table, 'name': editor.quote_name(index.name)}
+                if statement is not None:  # Partial indexes are skipped on databases without them
+                    cursor.execute(str(statement))
+            # Fresh planner statistics for the current set of indexes
+            cursor.execute(f"{'ANALYZE TABLE' if connection.vendor == 'mysql' else 'ANALYZE'} {table}")
+
+    def _run(self, title, repeat) -> dict:
+        self.stdout.write(f"\n== {title} ==")
+        medians = {}
+        for label, params in SCENARIOS:
+            queryset = filter_marketplace(MarketplaceViewSet().get_queryset(), params)[:PAGE_SIZE]
+            list(queryset.all())  # Warm the page cache
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            medians[label] = statistics.median(timings)
+            p95 = statistics.quantiles(timings, n=20)[-1]
+            self.stdout.write(f"{label}: p50 {medians[label]:.2f}ms, p95 {p95:.2f}ms")
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f"    {line}")
+        return medians
@@ -0,0 +1,107 @@
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from PIL import Image, ImageDraw
+
+from core.services import PulseEngine
+from sme.models import BusinessProfile, CACDocument, BusinessVideo
+
+User = get_user_model()
+
+BENCHMARK_NAME = 'PulseFI Benchmark Ltd'
+BENCHMARK_EMAIL_DOMAIN = 'benchmark.invalid'
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _cac_image(index) -> bytes:
+    image = Image.new('L', (800, 560), 255)
+    draw = ImageDraw.Draw(image)
+    draw.text((60, 80), "CERTIFICATE OF INCORPORATION", fill=0)
+    draw.text((60, 160), BENCHMARK_NAME.upper(), fill=0)
+    draw.text((60, 240), f"RC {100000 + index}", fill=0)  # Unique per SME, so nothing is served from cache
+    buffer = BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = "Measures verification throughput on synthetic SMEs (use AI_PROVIDER=replay to run offline)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=50, help="Synthetic SMEs to verify")
+        parser.add_argument('--concurrency', type=int, default=8, help="Verifications run at once")
+        parser.add_argument('--allow-live', action='store_true', help="Allow running against the real Gemini API")
+        parser.add_argument('--keep', action='store_true', help="Keep the synthetic SMEs afterwards")
+
+    def handle(self, *args, **options):
+        provider = getattr(settings, 'AI_PROVIDER', 'gemini')
+        if provider != 'replay' and not options['allow_live']:
+            raise CommandError(f"AI_PROVIDER is '{provider}'; set AI_PROVIDER=replay or pass --allow-live")
+
+        run_id = uuid.uuid4().hex[:8]
+        users = self._create_profiles(run_id, options['profiles'])
+        self.stdout.write(f"Created {len(users)} synthetic SME(s); verifying with provider '{provider}'...")
+
+        try:
+            started = time.monotonic()
+            with ThreadPoolExecutor(max_workers=options['concurrency'], thread_name_prefix='benchmark') as executor:
+                results = list(executor.map(self._verify, users))
+            elapsed = time.monotonic() - started
+        finally:
+            if not options['keep']:
+                self._delete_profiles(users)
+
+        latencies = [latency for latency, _, _ in results]
+        deferred = sum(1 for _, _, was_deferred in results if was_deferred)
+        scores = [score for _, score, _ in results]
+        self.stdout.write(
+            f"{len(results)} verification(s) in {elapsed:.2f}s ({len(results) / elapsed:.2f}/s)\n"
+            f"latency p50 {_percentile(latencies, 50) * 1000:.0f}ms, "
+            f"p95 {_percentile(latencies, 95) * 1000:.0f}ms, "
+            f"p99 {_percentile(latencies, 99) * 1000:.0f}ms, max {max(latencies) * 1000:.0f}ms\n"
+            f"mean pulse score {statistics.mean(scores):.1f}, deferred {deferred}"
+        )
+
+    def _create_profiles(self, run_id, count):
+        users = []
+        for i in range(count):
+            user = User.objects.create_user(
+                email=f'bench-{run_id}-{i}@{BENCHMARK_EMAIL_DOMAIN}',
+                password=uuid.uuid4().hex,
+                user_type='sme'
+            )
+            BusinessProfile.objects.create(user=user, business_name=BENCHMARK_NAME, industry='Retail')
+            CACDocument.objects.create(user=user, cac_file=ContentFile(_cac_image(i), name=f'bench-{run_id}-{i}.png'))
+            BusinessVideo.objects.create(
+                user=user,
+                video_file=ContentFile(f'benchmark video {run_id} {i}'.encode(), name=f'bench-{run_id}-{i}.mp4')
+            )
+            users.append(user)
+        return users
+
+    def _verify(self, user):
+        try:
+            started = time.monotonic()
+            engine = PulseEngine(user, BENCHMARK_NAME.upper())
+            score, _ = engine.run_verification()
+            return time.monotonic() - started, score, bool(engine.deferred)
+        finally:
+            close_old_connections()
+
+    def _delete_profiles(self, users):
+        # Deleting the documents releases their stored files (see sme.signals)
+        for user in users:
+            user.delete()
@@ -0,0 +1,50 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.models import BankTransaction
+from core.narrations import get_classifier
+
+
+class Command(BaseCommand):
+    help = "Labels stored bank transactions with their narration's risk category (gambling, payday loans)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help="Relabel every transaction, not just unlabelled ones (after editing the dictionary)")
+        parser.add_argument('--batch-size', type=int, help="Rows per batch (default: BANK_TRANSACTION_BATCH_SIZE)")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size'] or settings.BANK_TRANSACTION_BATCH_SIZE
+        classify = get_classifier().classify
+        rows = BankTransaction.objects.all()
+        if not options['all']:
+            rows = rows.filter(risk_category__isnull=True)
+
+        started = time.perf_counter()
+        scanned = changed = 0
+        counts = {}
+        last_pk = 0
+        while True:
+            # Keyset pagination keeps every batch an index range scan, however large the table
+            batch = list(rows.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'narration', 'risk_category')[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            updates = []
+            for pk, narration, current in batch:
+                label = classify(narration)
+                if label:
+                    counts[label] = counts.get(label, 0) + 1
+                if label != current:
+                    updates.append(BankTransaction(pk=pk, risk_category=label))
+            BankTransaction.objects.bulk_update(updates, ['risk_category'])
+            scanned += len(batch)
+            changed += len(updates)
+
+        elapsed = time.perf_counter() - started
+        summary = ', '.join(f"{category}: {count}" for category, count in sorted(counts.items())) or 'none flagged'
+        self.stdout.write(self.style.SUCCESS(
+            f"Classified {scanned} narration(s) in {elapsed:.1f}s, {changed} label(s) changed ({summary})."
+        ))
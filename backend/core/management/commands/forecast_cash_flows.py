@@ -0,0 +1,65 @@
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.forecasting import forecast_cash_flow, monthly_totals
+from sme.models import BusinessProfile, CashFlowForecast
+
+FORECAST_FIELDS = [
+    'method', 'months_observed', 'monthly_net', 'monthly_forecast', 'net_3m', 'lower_3m', 'upper_3m',
+    'net_6m', 'lower_6m', 'upper_6m', 'growth_rate', 'cash_flow_status', 'computed_at',
+]
+
+
+class Command(BaseCommand):
+    help = "Fits a cash-flow trend to every connected SME's stored transactions and saves 3- and 6-month forecasts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help="Profiles per aggregate query and upsert")
+
+    def handle(self, *args, **options):
+        profiles = (
+            BusinessProfile.objects
+            .filter(mono_connected=True)
+            .exclude(mono_account_id='')
+            .order_by('pk')
+            .values_list('pk', 'mono_account_id')
+            .iterator(chunk_size=options['batch_size'])
+        )
+        started = time.perf_counter()
+        saved = skipped = 0
+        while batch := list(islice(profiles, options['batch_size'])):
+            totals = monthly_totals([account_id for _, account_id in batch])
+            now = timezone.now()
+            forecasts = []
+            for profile_id, account_id in batch:
+                result = forecast_cash_flow(*totals[account_id]) if account_id in totals else None
+                if result is None:
+                    skipped += 1  # Too little history; an older forecast is left as it was
+                    continue
+                forecasts.append(CashFlowForecast(
+                    profile_id=profile_id,
+                    months_observed=len(result.months),
+                    monthly_net=result.monthly_net,
+                    monthly_forecast=result.monthly_forecast,
+                    net_3m=result.net_3m,
+                    lower_3m=result.lower_3m,
+                    upper_3m=result.upper_3m,
+                    net_6m=result.net_6m,
+                    lower_6m=result.lower_6m,
+                    upper_6m=result.upper_6m,
+                    growth_rate=result.growth_rate,
+                    cash_flow_status=result.cash_flow_status,
+                    computed_at=now,
+                ))
+            CashFlowForecast.objects.bulk_create(
+                forecasts, update_conflicts=True, unique_fields=['profile'], update_fields=FORECAST_FIELDS
+            )
+            saved += len(forecasts)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Forecast {saved} profile(s) in {time.perf_counter() - started:.1f}s; "
+            f"{skipped} skipped for lack of history."
+        ))
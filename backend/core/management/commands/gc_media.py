@@ -0,0 +1,73 @@
+import os
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from core.models import StoredBlob
+from core.storage import get_media_storage
+from sme.models import BusinessVideo, CACDocument
+
+MEDIA_DIRS = ('cac_files', 'videos')
+
+
+class Command(BaseCommand):
+    help = "Recounts references to stored media and deletes files no document points at"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be deleted")
+        parser.add_argument('--min-age', type=int, default=3600,
+                            help="Leave files and blobs younger than this many seconds (uploads in progress)")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        storage = get_media_storage()
+        refs = Counter(CACDocument.objects.values_list('cac_file', flat=True))
+        refs.update(BusinessVideo.objects.values_list('video_file', flat=True))
+
+        # A recent blob may belong to an upload whose document row isn't committed yet
+        cutoff = time.time() - options['min_age']
+        recounted = removed_blobs = 0
+        for blob in StoredBlob.objects.iterator():
+            if self._modified_at(storage, blob) > cutoff:
+                continue
+            count = refs[blob.name]
+            if count == 0:
+                removed_blobs += 1
+                if not dry_run:
+                    storage.delete(blob.name)
+                    blob.delete()
+            elif count != blob.ref_count:
+                recounted += 1
+                if not dry_run:
+                    StoredBlob.objects.filter(pk=blob.pk).update(ref_count=count)
+
+        # Files outside the blob table: older uploads, including suffixed duplicates
+        blob_names = set(StoredBlob.objects.values_list('name', flat=True))
+        removed_files = freed = 0
+        for directory in MEDIA_DIRS:
+            root = storage.path(directory)
+            for dirpath, _, filenames in os.walk(root):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+                    if name in refs or name in blob_names or os.path.getmtime(path) > cutoff:
+                        continue
+                    removed_files += 1
+                    freed += os.path.getsize(path)
+                    if not dry_run:
+                        os.remove(path)
+
+        prefix = "Would remove" if dry_run else "Removed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {removed_blobs} unreferenced blob(s) and {removed_files} orphaned file(s) "
+            f"({freed / (1024 * 1024):.1f}MB); {recounted} blob count(s) corrected."
+        ))
+
+    @staticmethod
+    def _modified_at(storage, blob) -> float:
+        # Storing existing content again touches the file rather than the row
+        try:
+            return max(blob.created_at.timestamp(), os.path.getmtime(storage.path(blob.name)))
+        except FileNotFoundError:
+            return blob.created_at.timestamp()
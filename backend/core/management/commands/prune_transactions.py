@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.mono import prune_transactions
+
+
+class Command(BaseCommand):
+    help = "Deletes stored bank transactions older than the retention period"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Retention in days (default: BANK_TRANSACTION_RETENTION_DAYS)")
+
+    def handle(self, *args, **options):
+        days = options['days'] or settings.BANK_TRANSACTION_RETENTION_DAYS
+        deleted = prune_transactions(retention_days=days)
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} transaction(s) older than {days} days."))
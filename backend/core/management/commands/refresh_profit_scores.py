@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models import Job
+from sme.models import BusinessProfile
+
+
+class Command(BaseCommand):
+    help = "Queues profit scoring for connected SMEs whose Profit Score is missing or older than the TTL"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, help="Re-score scores older than this (default: PROFIT_SCORE_TTL_HOURS)")
+        parser.add_argument('--limit', type=int, help="Queue at most this many jobs")
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many would be queued")
+
+    def handle(self, *args, **options):
+        hours = options['hours'] or settings.PROFIT_SCORE_TTL_HOURS
+        pending = Job.objects.filter(
+            kind=Job.Kind.PROFIT_SCORING,
+            status__in=[Job.Status.QUEUED, Job.Status.RUNNING]
+        ).values('user_id')
+        stale = (
+            BusinessProfile.objects
+            .filter(mono_connected=True)
+            .exclude(mono_account_id='')
+            .filter(Q(profit_scored_at__isnull=True) | Q(profit_scored_at__lt=timezone.now() - timedelta(hours=hours)))
+            .exclude(user_id__in=pending)
+            .order_by(F('profit_scored_at').asc(nulls_first=True))  # Never-scored first, then the oldest
+            .values_list('user_id', flat=True)
+        )
+        if options['limit']:
+            stale = stale[:options['limit']]
+        user_ids = list(stale)
+
+        if options['dry_run']:
+            self.stdout.write(f"Would queue profit scoring for {len(user_ids)} profile(s).")
+            return
+        # Forced, since --hours may be shorter than the TTL the worker checks
+        Job.objects.bulk_create([
+            Job(kind=Job.Kind.PROFIT_SCORING, user_id=user_id, payload={'force': True}) for user_id in user_ids
+        ], batch_size=500)
+        self.stdout.write(self.style.SUCCESS(f"Queued profit scoring for {len(user_ids)} profile(s)."))
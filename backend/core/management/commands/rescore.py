@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from core.breaker import UpstreamUnavailable, get_circuit_breaker
+from core.clients import get_genai_client
+from core.ratelimit import QuotaLimiter, RateLimitedClient
+from core.services import PulseEngine, ProfitEngine
+from sme.models import BusinessProfile
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Re-runs Pulse (and optionally Profit) scoring for every bank-connected business profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8, help="Profiles scored at once")
+        parser.add_argument('--rpm', type=int, help="Gemini requests per minute (default: GEMINI_REQUESTS_PER_MINUTE)")
+        parser.add_argument('--tpm', type=int, help="Gemini tokens per minute (default: GEMINI_TOKENS_PER_MINUTE)")
+        parser.add_argument('--batch-size', type=int, default=200, help="Profiles written per bulk_update")
+        parser.add_argument('--checkpoint', default='rescore-checkpoint.json', help="Progress file")
+        parser.add_argument('--resume', action='store_true', help="Continue from the checkpoint file")
+        parser.add_argument('--profit', action='store_true', help="Also re-run the ProfitEngine")
+
+    def handle(self, *args, **options):
+        self.with_profit = options['profit']
+        self.checkpoint_path = options['checkpoint']
+        batch_size = options['batch_size']
+        max_in_flight = options['concurrency'] * 2
+
+        # Every engine shares one quota-limited client
+        self.client = RateLimitedClient(
+            get_genai_client(),
+            QuotaLimiter.from_settings(options['rpm'], options['tpm']),
+            get_circuit_breaker()
+        )
+
+        checkpoint = self._load_checkpoint() if options['resume'] else {}
+        last_pk = checkpoint.get('last_pk', 0)
+        retry_pks = checkpoint.get('failed', [])
+        self.processed = self.resumed_from = checkpoint.get('processed', 0)
+        self.failed = []
+
+        # Only profiles that connected a bank account were scored; the rest are still onboarding.
+        # A connected profile with no account name on record would be penalised for it; leave it alone
+        connected = BusinessProfile.objects.filter(mono_connected=True)
+        unnamed = Q(mono_account_name='', bank_account_name='')
+        self.skipped = connected.filter(unnamed).count()
+        queryset = (
+            connected
+            .filter(Q(pk__gt=last_pk) | Q(pk__in=retry_pks))
+            .exclude(unnamed)
+            .select_related('user')
+            .order_by('pk')
+        )
+
+        # The checkpoint only moves past a profile once it and every profile
+        # before it have been written, so a crash never skips anything
+        submitted = deque()
+        finished = set()
+        in_flight = {}
+        pending_writes = []
+        watermark = last_pk
+        started = time.monotonic()
+
+        def collect(done):
+            nonlocal watermark
+            for future in done:
+                profile = in_flight.pop(future)
+                try:
+                    future.result()
+                    pending_writes.append(profile)
+                except Exception as e:
+                    logger.error(f"Rescoring profile {profile.pk} failed: {e}")
+                    self.failed.append(profile.pk)
+                finished.add(profile.pk)
+            while submitted and submitted[0] in finished:
+                finished.discard(submitted[0])
+                watermark = max(watermark, submitted.popleft())
+            if len(pending_writes) >= batch_size:
+                self._flush(pending_writes, watermark, started)
+
+        with ThreadPoolExecutor(max_workers=options['concurrency'], thread_name_prefix='rescore') as executor:
+            for profile in queryset.iterator(chunk_size=batch_size):
+                if len(in_flight) >= max_in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight[executor.submit(self._rescore, profile)] = profile
+                submitted.append(profile.pk)
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+
+        self._flush(pending_writes, watermark, started)
+        message = f"Rescored {self.processed} profile(s)."
+        if self.failed:
+            message += f" {len(self.failed)} failed; run again with --resume to retry them."
+        if self.skipped:
+            message += f" {self.skipped} connected profile(s) skipped: no bank account name on record."
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def _rescore(self, profile):
+        """Runs the engines for one profile on a pool thread. Saving is batched by the caller."""
+        try:
+            engine = PulseEngine(profile.user, profile.mono_account_name or profile.bank_account_name)
+            engine.client = self.client
+            pulse_score, fail_reason = engine.run_verification()
+            if engine.deferred:
+                # Left unwritten and recorded as failed, so --resume retries it
+                raise UpstreamUnavailable(f"Deferred checks: {', '.join(engine.deferred)}")
+            profile.pulse_score = pulse_score
+            profile.verification_status = 'failed' if fail_reason else 'verified'
+
+            if self.with_profit and profile.mono_account_id:
+                profit_engine = ProfitEngine(profile.user, profile.mono_account_id)
+                profit_engine.client = self.client
+                profile.profit_score, profile.profit_analysis = profit_engine.analyze_financial_health()
+                profile.profit_scored_at = timezone.now()
+
+            profile.updated_at = timezone.now()
+        finally:
+            close_old_connections()
+
+    def _flush(self, profiles, watermark, started):
+        if profiles:
+            fields = ['pulse_score', 'verification_status', 'updated_at']
+            if self.with_profit:
+                fields += ['profit_score', 'profit_analysis', 'profit_scored_at']
+            BusinessProfile.objects.bulk_update(profiles, fields)
+            self.processed += len(profiles)
+            profiles.clear()
+
+        self._save_checkpoint({
+            'last_pk': watermark,
+            'processed': self.processed,
+            'failed': self.failed,
+            'updated_at': timezone.now().isoformat(),
+        })
+        rate = (self.processed - self.resumed_from) / max(time.monotonic() - started, 1e-6)
+        self.stdout.write(f"Rescored {self.processed} profile(s) up to id {watermark} ({rate:.1f}/s)")
+
+    def _load_checkpoint(self) -> dict:
+        try:
+            with open(self.checkpoint_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_checkpoint(self, data):
+        # Write-then-rename so an interrupted run never leaves a torn file
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.checkpoint_path)
@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.simulators import LatencyModel, MonoSimulator, PaystackSimulator, SimulatorServer
+
+
+class Command(BaseCommand):
+    help = "Serves local Mono and Paystack simulators with injected latency and errors"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--mono-port', type=int, default=8101)
+        parser.add_argument('--paystack-port', type=int, default=8102)
+        parser.add_argument('--latency', choices=['fixed', 'normal', 'lognormal'], default='fixed',
+                            help="Latency distribution")
+        parser.add_argument('--latency-ms', type=float, default=0.0, help="Mean (normal) or median (lognormal) latency")
+        parser.add_argument('--jitter-ms', type=float, default=0.0, help="Standard deviation for --latency normal")
+        parser.add_argument('--sigma', type=float, default=0.5, help="Spread for --latency lognormal")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests that fail")
+        parser.add_argument('--error-code', type=int, default=503)
+        parser.add_argument('--page-size', type=int, default=100, help="Mono transactions per page")
+        parser.add_argument('--transactions', type=int, default=1000, help="Mono transactions per account")
+        parser.add_argument('--seed', type=int, help="Seed for latency and error injection")
+
+    def handle(self, *args, **options):
+        def injection():
+            return {
+                'latency': LatencyModel(options['latency'], options['latency_ms'], options['jitter_ms'], options['sigma']),
+                'error_rate': options['error_rate'],
+                'error_code': options['error_code'],
+                'seed': options['seed'],
+            }
+
+        servers = [
+            SimulatorServer(
+                MonoSimulator(page_size=options['page_size'], transactions_per_account=options['transactions'], **injection()),
+                options['host'], options['mono_port']
+            ),
+            SimulatorServer(PaystackSimulator(**injection()), options['host'], options['paystack_port']),
+        ]
+        for server in servers:
+            server.start()
+        mono, paystack = servers
+        self.stdout.write(f"Mono simulator:     MONO_BASE_URL={mono.url}")
+        self.stdout.write(f"Paystack simulator: PAYSTACK_BASE_URL={paystack.url} (with any PAYSTACK_SECRET_KEY but sk_test_...)")
+        self.stdout.write("Press Ctrl+C to stop.")
+
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        for server in servers:
+            server.stop()
+        summary = ', '.join(
+            f"{server.simulator.name}: {server.simulator.requests} request(s), {server.simulator.errors} injected error(s)"
+            for server in servers
+        )
+        self.stdout.write(self.style.SUCCESS(f"Simulators stopped. {summary}."))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from core.jobs import WorkerPool
+
+
+class Command(BaseCommand):
+    help = "Runs a fixed-size pool of background job workers (Pulse verification, etc.)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help="Number of worker threads")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument('--burst', action='store_true', help="Exit once the queue is drained")
+
+    def handle(self, *args, **options):
+        pool = WorkerPool(
+            size=options['concurrency'],
+            poll_interval=options['poll_interval'],
+            burst=options['burst']
+        )
+        pool.start()
+        self.stdout.write(f"Started {pool.size} worker(s). Press Ctrl+C to stop.")
+
+        try:
+            while any(thread.is_alive() for thread in pool.threads):
+                pool.join(timeout=1.0)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping workers after their current job...")
+            pool.stop()
+            pool.join()
+
+        self.stdout.write(self.style.SUCCESS(f"Workers stopped. Processed {pool.processed} job(s)."))
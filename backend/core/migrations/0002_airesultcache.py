@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIResultCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('kind', models.CharField(choices=[('cac', 'CAC Document'), ('video', 'Business Video')], max_length=20)),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('prompt_version', models.CharField(max_length=100)),
+                ('model', models.CharField(max_length=100)),
+                ('result', models.JSONField(default=dict)),
+                ('raw_response', models.TextField(blank=True)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_accessed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
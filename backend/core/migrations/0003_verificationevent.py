@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_airesultcache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerificationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveIntegerField()),
+                ('stage', models.CharField(max_length=30)),
+                ('status', models.CharField(max_length=30)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='core.job')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('job', 'seq'), name='core_verificationevent_job_seq')],
+            },
+        ),
+    ]
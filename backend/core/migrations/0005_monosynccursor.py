@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_storedblob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonoSyncCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account_id', models.CharField(max_length=100, unique=True)),
+                ('last_transaction_date', models.DateField(blank=True, null=True)),
+                ('transactions', models.JSONField(blank=True, default=list)),
+                ('synced_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='mono_cursors', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
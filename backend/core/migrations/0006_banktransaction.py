@@ -0,0 +1,66 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from core.mono import parse_transaction_date
+
+
+def move_transactions(apps, schema_editor):
+    """Copies the transactions kept on each sync cursor into the table."""
+    MonoSyncCursor = apps.get_model('core', 'MonoSyncCursor')
+    BankTransaction = apps.get_model('core', 'BankTransaction')
+    for cursor in MonoSyncCursor.objects.iterator():
+        batch = []
+        for txn in cursor.transactions or []:
+            when = parse_transaction_date(txn.get('date'))
+            if when is None or not txn.get('id'):
+                continue
+            batch.append(BankTransaction(
+                transaction_id=txn['id'],
+                account_id=cursor.account_id,
+                user_id=cursor.user_id,
+                date=when,
+                type='debit' if txn.get('type') == 'debit' else 'credit',
+                amount=int(txn.get('amount') or 0),
+                balance=txn.get('balance'),
+                narration=txn.get('narration') or '',
+                category=txn.get('category') or ''
+            ))
+        BankTransaction.objects.bulk_create(batch, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_monosynccursor'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_id', models.CharField(max_length=100, unique=True)),
+                ('account_id', models.CharField(max_length=100)),
+                ('date', models.DateTimeField()),
+                ('type', models.CharField(choices=[('credit', 'Credit'), ('debit', 'Debit')], max_length=10)),
+                ('amount', models.BigIntegerField()),
+                ('balance', models.BigIntegerField(blank=True, null=True)),
+                ('narration', models.TextField(blank=True)),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bank_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['account_id', 'date'], name='core_banktxn_account_date'), models.Index(fields=['account_id', 'type'], name='core_banktxn_account_type')],
+            },
+        ),
+        migrations.RunPython(move_transactions, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='monosynccursor',
+            name='transactions',
+        ),
+    ]
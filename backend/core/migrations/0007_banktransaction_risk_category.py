@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_banktransaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='banktransaction',
+            name='risk_category',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_banktransaction_risk_category'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('pulse_verification', 'Pulse Verification'), ('profit_scoring', 'Profit Scoring')], max_length=50),
+        ),
+    ]
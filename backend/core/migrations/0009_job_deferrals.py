@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_job_profit_scoring'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='deferrals',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
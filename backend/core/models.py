@@ -1,3 +1,178 @@
 from django.db import models
+from django.conf import settings
+from django.utils import timezone
 
-# Create your models here.
+
+class Job(models.Model):
+    """
+    A unit of background work (e.g. a Pulse verification or Profit scoring).
+    Enqueued by the API and executed by `manage.py runworkers`.
+    """
+    class Kind(models.TextChoices):
+        PULSE_VERIFICATION = 'pulse_verification', 'Pulse Verification'
+        PROFIT_SCORING = 'profit_scoring', 'Profit Scoring'
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        SUCCEEDED = 'succeeded', 'Succeeded'
+        FAILED = 'failed', 'Failed'
+
+    kind = models.CharField(max_length=50, choices=Kind.choices)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='jobs',
+        null=True,
+        blank=True
+    )
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    # Retry bookkeeping
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    deferrals = models.PositiveIntegerField(default=0)  # RetryLater re-queues, capped by jobs.MAX_DEFERRALS
+    run_after = models.DateTimeField(default=timezone.now)
+
+    # Set while a worker holds the job
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers poll for "queued and due", oldest first
+            models.Index(fields=['status', 'run_after'], name='core_job_ready_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class AIResultCache(models.Model):
+    """
+    Cached AI extraction results, keyed by the SHA-256 of the analysed
+    file plus the prompt and model version that produced them.
+    """
+    class Kind(models.TextChoices):
+        CAC = 'cac', 'CAC Document'
+        VIDEO = 'video', 'Business Video'
+
+    key = models.CharField(max_length=64, unique=True)
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    content_hash = models.CharField(max_length=64, db_index=True)
+    prompt_version = models.CharField(max_length=100)
+    model = models.CharField(max_length=100)
+    result = models.JSONField(default=dict)  # e.g. {"extracted_name": ...}
+    raw_response = models.TextField(blank=True)
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.content_hash[:12]} ({self.prompt_version})"
+
+
+class VerificationEvent(models.Model):
+    """
+    A progress event emitted by the PulseEngine while a verification job
+    runs (e.g. "cac started", "video processing", "verification finished").
+    Streamed to the SME over Server-Sent Events.
+    """
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='events')
+    seq = models.PositiveIntegerField()  # Per-job order; doubles as the SSE event id
+    stage = models.CharField(max_length=30)
+    status = models.CharField(max_length=30)
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Also the index streams use to fetch "events after seq N"
+            models.UniqueConstraint(fields=['job', 'seq'], name='core_verificationevent_job_seq'),
+        ]
+
+    def __str__(self):
+        return f"Job #{self.job_id} {self.seq}: {self.stage} {self.status}"
+
+
+class StoredBlob(models.Model):
+    """
+    A file in the content-addressed media storage (see core.storage), named
+    by its SHA-256. `ref_count` is the number of model fields pointing at
+    it; the file is deleted when the last one lets go.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField(default=0)
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} ref(s))"
+
+
+class MonoSyncCursor(models.Model):
+    """
+    Incremental sync state for one Mono account (see core.mono): the date
+    of the newest transaction seen, so later syncs only ask Mono for what
+    came after it.
+    """
+    account_id = models.CharField(max_length=100, unique=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='mono_cursors',
+        null=True,
+        blank=True
+    )
+    last_transaction_date = models.DateField(null=True, blank=True)
+    synced_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Mono sync for {self.account_id} (up to {self.last_transaction_date})"
+
+
+class BankTransaction(models.Model):
+    """
+    A Mono transaction stored locally by the sync (see core.mono), so
+    scoring, dashboards and lender views read cash flow from the database
+    instead of calling Mono again. Kept for BANK_TRANSACTION_RETENTION_DAYS.
+    """
+    class Type(models.TextChoices):
+        CREDIT = 'credit', 'Credit'
+        DEBIT = 'debit', 'Debit'
+
+    transaction_id = models.CharField(max_length=100, unique=True)  # Mono's id
+    account_id = models.CharField(max_length=100)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='bank_transactions',
+        null=True,
+        blank=True
+    )
+    date = models.DateTimeField()
+    type = models.CharField(max_length=10, choices=Type.choices)
+    amount = models.BigIntegerField()  # Kobo, as Mono reports it
+    balance = models.BigIntegerField(null=True, blank=True)
+    narration = models.TextField(blank=True)
+    category = models.CharField(max_length=100, blank=True)
+    # Gambling/payday-loan label from the narration (core.narrations); '' for none, null if not classified yet
+    risk_category = models.CharField(max_length=32, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['account_id', 'date'], name='core_banktxn_account_date'),
+            models.Index(fields=['account_id', 'type'], name='core_banktxn_account_type'),
+        ]
+
+    def __str__(self):
+        return f"{self.type} {self.amount} on {self.account_id} ({self.date:%Y-%m-%d})"
@@ -0,0 +1,211 @@
+"""
+Incremental Mono transaction sync.
+
+Mono's transactions endpoint is filtered by `start`/`end` dates and
+paginated through `paging.next`. A MonoSyncCursor per account remembers
+the newest transaction date seen, so later syncs only ask for
+transactions from that day on. The boundary day is read again because it
+may have gained postings, and ids already stored are skipped. A monthly
+re-score then transfers days of data, not a year. Requests share one
+pooled httpx client per process.
+
+Transactions are stored as BankTransaction rows, inserted in batches
+with conflicts (already stored ids) ignored.
+"""
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+import httpx
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import BankTransaction, MonoSyncCursor
+from .narrations import classify_narration
+
+MONO_DATE_FORMAT = '%d-%m-%Y'
+
+
+class MonoError(Exception):
+    """Mono could not be reached or answered with an error."""
+
+
+_client = None
+_owner_pid = os.getpid()
+_lock = threading.Lock()
+
+
+def get_mono_http_client() -> httpx.Client:
+    """Keep-alive HTTP client shared by every Mono call in this process (rebuilt after a fork)."""
+    global _client, _owner_pid
+    with _lock:
+        if _client is None or os.getpid() != _owner_pid:
+            # An inherited client's sockets belong to the parent; leave them alone
+            _client = httpx.Client(
+                transport=httpx.HTTPTransport(
+                    limits=httpx.Limits(
+                        max_connections=getattr(settings, 'MONO_MAX_CONNECTIONS', 10),
+                        max_keepalive_connections=getattr(settings, 'MONO_MAX_CONNECTIONS', 10),
+                    ),
+                    retries=1,
+                ),
+                timeout=getattr(settings, 'MONO_TIMEOUT', 15),
+            )
+            _owner_pid = os.getpid()
+        return _client
+
+
+class MonoClient:
+    def __init__(self, secret_key=None, base_url=None, http=None):
+        self.secret_key = secret_key or settings.MONO_SECRET_KEY
+        self.base_url = (base_url or settings.MONO_BASE_URL).rstrip('/')
+        self.http = http or get_mono_http_client()
+
+    def _get(self, url, params=None) -> dict:
+        try:
+            response = self.http.get(url, params=params, headers={
+                'mono-sec-key': self.secret_key or '',
+                'accept': 'application/json',
+            })
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            raise MonoError(f"Mono request failed: {e}") from e
+
+    def transaction_pages(self, account_id, start: date, end: date = None):
+        """Yields each page of an account's transactions from `start` (inclusive) on."""
+        url = f"{self.base_url}/accounts/{account_id}/transactions"
+        params = {'paginate': 'true', 'start': start.strftime(MONO_DATE_FORMAT)}
+        if end:
+            params['end'] = end.strftime(MONO_DATE_FORMAT)
+        max_pages = getattr(settings, 'MONO_MAX_PAGES', 500)
+        for _ in range(max_pages):
+            body = self._get(url, params)
+            yield body.get('data') or []
+            url = (body.get('paging') or {}).get('next')
+            if not url:
+                return
+            params = None  # The next-page URL carries the query
+
+
+def parse_transaction_date(value) -> datetime | None:
+    if not value:
+        return None
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        day = parse_date(str(value)[:10])
+        if day is None:
+            return None
+        parsed = datetime.combine(day, datetime.min.time())
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, dt_timezone.utc)
+
+
+def build_transaction(account_id, txn, user=None) -> BankTransaction | None:
+    """A BankTransaction for a Mono transaction; rows without an id get a stable digest instead."""
+    when = parse_transaction_date(txn.get('date'))
+    if when is None:
+        return None
+    txn_id = txn.get('id') or txn.get('_id')
+    if not txn_id:
+        key = '|'.join(str(txn.get(field, '')) for field in ('date', 'type', 'amount', 'narration', 'balance'))
+        txn_id = 'sha1:' + hashlib.sha1(f"{account_id}|{key}".encode()).hexdigest()
+    balance = txn.get('balance')
+    narration = txn.get('narration') or ''
+    return BankTransaction(
+        transaction_id=txn_id,
+        account_id=account_id,
+        user=user,
+        date=when,
+        type=BankTransaction.Type.DEBIT if txn.get('type') == 'debit' else BankTransaction.Type.CREDIT,
+        amount=int(txn.get('amount') or 0),
+        balance=int(balance) if balance is not None else None,
+        narration=narration,
+        category=txn.get('category') or '',
+        risk_category=classify_narration(narration)
+    )
+
+
+def ingest_transactions(account_id, transactions, user=None, batch_size=None) -> datetime | None:
+    """
+    Stores Mono transactions in batches, skipping ids already stored, and
+    returns the newest transaction date among them.
+    """
+    batch_size = batch_size or getattr(settings, 'BANK_TRANSACTION_BATCH_SIZE', 500)
+    batch = []
+    newest = None
+    for txn in transactions:
+        row = build_transaction(account_id, txn, user)
+        if row is None:
+            continue
+        newest = max(newest, row.date) if newest else row.date
+        batch.append(row)
+        if len(batch) >= batch_size:
+            BankTransaction.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        BankTransaction.objects.bulk_create(batch, ignore_conflicts=True)
+    return newest
+
+
+def window_start(months) -> datetime:
+    return timezone.now() - timedelta(days=round(months * 365 / 12))
+
+
+def account_transactions(account_id, months=None):
+    """The account's stored transactions in the scoring window, oldest first."""
+    months = months or getattr(settings, 'MONO_SYNC_MONTHS', 12)
+    return BankTransaction.objects.filter(account_id=account_id, date__gte=window_start(months)).order_by('date')
+
+
+@dataclass
+class SyncResult:
+    fetched: int        # Transactions Mono returned in this sync
+    added: int          # ...of which were new
+    pages: int
+    full: bool          # True if the whole window was fetched (first sync, or cursor too old)
+
+
+def sync_transactions(account_id, user=None, client=None, months=None) -> SyncResult:
+    """Brings the account's stored transactions up to date, fetching only what is new."""
+    client = client or MonoClient()
+    months = months or getattr(settings, 'MONO_SYNC_MONTHS', 12)
+    oldest = window_start(months).date()
+
+    cursor, _ = MonoSyncCursor.objects.get_or_create(account_id=account_id, defaults={'user': user})
+    full = cursor.last_transaction_date is None or cursor.last_transaction_date < oldest
+    stored_before = BankTransaction.objects.filter(account_id=account_id).count()
+
+    fetched = pages = 0
+    newest = None
+    for page in client.transaction_pages(account_id, oldest if full else cursor.last_transaction_date):
+        pages += 1
+        fetched += len(page)
+        page_newest = ingest_transactions(account_id, page, user)
+        if page_newest:
+            newest = max(newest, page_newest) if newest else page_newest
+
+    if newest:
+        cursor.last_transaction_date = max(cursor.last_transaction_date or oldest, newest.date())
+    cursor.synced_at = timezone.now()
+    if cursor.user_id is None and user is not None:
+        cursor.user = user
+    cursor.save()
+    added = BankTransaction.objects.filter(account_id=account_id).count() - stored_before
+    return SyncResult(fetched, added, pages, full)
+
+
+def prune_transactions(retention_days=None, batch_size=None) -> int:
+    """Deletes stored transactions older than the retention period, in batches; returns how many."""
+    retention_days = retention_days or getattr(settings, 'BANK_TRANSACTION_RETENTION_DAYS', 730)
+    batch_size = batch_size or getattr(settings, 'BANK_TRANSACTION_BATCH_SIZE', 500)
+    expired = BankTransaction.objects.filter(date__lt=timezone.now() - timedelta(days=retention_days))
+    deleted = 0
+    while True:
+        # Small deletes keep locks short on a large table
+        pks = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += BankTransaction.objects.filter(pk__in=pks).delete()[0]
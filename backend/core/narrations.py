@@ -0,0 +1,196 @@
+"""
+Risk labels for bank transaction narrations.
+
+Gambling and payday-loan activity is read off narrations ('WEB TRF TO
+BET9JA', 'BRANCH INTL LOAN RPMT'). Rather than trying every keyword
+against every narration, the keyword dictionary is compiled into an
+Aho-Corasick automaton, which finds all keywords in a narration in one
+pass over its characters, however many keywords there are. Optional
+regular expressions per category catch what fixed keywords can't. Each
+has an anchor word that goes into the same automaton, so a regex only
+runs on the few narrations containing its anchor and no keyword.
+
+`summarise_risk` gives per-category counts and amounts and a 0-100 risk
+sub-score for the profit prompt and the fallback score. The sync stores
+each transaction's label (BankTransaction.risk_category) and
+`manage.py classify_narrations` relabels stored rows after the
+dictionary changes.
+"""
+import re
+from collections import deque
+from dataclasses import dataclass, asdict, field
+from functools import lru_cache
+
+# Category -> keywords (matched as whole words, case-insensitively) and optional
+# (anchor, regex) rules, the regex tried on narrations containing the anchor.
+# Order matters: a narration matching several categories gets the first.
+NARRATION_RULES = {
+    'gambling': {
+        'keywords': [
+            'BET9JA', 'SPORTYBET', 'BETKING', 'NAIRABET', '1XBET', 'MERRYBET', 'BETWAY', 'MSPORT',
+            'BETLAND', 'SUREBET247', 'ACCESSBET', 'BANGBET', 'PARIPESA', 'NAIJABET', 'BETBONANZA',
+            'LIVESCORE BET', 'ZEBET', 'WAZOBET', 'LOTTO', 'BABA IJEBU', 'PREMIER LOTTO',
+        ],
+        'patterns': [('BET', r'\bBET\s*(?:WALLET|DEPOSIT|STAKE|TOP\s*UP|FUNDING)\b')],
+    },
+    'payday_loan': {
+        'keywords': [
+            'BRANCH INTL', 'BRANCH INTERNATIONAL', 'BRANCH FINANCIAL', 'CARBON FINANCE', 'GETCARBON',
+            'PAYLATER', 'FAIRMONEY', 'PALMCREDIT', 'RENMONEY', 'OKASH', 'AELLA', 'QUICKCHECK',
+            'EASEMONI', 'SOKOLOAN', 'NEWCREDIT', 'KIAKIA', 'XCREDIT', 'LCREDIT', 'GOLDMAN CREDIT',
+        ],
+        'patterns': [
+            ('LOAN', r'\bLOAN\s*(?:REPAYMENT|REPAY|RPMT|RPYMT|DISBURSEMENT|DISB)\b'),
+            ('LOAN', r'\b(?:BRANCH|CARBON)\b.*\bLOAN\b'),
+        ],
+    },
+}
+
+# Share of money out to a category at which its part of the risk score maxes out, and that part's weight
+RISK_WEIGHTS = {
+    'gambling': {'weight': 60, 'saturation': 0.10},
+    'payday_loan': {'weight': 40, 'saturation': 0.20},
+}
+
+
+class AhoCorasick:
+    """Finds every occurrence of a set of keywords in a text in one left-to-right pass."""
+
+    def __init__(self, keywords):
+        # keywords: iterable of (keyword, value); the automaton is built over upper-cased keywords
+        self.delta = [{}]     # state -> {char: next state}, with failure links already folded in
+        self.output = [()]    # state -> ((value, keyword length), ...) ending at that state
+        for keyword, value in keywords:
+            state = 0
+            for char in keyword.upper():
+                if char not in self.delta[state]:
+                    self.delta.append({})
+                    self.output.append(())
+                    self.delta[state][char] = len(self.delta) - 1
+                state = self.delta[state][char]
+            self.output[state] += ((value, len(keyword)),)
+
+        # Breadth-first: every state inherits its failure state's transitions and outputs,
+        # so a scan never follows failure links
+        fail = [0] * len(self.delta)
+        queue = deque(self.delta[0].values())
+        while queue:
+            state = queue.popleft()
+            goto = dict(self.delta[state])
+            for char, target in goto.items():
+                fail[target] = self.delta[fail[state]].get(char, 0) if state else 0
+                self.output[target] += self.output[fail[target]]
+                queue.append(target)
+            for char, target in self.delta[fail[state]].items():
+                goto.setdefault(char, target)
+            self.delta[state] = goto
+
+    def find(self, text):
+        """Yields (value, start, end) for each keyword occurrence in upper-cased `text`."""
+        delta, output = self.delta, self.output
+        state = 0
+        for index, char in enumerate(text):
+            state = delta[state].get(char, 0)
+            if output[state]:
+                for value, length in output[state]:
+                    yield value, index + 1 - length, index + 1
+
+
+def _is_word_boundary(text, start, end) -> bool:
+    return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+
+class NarrationClassifier:
+    def __init__(self, rules=None):
+        rules = rules or NARRATION_RULES
+        self.categories = tuple(rules)
+        # Automaton values: a category for keywords, an index into self.patterns for anchors
+        self.patterns = [
+            (category, re.compile(regex))
+            for category, rule in rules.items() for _, regex in rule.get('patterns', ())
+        ]
+        anchors = [anchor for rule in rules.values() for anchor, _ in rule.get('patterns', ())]
+        self.automaton = AhoCorasick(
+            [(keyword, category) for category, rule in rules.items() for keyword in rule.get('keywords', ())]
+            + [(anchor, index) for index, anchor in enumerate(anchors)]
+        )
+        # Narrations repeat a lot (same payees, same channels)
+        self.classify = lru_cache(maxsize=65536)(self._classify)
+
+    def _classify(self, narration) -> str:
+        """The narration's risk category, or '' if it has none."""
+        text = ' '.join((narration or '').upper().split())
+        if not text:
+            return ''
+        found, anchored = set(), set()
+        for value, start, end in self.automaton.find(text):
+            if isinstance(value, int):
+                anchored.add(value)
+            elif _is_word_boundary(text, start, end):
+                found.add(value)
+        if not found:
+            for index in sorted(anchored):
+                category, pattern = self.patterns[index]
+                if pattern.search(text):
+                    found.add(category)
+        return next((category for category in self.categories if category in found), '')
+
+
+@lru_cache(maxsize=1)
+def get_classifier() -> NarrationClassifier:
+    return NarrationClassifier()
+
+
+def classify_narration(narration) -> str:
+    return get_classifier().classify(narration)
+
+
+@dataclass
+class NarrationRisk:
+    counts: dict = field(default_factory=dict)    # Category -> transactions
+    amounts: dict = field(default_factory=dict)   # Category -> Naira, both directions
+    outflow_shares: dict = field(default_factory=dict)  # Category -> share of all money out
+    risk_score: int = 0                           # 0 (no signals) to 100
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def summarise_risk(transactions, classifier=None) -> NarrationRisk:
+    """
+    Per-category counts and amounts over transactions (dicts with `type`,
+    `amount` in kobo, `narration`, and optionally a stored `risk_category`).
+    """
+    classifier = classifier or get_classifier()
+    classify = classifier.classify
+    counts = dict.fromkeys(classifier.categories, 0)
+    amounts = dict.fromkeys(classifier.categories, 0)
+    outflows = dict.fromkeys(classifier.categories, 0)
+    total_outflow = 0
+    for txn in transactions:
+        label = txn.get('risk_category')
+        if label is None:
+            label = classify(txn.get('narration'))
+        amount = txn.get('amount') or 0
+        if txn.get('type') == 'debit':
+            total_outflow += amount
+        if label in counts:
+            counts[label] += 1
+            amounts[label] += amount
+            if txn.get('type') == 'debit':
+                outflows[label] += amount
+
+    shares = {
+        category: round(outflows[category] / total_outflow, 4) if total_outflow else 0.0
+        for category in classifier.categories
+    }
+    score = sum(
+        rule['weight'] * min(1.0, shares.get(category, 0.0) / rule['saturation'])
+        for category, rule in RISK_WEIGHTS.items()
+    )
+    return NarrationRisk(
+        counts=counts,
+        amounts={category: round(value / 100, 2) for category, value in amounts.items()},
+        outflow_shares=shares,
+        risk_score=int(round(min(100.0, score))),
+    )
@@ -0,0 +1,153 @@
+"""
+Waits for Gemini file uploads to finish server-side processing.
+
+A single background thread tracks every in-flight upload and re-fetches
+each one with `client.files.get` on an exponential-backoff schedule,
+so a worker can keep many video analyses pending without spinning a
+CPU per upload.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FileProcessingError(Exception):
+    """Gemini reported the uploaded file as FAILED."""
+
+
+class FileProcessingTimeout(TimeoutError):
+    """
+    The uploaded file was still PROCESSING when its deadline passed. That is
+    Gemini being slow, not a bad file, so it counts as an upstream failure.
+    """
+
+
+def _state_name(uploaded_file) -> str | None:
+    state = getattr(uploaded_file, 'state', None)
+    return getattr(state, 'name', state)
+
+
+class _Pending:
+    def __init__(self, client, name, deadline, delay):
+        self.client = client
+        self.name = name
+        self.deadline = deadline
+        self.delay = delay
+        self.future = Future()
+
+
+class FileStatePoller:
+    """
+    Polls many uploads from one thread. `submit` returns a Future that
+    resolves to the ACTIVE file, or fails with FileProcessingError /
+    FileProcessingTimeout. The thread exits when nothing is pending.
+    """
+    def __init__(self, initial_delay=1.0, max_delay=10.0, multiplier=2.0, timeout=300.0):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.timeout = timeout
+        self._heap = []  # (next_poll_at, seq, _Pending)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, client, uploaded_file, timeout=None) -> Future:
+        state = _state_name(uploaded_file)
+        if state != "PROCESSING":
+            future = Future()
+            if state == "FAILED":
+                future.set_exception(FileProcessingError(f"Gemini failed to process {uploaded_file.name}"))
+            else:
+                future.set_result(uploaded_file)
+            return future
+
+        now = time.monotonic()
+        pending = _Pending(
+            client,
+            uploaded_file.name,
+            deadline=now + (timeout if timeout is not None else self.timeout),
+            delay=self.initial_delay
+        )
+        with self._cond:
+            self._push(now + pending.delay, pending)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="gemini-file-poller", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return pending.future
+
+    def wait(self, client, uploaded_file, timeout=None):
+        """Blocks (without spinning) until the file is ACTIVE."""
+        return self.submit(client, uploaded_file, timeout).result()
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def _push(self, when, pending):
+        heapq.heappush(self._heap, (min(when, pending.deadline), next(self._seq), pending))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._heap:
+                    self._thread = None
+                    return
+                next_at = self._heap[0][0]
+                now = time.monotonic()
+                if next_at > now:
+                    self._cond.wait(next_at - now)
+                    continue
+                _, _, pending = heapq.heappop(self._heap)
+
+            # Network call happens outside the lock so submit() never blocks on it
+            self._poll(pending)
+
+    def _poll(self, pending):
+        try:
+            uploaded_file = pending.client.files.get(name=pending.name)
+        except Exception as e:
+            logger.error(f"Polling Gemini file {pending.name} failed: {e}")
+            pending.future.set_exception(e)
+            return
+
+        state = _state_name(uploaded_file)
+        if state == "PROCESSING":
+            now = time.monotonic()
+            if now >= pending.deadline:
+                pending.future.set_exception(
+                    FileProcessingTimeout(f"Gemini file {pending.name} still processing after deadline")
+                )
+                return
+            pending.delay = min(pending.delay * self.multiplier, self.max_delay)
+            with self._cond:
+                self._push(now + pending.delay, pending)
+        elif state == "FAILED":
+            pending.future.set_exception(FileProcessingError(f"Gemini failed to process {pending.name}"))
+        else:
+            pending.future.set_result(uploaded_file)
+
+
+_default_poller = None
+_default_lock = threading.Lock()
+
+
+def get_file_poller() -> FileStatePoller:
+    """Process-wide poller shared by every verification."""
+    global _default_poller
+    with _default_lock:
+        if _default_poller is None:
+            _default_poller = FileStatePoller(
+                initial_delay=getattr(settings, 'GEMINI_FILE_POLL_INITIAL_DELAY', 1.0),
+                max_delay=getattr(settings, 'GEMINI_FILE_POLL_MAX_DELAY', 10.0),
+                timeout=getattr(settings, 'GEMINI_FILE_PROCESSING_TIMEOUT', 300.0),
+            )
+        return _default_poller
@@ -0,0 +1,207 @@
+"""
+CAC document preprocessing.
+
+SMEs upload multi-megabyte phone photos and multi-page PDFs, and the
+whole file used to go to Gemini as inline data. Before OCR we:
+
+  1. rasterize only the first page (PDFs, multi-frame TIFFs)
+  2. auto-crop the background margins and deskew the page
+  3. downscale to a target resolution
+  4. re-encode as a compact grayscale JPEG
+
+The work is CPU-bound, so it runs in a process pool rather than on the
+request or verification thread. If anything goes wrong the original
+bytes are sent unchanged.
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Pixels darker than this count as "ink" when cropping and deskewing
+INK_THRESHOLD = 160
+# Deskew search range and step, in degrees
+MAX_SKEW = 5.0
+SKEW_STEP = 0.5
+PDF_RENDER_DPI = 150
+
+
+@dataclass
+class PreprocessResult:
+    content: bytes
+    mime_type: str
+    original_bytes: int
+    processed_bytes: int
+    elapsed_ms: float
+    applied: bool
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.processed_bytes
+
+    def as_dict(self) -> dict:
+        return {
+            "originalBytes": self.original_bytes,
+            "processedBytes": self.processed_bytes,
+            "bytesSaved": self.bytes_saved,
+            "elapsedMs": round(self.elapsed_ms, 1),
+            "applied": self.applied,
+        }
+
+
+def _passthrough(content, mime_type, started) -> PreprocessResult:
+    return PreprocessResult(
+        content=content,
+        mime_type=mime_type,
+        original_bytes=len(content),
+        processed_bytes=len(content),
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+        applied=False,
+    )
+
+
+def _load_first_page(content: bytes, mime_type: str):
+    if mime_type == 'application/pdf' or content[:5] == b'%PDF-':
+        try:
+            import pypdfium2 as pdfium
+        except ImportError:
+            return None  # No PDF renderer installed: send the PDF as-is
+        pdf = pdfium.PdfDocument(content)
+        try:
+            return pdf[0].render(scale=PDF_RENDER_DPI / 72).to_pil()
+        finally:
+            pdf.close()
+
+    image = Image.open(BytesIO(content))
+    image.seek(0)  # First frame only
+    image.load()
+    return ImageOps.exif_transpose(image)
+
+
+def _ink_mask(gray):
+    return gray.point(lambda p: 255 if p < INK_THRESHOLD else 0)
+
+
+def _autocrop(gray, margin=0.02):
+    bbox = _ink_mask(gray).getbbox()
+    if not bbox:
+        return gray
+    pad_x = int(gray.width * margin)
+    pad_y = int(gray.height * margin)
+    left, top, right, bottom = bbox
+    return gray.crop((
+        max(0, left - pad_x),
+        max(0, top - pad_y),
+        min(gray.width, right + pad_x),
+        min(gray.height, bottom + pad_y),
+    ))
+
+
+def _row_variance(mask) -> float:
+    # Squashing to one column averages each row; aligned text lines give peaky rows
+    rows = mask.resize((1, mask.height), Image.BOX).tobytes()
+    mean = sum(rows) / len(rows)
+    return sum((value - mean) ** 2 for value in rows) / len(rows)
+
+
+def _estimate_skew(gray) -> float:
+    """Angle (degrees) that best aligns text lines with the horizontal."""
+    sample = _ink_mask(gray)
+    sample.thumbnail((400, 400))
+
+    best_angle, best_score = 0.0, _row_variance(sample)
+    steps = int(MAX_SKEW / SKEW_STEP)
+    for i in range(-steps, steps + 1):
+        angle = i * SKEW_STEP
+        if angle == 0:
+            continue
+        score = _row_variance(sample.rotate(angle, resample=Image.NEAREST, expand=True, fillcolor=0))
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def _deskew(gray):
+    angle = _estimate_skew(gray)
+    if angle == 0:
+        return gray
+    return gray.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+
+
+def preprocess_cac(content: bytes, mime_type: str, max_side=1600, quality=70) -> PreprocessResult:
+    """
+    Shrinks a CAC upload for OCR. Pure function (no Django access) so it
+    can run in a worker process.
+    """
+    started = time.perf_counter()
+    try:
+        image = _load_first_page(content, mime_type)
+        if image is None:
+            return _passthrough(content, mime_type, started)
+
+        gray = image.convert('L')
+        gray = _deskew(_autocrop(gray))
+        gray.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        buffer = BytesIO()
+        gray.save(buffer, format='JPEG', quality=quality, optimize=True)
+        processed = buffer.getvalue()
+    except Exception as e:
+        logger.warning(f"CAC preprocessing failed, sending original: {e}")
+        return _passthrough(content, mime_type, started)
+
+    if len(processed) >= len(content):
+        return _passthrough(content, mime_type, started)
+
+    return PreprocessResult(
+        content=processed,
+        mime_type='image/jpeg',
+        original_bytes=len(content),
+        processed_bytes=len(processed),
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+        applied=True,
+    )
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_preprocess_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: our callers are multi-threaded, and forking those is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'CAC_PREPROCESS_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def preprocess_cac_document(content: bytes, mime_type: str) -> PreprocessResult:
+    """Runs `preprocess_cac` in the process pool, falling back to the original bytes."""
+    started = time.perf_counter()
+    if not getattr(settings, 'CAC_PREPROCESS_ENABLED', True):
+        return _passthrough(content, mime_type, started)
+
+    try:
+        future = get_preprocess_pool().submit(
+            preprocess_cac,
+            content,
+            mime_type,
+            getattr(settings, 'CAC_PREPROCESS_MAX_SIDE', 1600),
+            getattr(settings, 'CAC_PREPROCESS_JPEG_QUALITY', 70),
+        )
+        return future.result(timeout=getattr(settings, 'CAC_PREPROCESS_TIMEOUT', 30))
+    except Exception as e:
+        logger.warning(f"CAC preprocessing pool unavailable, sending original: {e}")
+        return _passthrough(content, mime_type, started)
@@ -0,0 +1,314 @@
+"""
+Pluggable AI providers.
+
+The engines talk to `self.client.models.generate_content(...)` and
+`self.client.files.upload/get/delete(...)`, the subset of the google-genai
+client they use. `AIProvider` defines that surface, and `AI_PROVIDER`
+selects the backend:
+
+  gemini  the real API (default)
+  record  the real API, and every response is also saved to AI_REPLAY_DIR
+  replay  canned responses from AI_REPLAY_DIR, with injected latency and
+          errors, so the verification pipeline can be load-tested offline
+
+Whatever the backend, engines get it behind the shared quota limiter and
+circuit breaker, so replayed errors exercise the same deferral paths.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+
+from django.conf import settings
+from google.genai import errors as genai_errors
+
+from .breaker import get_circuit_breaker
+from .clients import get_genai_client
+from .ratelimit import RateLimitedClient, get_quota_limiter
+
+
+class ReplayMiss(LookupError):
+    """No recorded response matches the request, and there is no fallback."""
+
+
+class _Models:
+    def __init__(self, provider):
+        self._provider = provider
+
+    def generate_content(self, *, model, contents, config=None):
+        return self._provider.generate_content(model, contents, config)
+
+
+class _Files:
+    def __init__(self, provider):
+        self._provider = provider
+
+    def upload(self, *, file, config=None):
+        return self._provider.upload_file(file, config)
+
+    def get(self, *, name):
+        return self._provider.get_file(name)
+
+    def delete(self, *, name):
+        return self._provider.delete_file(name)
+
+
+class AIProvider(ABC):
+    """Text/multimodal generation plus file upload, shaped like a genai.Client."""
+    name = ''
+
+    def __init__(self):
+        self.models = _Models(self)
+        self.files = _Files(self)
+
+    @abstractmethod
+    def generate_content(self, model, contents, config=None):
+        """Returns a response with `.text` (and `.usage_metadata` when known)."""
+
+    @abstractmethod
+    def upload_file(self, file, config=None):
+        """Uploads a local file; returns an object with `.name` and `.state`."""
+
+    @abstractmethod
+    def get_file(self, name):
+        """Re-fetches an uploaded file (used to poll its processing state)."""
+
+    @abstractmethod
+    def delete_file(self, name):
+        """Removes an uploaded file."""
+
+
+class GeminiProvider(AIProvider):
+    name = 'gemini'
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    def generate_content(self, model, contents, config=None):
+        return self.client.models.generate_content(model=model, contents=contents, config=config)
+
+    def upload_file(self, file, config=None):
+        return self.client.files.upload(file=file, config=config)
+
+    def get_file(self, name):
+        return self.client.files.get(name=name)
+
+    def delete_file(self, name):
+        return self.client.files.delete(name=name)
+
+
+def _file_digest(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def replay_file_name(path) -> str:
+    """Stable name for an uploaded file, so recordings and replays agree."""
+    return f"files/replay-{_file_digest(path)[:16]}"
+
+
+def request_key(model, contents, file_aliases=None) -> str:
+    """Fingerprint of a generate_content request, used as the fixture file name."""
+    file_aliases = file_aliases or {}
+    if not isinstance(contents, (list, tuple)):
+        contents = [contents]
+    digest = hashlib.sha256(model.encode())
+    for part in contents:
+        if isinstance(part, str):
+            digest.update(b'text:' + part.encode())
+        elif getattr(part, 'inline_data', None) is not None:
+            digest.update(b'bytes:' + hashlib.sha256(part.inline_data.data).digest())
+        else:
+            name = getattr(part, 'name', '')
+            digest.update(b'file:' + file_aliases.get(name, name).encode())
+    return digest.hexdigest()
+
+
+def _prompt_text(contents) -> str:
+    if not isinstance(contents, (list, tuple)):
+        contents = [contents]
+    return " ".join(" ".join(part for part in contents if isinstance(part, str)).split())
+
+
+def _usage(total=None, prompt=None, candidates=None):
+    return SimpleNamespace(total_token_count=total, prompt_token_count=prompt, candidates_token_count=candidates)
+
+
+class ReplayProvider(AIProvider):
+    """
+    Serves responses recorded by RecordingProvider. `<key>.json` fixtures
+    match exact requests. `fallback.json` covers everything else: a list of
+    responses, each optionally limited to prompts that contain its
+    `contains` text. Latency is drawn from N(latency_ms, jitter_ms) and a
+    fraction `error_rate` of calls fail with `error_code`.
+    """
+    name = 'replay'
+
+    def __init__(self, directory, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, error_code=503,
+                 seed=None, sleep=time.sleep):
+        super().__init__()
+        self.directory = directory
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.sleep = sleep
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._fallback = None
+        self._files = {}
+        self.calls = 0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            directory=settings.AI_REPLAY_DIR,
+            latency_ms=getattr(settings, 'AI_REPLAY_LATENCY_MS', 0.0),
+            jitter_ms=getattr(settings, 'AI_REPLAY_LATENCY_JITTER_MS', 0.0),
+            error_rate=getattr(settings, 'AI_REPLAY_ERROR_RATE', 0.0),
+            error_code=getattr(settings, 'AI_REPLAY_ERROR_CODE', 503),
+            seed=getattr(settings, 'AI_REPLAY_SEED', None),
+        )
+
+    def _simulate_call(self):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self._random.gauss(self.latency_ms, self.jitter_ms)) if self.jitter_ms else self.latency_ms
+            fail = self._random.random() < self.error_rate
+        if delay:
+            self.sleep(delay / 1000.0)
+        if fail:
+            error_class = genai_errors.ClientError if self.error_code < 500 else genai_errors.ServerError
+            raise error_class(self.error_code, {'error': {'message': 'Injected replay error', 'status': 'UNAVAILABLE'}})
+
+    def _load_fallback(self) -> list:
+        if self._fallback is None:
+            path = os.path.join(self.directory, 'fallback.json')
+            try:
+                with open(path) as f:
+                    self._fallback = json.load(f)
+            except FileNotFoundError:
+                self._fallback = []
+        return self._fallback
+
+    def _lookup(self, key, contents) -> dict:
+        try:
+            with open(os.path.join(self.directory, f"{key}.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            pass
+        prompt = _prompt_text(contents)
+        candidates = [
+            fixture for fixture in self._load_fallback()
+            if fixture.get('contains', '') in prompt
+        ]
+        if not candidates:
+            raise ReplayMiss(f"No recorded response for request {key[:12]} in {self.directory}")
+        with self._lock:
+            return self._random.choice(candidates)
+
+    def generate_content(self, model, contents, config=None):
+        self._simulate_call()
+        fixture = self._lookup(request_key(model, contents), contents)
+        return SimpleNamespace(text=fixture['text'], usage_metadata=_usage(**fixture.get('usage', {})))
+
+    def upload_file(self, file, config=None):
+        self._simulate_call()
+        uploaded = SimpleNamespace(name=replay_file_name(file), state='ACTIVE')
+        with self._lock:
+            self._files[uploaded.name] = uploaded
+        return uploaded
+
+    def get_file(self, name):
+        with self._lock:
+            return self._files.get(name) or SimpleNamespace(name=name, state='ACTIVE')
+
+    def delete_file(self, name):
+        with self._lock:
+            self._files.pop(name, None)
+
+
+class RecordingProvider(AIProvider):
+    """Passes calls to `inner` and saves each response as a replay fixture."""
+    name = 'record'
+
+    def __init__(self, inner, directory):
+        super().__init__()
+        self.inner = inner
+        self.directory = directory
+        self._aliases = {}  # provider file name -> replay_file_name
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def generate_content(self, model, contents, config=None):
+        response = self.inner.generate_content(model, contents, config)
+        with self._lock:
+            key = request_key(model, contents, self._aliases)
+        usage = getattr(response, 'usage_metadata', None)
+        fixture = {
+            'model': model,
+            'prompt': _prompt_text(contents)[:200],
+            'text': response.text,
+            'usage': {
+                'total': getattr(usage, 'total_token_count', None),
+                'prompt': getattr(usage, 'prompt_token_count', None),
+                'candidates': getattr(usage, 'candidates_token_count', None),
+            },
+        }
+        tmp_path = os.path.join(self.directory, f"{key}.json.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(fixture, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.directory, f"{key}.json"))
+        return response
+
+    def upload_file(self, file, config=None):
+        uploaded = self.inner.upload_file(file, config)
+        with self._lock:
+            self._aliases[uploaded.name] = replay_file_name(file)
+        return uploaded
+
+    def get_file(self, name):
+        return self.inner.get_file(name)
+
+    def delete_file(self, name):
+        return self.inner.delete_file(name)
+
+
+def build_provider(name=None, api_key=None) -> AIProvider:
+    name = name or getattr(settings, 'AI_PROVIDER', 'gemini')
+    if name == 'gemini':
+        return GeminiProvider(get_genai_client(api_key))
+    if name == 'record':
+        return RecordingProvider(GeminiProvider(get_genai_client(api_key)), settings.AI_REPLAY_DIR)
+    if name == 'replay':
+        return ReplayProvider.from_settings()
+    raise ValueError(f"Unknown AI_PROVIDER '{name}'")
+
+
+_clients = {}  # (pid, provider name, api_key) -> RateLimitedClient
+_lock = threading.Lock()
+
+
+def get_ai_client(api_key=None) -> RateLimitedClient:
+    """
+    The client engines use: the configured provider behind the process's
+    quota limiter and circuit breaker. One per process.
+    """
+    name = getattr(settings, 'AI_PROVIDER', 'gemini')
+    key = (os.getpid(), name, api_key or settings.GOOGLE_AI_API_KEY)
+    with _lock:
+        if key not in _clients:
+            _clients[key] = RateLimitedClient(
+                build_provider(name, api_key),
+                get_quota_limiter(),
+                get_circuit_breaker()
+            )
+        return _clients[key]
@@ -0,0 +1,294 @@
+"""
+Client-side quota enforcement for Gemini calls.
+
+Gemini enforces requests-per-minute and tokens-per-minute per project.
+Every `generate_content` call first takes a request and an estimated
+token charge from a pair of token buckets, blocking until both are
+available. Once the response arrives, the estimate is corrected using
+the usage metadata Gemini reports.
+
+Bucket state lives in a small JSON file guarded by `flock`, so web
+workers, job workers and `manage.py rescore` on the same host all draw
+from one budget. Without a file (or on platforms without fcntl), the
+buckets are per-process.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Rough Gemini token costs used before the real usage is known
+CHARS_PER_TOKEN = 4
+IMAGE_TOKEN_ESTIMATE = 258
+FILE_TOKEN_ESTIMATE = 263 * 60  # An uploaded video, assuming about a minute of footage
+
+
+class MemoryBucketStore:
+    """Bucket state shared by the threads of one process."""
+    def __init__(self):
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def update(self, key, func):
+        """Atomically replaces state[key] with func(state[key])[0] and returns [1]."""
+        with self._lock:
+            new_state, result = func(self._state.get(key))
+            self._state[key] = new_state
+            return result
+
+
+class FileBucketStore:
+    """Bucket state in a JSON file, shared by every process on the host."""
+    def __init__(self, path):
+        self.path = path
+
+    def update(self, key, func):
+        # flock locks are per open file, so threads in one process exclude each other too
+        with open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    data = json.loads(f.read() or '{}')
+                except ValueError:
+                    data = {}
+                new_state, result = func(data.get(key))
+                data[key] = new_state
+                f.seek(0)
+                f.truncate()
+                json.dump(data, f)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return result
+
+
+class TokenBucket:
+    """
+    Refills `rate` units per minute up to `capacity`. The level may go
+    negative after `adjust` charges an under-estimate; later callers then
+    wait for that debt to be paid back.
+    """
+    def __init__(self, rate, capacity=None, store=None, key='bucket', clock=time.time, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.store = store or MemoryBucketStore()
+        self.key = key
+        # Wall-clock time, so timestamps written by other processes compare
+        self.clock = clock
+        self.sleep = sleep
+
+    def _level(self, state, now) -> float:
+        if state is None:
+            return self.capacity
+        level, updated = state
+        return min(self.capacity, level + max(0.0, now - updated) * self.rate / 60.0)
+
+    def try_acquire(self, amount=1) -> float:
+        """Takes `amount` if available and returns 0, otherwise returns the seconds to wait."""
+        # A single request larger than the bucket could never fit otherwise
+        amount = min(amount, self.capacity)
+        now = self.clock()
+
+        def take(state):
+            level = self._level(state, now)
+            if level >= amount:
+                return [level - amount, now], 0.0
+            return [level, now], (amount - level) * 60.0 / self.rate
+
+        return self.store.update(self.key, take)
+
+    def acquire(self, amount=1):
+        """Blocks until `amount` units have been taken."""
+        if amount <= 0:
+            return
+        while True:
+            wait = self.try_acquire(amount)
+            if wait <= 0:
+                return
+            self.sleep(wait)
+
+    def adjust(self, delta):
+        """Charges (positive) or refunds (negative) units after the fact."""
+        now = self.clock()
+        self.store.update(self.key, lambda state: ([min(self.capacity, self._level(state, now) - delta), now], None))
+
+
+class QuotaWaits:
+    """Seconds a piece of work has spent blocked in QuotaLimiter.acquire, including a wait still in progress."""
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.waited = 0.0
+        self.waiting_since = None
+        self._lock = threading.Lock()
+
+    def begin(self):
+        with self._lock:
+            self.waiting_since = self.clock()
+
+    def end(self):
+        with self._lock:
+            self.waited += self.clock() - self.waiting_since
+            self.waiting_since = None
+
+    def total(self) -> float:
+        with self._lock:
+            current = self.clock() - self.waiting_since if self.waiting_since is not None else 0.0
+            return self.waited + current
+
+
+_tracked = threading.local()
+
+
+@contextmanager
+def track_quota_waits(waits):
+    """Adds the time this thread spends waiting for quota to `waits`."""
+    previous = getattr(_tracked, 'waits', None)
+    _tracked.waits = waits
+    try:
+        yield waits
+    finally:
+        _tracked.waits = previous
+
+
+class QuotaLimiter:
+    """Requests-per-minute plus tokens-per-minute budget shared by many threads."""
+    def __init__(self, requests_per_minute, tokens_per_minute, store=None, clock=time.time, sleep=time.sleep):
+        store = store or MemoryBucketStore()
+        self.requests = TokenBucket(requests_per_minute, store=store, key='gemini:requests', clock=clock, sleep=sleep)
+        self.tokens = TokenBucket(tokens_per_minute, store=store, key='gemini:tokens', clock=clock, sleep=sleep)
+        self._acquire_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, requests_per_minute=None, tokens_per_minute=None):
+        return cls(
+            requests_per_minute or getattr(settings, 'GEMINI_REQUESTS_PER_MINUTE', 1000),
+            tokens_per_minute or getattr(settings, 'GEMINI_TOKENS_PER_MINUTE', 1000000),
+            store=get_bucket_store(),
+        )
+
+    def acquire(self, estimated_tokens=0):
+        waits = getattr(_tracked, 'waits', None)
+        if waits is not None:
+            waits.begin()
+        try:
+            # Callers queue up one at a time so a large request is not starved
+            # by a stream of small ones grabbing tokens as they trickle in
+            with self._acquire_lock:
+                self.requests.acquire(1)
+                self.tokens.acquire(estimated_tokens)
+        finally:
+            if waits is not None:
+                waits.end()
+
+    def settle(self, estimated_tokens, actual_tokens):
+        if actual_tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+
+_store = None
+_limiter = None
+_lock = threading.Lock()
+
+
+def get_bucket_store():
+    """File-backed store when GEMINI_RATE_LIMIT_FILE is set (and fcntl exists), else in-memory."""
+    global _store
+    with _lock:
+        if _store is None:
+            path = getattr(settings, 'GEMINI_RATE_LIMIT_FILE', '')
+            _store = FileBucketStore(path) if path and fcntl else MemoryBucketStore()
+        return _store
+
+
+def get_quota_limiter() -> QuotaLimiter:
+    """Process-wide limiter used by every engine."""
+    global _limiter
+    if _limiter is None:
+        limiter = QuotaLimiter.from_settings()
+        with _lock:
+            if _limiter is None:
+                _limiter = limiter
+    return _limiter
+
+
+def estimate_tokens(contents, max_output_tokens=256) -> int:
+    """Estimates what a generate_content call will count against the TPM quota."""
+    if not isinstance(contents, (list, tuple)):
+        contents = [contents]
+    total = max_output_tokens
+    for part in contents:
+        if isinstance(part, str):
+            total += len(part) // CHARS_PER_TOKEN + 1
+        elif getattr(part, 'inline_data', None) is not None:
+            total += IMAGE_TOKEN_ESTIMATE
+        else:
+            total += FILE_TOKEN_ESTIMATE
+    return total
+
+
+def _call(breaker, func):
+    return breaker.call(func) if breaker is not None else func()
+
+
+class _RateLimitedModels:
+    def __init__(self, models, limiter, breaker):
+        self._models = models
+        self._limiter = limiter
+        self._breaker = breaker
+
+    def generate_content(self, *, contents, config=None, **kwargs):
+        max_output_tokens = getattr(config, 'max_output_tokens', None) or 256
+        estimated = estimate_tokens(contents, max_output_tokens)
+
+        def call():
+            self._limiter.acquire(estimated)
+            return self._models.generate_content(contents=contents, config=config, **kwargs)
+
+        response = _call(self._breaker, call)
+        usage = getattr(response, 'usage_metadata', None)
+        self._limiter.settle(estimated, getattr(usage, 'total_token_count', None))
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._models, name)
+
+
+class _RateLimitedFiles:
+    def __init__(self, files, limiter, breaker):
+        self._files = files
+        self._limiter = limiter
+        self._breaker = breaker
+
+    def upload(self, **kwargs):
+        def call():
+            self._limiter.acquire()
+            return self._files.upload(**kwargs)
+        return _call(self._breaker, call)
+
+    def __getattr__(self, name):
+        # Polling and cleanup (get/delete) are cheap and must not be blocked
+        return getattr(self._files, name)
+
+
+class RateLimitedClient:
+    """
+    Wraps a `genai.Client` so `models.generate_content` and `files.upload`
+    go through a QuotaLimiter and, optionally, a circuit breaker (which
+    turns upstream failures into `UpstreamUnavailable`). Everything else
+    passes straight through.
+    """
+    def __init__(self, client, limiter, breaker=None):
+        self._client = client
+        self.models = _RateLimitedModels(client.models, limiter, breaker)
+        self.files = _RateLimitedFiles(client.files, limiter, breaker)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
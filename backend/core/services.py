@@ -1,27 +1,106 @@
-from sme.models import BusinessProfile, CACDocument, BusinessVideo, Score
+from sme.models import BusinessProfile, CACDocument, BusinessVideo, Score, ScoreCheck
+from sme.identity import find_collisions, names_match
 from users.models import User
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
 import google.genai as genai
 from mimetypes import guess_type
 import logging
-import requests  # Added for ProfitEngine
 import json      # Added for ProfitEngine
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from .breaker import UpstreamUnavailable, is_upstream_failure
+from .clients import PooledClientMixin
+from .polling import get_file_poller
+from .preprocessing import preprocess_cac_document
+from .keyframes import extract_keyframes, KeyframeExtractionError
+from .cashflow import extract_features
+from .compaction import PromptBudgetExceeded, compact_transactions, estimate_text_tokens
+from .ratelimit import QuotaWaits, track_quota_waits
+from .narrations import summarise_risk
+from .mono import MonoClient, MonoError, account_transactions, sync_transactions
+from .cache import ExtractionCache, file_sha256, prompt_fingerprint
+from .models import AIResultCache
+import hashlib
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
-class PulseEngine:
+GEMINI_MODEL = 'gemini-2.5-flash'
+# Bump these when a prompt changes so cached AI results are not reused
+CAC_PROMPT_VERSION = 'cac-name-v1'
+VIDEO_PROMPT_VERSION = 'video-industry-v1'
+
+# Points won (or lost) by each AI check, and how it is described in fail reasons
+AI_CHECKS = {
+    'cac': {'weight': 40, 'label': 'CAC document'},
+    'video': {'weight': 20, 'label': 'business video'},
+}
+
+IDENTITY_LABELS = {
+    'name': 'business name',
+    'rc_number': 'RC number',
+    'bank_account_number': 'bank account number',
+}
+
+# How often a verification waiting on Gemini relays progress events (seconds)
+EVENT_FLUSH_INTERVAL = 0.25
+
+# A check that times out after spending this share of its deadline waiting
+# for Gemini quota was throttled, not slow on the SME's data: it is deferred
+THROTTLED_TIMEOUT_SHARE = 0.5
+
+_check_pool = None
+_check_pool_lock = threading.Lock()
+
+
+def check_fingerprint(*inputs) -> str:
+    """Digest of everything a check's outcome depends on; equal fingerprints mean the result can be reused."""
+    digest = hashlib.sha256()
+    for value in inputs:
+        digest.update(str(value or '').encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def get_check_pool() -> ThreadPoolExecutor:
+    """Process-wide pool that runs the Gemini side of verification checks."""
+    global _check_pool
+    with _check_pool_lock:
+        if _check_pool is None:
+            _check_pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'PULSE_CHECK_WORKERS', 8),
+                thread_name_prefix='pulse-check'
+            )
+        return _check_pool
+
+
+class PulseEngine(PooledClientMixin):
     """
     The Core "Pulse Engine" AI Service.
     Implements real AI analysis for CAC and Video.
     Implements real bank name comparison from Mono.
     """
-    def __init__(self, user: User, bank_account_name: str):
+    def __init__(self, user: User, bank_account_name: str, on_event=None):
         self.user = user
         self.bank_account_name = bank_account_name # Store the name
+        # Progress callback, on_event(stage, status, data); always invoked on this thread
+        self.on_event = on_event
+        self._events = queue.SimpleQueue()
         self.score = 0
         self.fail_reasons = []
-        self.client = genai.Client(api_key=settings.GOOGLE_AI_API_KEY)
+        self.deferred = []  # Checks skipped because Gemini was unavailable; retry, don't score
+        self.collisions = {}  # Identifiers shared with other profiles (see sme.identity)
+        self.review_flags = []  # Reasons for a human to look at the profile; never fail verification
+        self.checks = {}  # Per-check outcome: points, fail reasons, input fingerprint
+        self.previous_checks = {}  # ScoreCheck rows of the latest score, by name
+        self.score_record = None  # The Score row this run saved
+        self.cache = ExtractionCache()
+        self.check_timeouts = getattr(settings, 'PULSE_CHECK_TIMEOUTS', {'cac': 60, 'video': 300})
         self.generation_config = {
             "temperature": 0.2,
             "top_p": 1,
@@ -42,78 +121,283 @@ class PulseEngine:
             self.profile = BusinessProfile.objects.get(user=self.user)
         except BusinessProfile.DoesNotExist:
             self.fail_reasons.append("Business Profile (Stated Truth) is missing.")
+            self._emit('verification', 'finished', pulseScore=0, failReason="Business Profile is missing.")
+            self._flush_events()
             return 0, "Business Profile is missing."
 
-        # 2. Run AI Analysis & Cross-Referencing
-        self.verify_cac_vs_stated()       # REAL AI
+        self._emit('verification', 'started')
+        if self.profile.latest_score_id:
+            self.previous_checks = {
+                check.name: check for check in ScoreCheck.objects.filter(score_id=self.profile.latest_score_id)
+            }
+
+        # 2. Run AI Analysis & Cross-Referencing.
+        # The CAC and video checks are independent Gemini calls, so they run
+        # concurrently, each against its own deadline. Pool threads only talk
+        # to Gemini; loading inputs, scoring and saving happen on this thread.
+        started = time.monotonic()
+        checks = {
+            'cac': (self._prepare_cac, self._analyse_cac, self._finish_cac),
+            'video': (self._prepare_video, self._analyse_video, self._finish_video),
+        }
+        pending = {}
+        for name, (prepare, analyse, finish) in checks.items():
+            check = self._guarded(name, prepare)
+            if check is not None and not self._reuse(name, check['fingerprint']):
+                self._emit(name, 'started', cached=check['cached'] is not None)
+                waits = QuotaWaits()
+                pending[name] = (check, waits, get_check_pool().submit(self._run_tracked, analyse, check, waits))
+
         self.verify_bank_vs_stated()      # REAL COMPARISON
-        self.verify_video_vs_stated()     # REAL AI
+        self.verify_identity_unique()
+        self._flush_events()
+
+        for name, (check, waits, future) in pending.items():
+            finish = checks[name][2]
+            timeout = self.check_timeouts.get(name, 300)
+            try:
+                analysis = self._wait_for(future, started + timeout)
+            except FutureTimeoutError:
+                never_started = future.cancel()
+                throttled = waits.total()
+                if never_started or throttled >= timeout * THROTTLED_TIMEOUT_SHARE:
+                    # Stuck behind the quota limiter (or other checks that were): not the SME's fault
+                    logger.warning(
+                        f"{name} verification deferred for {self.user.email}: timed out after "
+                        f"{'waiting for a worker' if never_started else f'{throttled:.1f}s waiting for Gemini quota'}"
+                    )
+                    self.deferred.append(name)
+                    self._emit(name, 'deferred')
+                    continue
+                logger.error(f"{name} verification timed out for {self.user.email}")
+                self._record(-AI_CHECKS[name]['weight'], f"AI analysis of {AI_CHECKS[name]['label']} timed out.", check=name)
+                self._emit(name, 'timed_out', points=-AI_CHECKS[name]['weight'])
+                continue
+            except Exception as e:
+                self._check_failed(name, e)
+                continue
+            self._guarded(name, finish, check, analysis)
 
         final_score = max(0, min(100, self.score))
         fail_reason_str = "; ".join(self.fail_reasons) if self.fail_reasons else None
+        if not self.deferred:
+            self._save_score(final_score, fail_reason_str)
+        self._emit('verification', 'finished', pulseScore=final_score, failReason=fail_reason_str, deferred=self.deferred,
+                   reviewFlags=self.review_flags)
+        self._flush_events()
         
         return final_score, fail_reason_str
 
+    @staticmethod
+    def _run_tracked(analyse, check, waits):
+        """Runs a check's Gemini work on a pool thread, timing its waits for quota."""
+        with track_quota_waits(waits):
+            return analyse(check)
+
+    def _emit(self, stage, status, **data):
+        """Queues a progress event. Safe to call from the check pool threads."""
+        if self.on_event is not None:
+            self._events.put((stage, status, data))
+
+    def _flush_events(self):
+        """Hands queued events to on_event; only called from the thread running the verification."""
+        while True:
+            try:
+                stage, status, data = self._events.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                self.on_event(stage, status, data)
+            except Exception as e:
+                logger.error(f"Recording verification event {stage}/{status} failed: {e}")
+
+    def _wait_for(self, future, deadline):
+        """Waits for a check's Gemini work, relaying its progress events in the meantime."""
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                return future.result(timeout=max(0, min(remaining, EVENT_FLUSH_INTERVAL)))
+            except FutureTimeoutError:
+                self._flush_events()
+                if remaining <= EVENT_FLUSH_INTERVAL:
+                    raise
+
+    def _record(self, points, fail_reason=None, check=None, fingerprint=''):
+        """
+        Applies a check outcome. Only called from the thread running run_verification.
+        A fingerprint is only given for outcomes that may be reused by a later run.
+        """
+        self.score += points
+        if fail_reason:
+            self.fail_reasons.append(fail_reason)
+        if check is not None:
+            outcome = self.checks.setdefault(check, {'points': 0, 'fail_reasons': [], 'fingerprint': '', 'reused': False})
+            outcome['points'] += points
+            if fail_reason:
+                outcome['fail_reasons'].append(fail_reason)
+            outcome['fingerprint'] = fingerprint
+
+    def _reuse(self, name, fingerprint) -> bool:
+        """Applies the previous run's outcome for a check whose inputs have not changed."""
+        previous = self.previous_checks.get(name)
+        if previous is None or not previous.fingerprint or previous.fingerprint != fingerprint:
+            return False
+        # Stored reasons are "; "-joined, like the score's own fail reason
+        self._record(previous.points, previous.fail_reason or None, check=name, fingerprint=fingerprint)
+        self.checks[name]['reused'] = True
+        self._emit(name, 'reused', points=previous.points)
+        return True
+
+    def _save_score(self, pulse_score, fail_reason):
+        """Stores this run as the user's next Score version, with its per-check outcomes."""
+        with transaction.atomic():
+            # Serializes concurrent runs for one user, so versions don't collide
+            profile = BusinessProfile.objects.select_for_update().get(pk=self.profile.pk)
+            version = (Score.objects.filter(user=self.user).aggregate(last=Max('version'))['last'] or 0) + 1
+            self.score_record = Score.objects.create(
+                user=self.user,
+                version=version,
+                pulse_score=pulse_score,
+                profit_score=profile.profit_score,
+                status=Score.Status.FAILED if fail_reason else Score.Status.VERIFIED,
+                pulse_fail_reason=fail_reason,
+                review_flags=self.review_flags
+            )
+            ScoreCheck.objects.bulk_create([
+                ScoreCheck(
+                    score=self.score_record,
+                    name=name,
+                    points=outcome['points'],
+                    fail_reason="; ".join(outcome['fail_reasons']),
+                    fingerprint=outcome['fingerprint'],
+                    reused=outcome['reused']
+                )
+                for name, outcome in self.checks.items()
+            ])
+            BusinessProfile.objects.filter(pk=profile.pk).update(latest_score=self.score_record)
+        self.profile.latest_score = self.score_record
+
+    def _guarded(self, name, step, *args):
+        """Runs one step of an AI check, turning errors into the check's failure penalty."""
+        try:
+            return step(*args)
+        except Exception as e:
+            self._check_failed(name, e)
+            return None
+
+    def _check_failed(self, name, error):
+        """Penalises a failed check, unless Gemini itself was at fault (then it is deferred)."""
+        if is_upstream_failure(error):
+            logger.warning(f"{name} verification deferred for {self.user.email}: {error}")
+            self.deferred.append(name)
+            self._emit(name, 'deferred')
+            return
+        logger.error(f"{name} verification failed for {self.user.email}: {error}")
+        self._record(-AI_CHECKS[name]['weight'], f"AI analysis of {AI_CHECKS[name]['label']} failed.", check=name)
+        self._emit(name, 'failed', points=-AI_CHECKS[name]['weight'])
+
     def verify_cac_vs_stated(self):
         """
         Performs REAL OCR on CAC and compares to Stated Truth
         """
+        check = self._guarded('cac', self._prepare_cac)
+        if check is not None:
+            analysis = self._guarded('cac', self._analyse_cac, check)
+            if analysis is not None:
+                self._guarded('cac', self._finish_cac, check, analysis)
+        self._flush_events()
+
+    def _prepare_cac(self):
+        """Loads the CAC file and any cached extraction for it."""
         try:
             cac_doc = CACDocument.objects.get(user=self.user)
         except CACDocument.DoesNotExist:
-            self.score -= 40
-            self.fail_reasons.append("CAC document missing.")
-            return
+            self._record(-40, "CAC document missing.", check='cac')
+            self._emit('cac', 'missing', points=-40)
+            return None
 
-        try:
-            # Read file from storage
-            cac_file = cac_doc.cac_file
-            cac_file.open(mode='rb')
-            file_content = cac_file.read()
-            cac_file.close()
+        # Read file from storage
+        cac_file = cac_doc.cac_file
+        cac_file.open(mode='rb')
+        file_content = cac_file.read()
+        cac_file.close()
+
+        content_hash = hashlib.sha256(file_content).hexdigest()
+        return {
+            'doc': cac_doc,
+            'content': file_content,
+            'mime_type': guess_type(cac_file.name)[0],
+            'content_hash': content_hash,
+            # The outcome depends on the document and the name it is compared to
+            'fingerprint': check_fingerprint(CAC_PROMPT_VERSION, GEMINI_MODEL, content_hash, self.profile.business_name),
+            'cached': self.cache.get(AIResultCache.Kind.CAC, content_hash, CAC_PROMPT_VERSION, GEMINI_MODEL),
+        }
 
-            mime_type = guess_type(cac_file.name)[0]
-            
-            prompt = """
-            You are an expert Nigerian CAC document analyst.
-            Analyze this image of a Certificate of Incorporation or Business Name Registration.
-            Extract *only* the registered business name, exactly as it appears.
-            Do not add any other text, just the name.
-            Example: "MY BUSINESS NIGERIA LTD"
-            """
-            
-            response = self.client.models.generate_content(
-                model='gemini-2.5-flash',
-                contents=[
-                    prompt,
-                    {"mime_type": mime_type, "data": file_content}
-                ],
-                config=genai.types.GenerateContentConfig(
-                    temperature=0.2,
-                    top_p=1,
-                    top_k=1,
-                    max_output_tokens=256,
-                    safety_settings=self.safety_settings
-                )
+    def _analyse_cac(self, check):
+        """Extracts the registered name from the CAC document (Gemini only, no DB)."""
+        if check['cached'] is not None:
+            return check['cached']
+
+        prompt = """
+        You are an expert Nigerian CAC document analyst.
+        Analyze this image of a Certificate of Incorporation or Business Name Registration.
+        Extract *only* the registered business name, exactly as it appears.
+        Do not add any other text, just the name.
+        Example: "MY BUSINESS NIGERIA LTD"
+        """
+        
+        # Shrink the upload (first page, crop, deskew, downscale) before sending it inline
+        document = preprocess_cac_document(check['content'], check['mime_type'])
+        self._emit('cac', 'ocr_started', bytes=document.processed_bytes)
+        
+        started = time.monotonic()
+        response = self.client.models.generate_content(
+            model=GEMINI_MODEL,
+            contents=[
+                prompt,
+                genai.types.Part.from_bytes(data=document.content, mime_type=document.mime_type)
+            ],
+            config=genai.types.GenerateContentConfig(
+                temperature=0.2,
+                top_p=1,
+                top_k=1,
+                max_output_tokens=256,
+                safety_settings=self.safety_settings
             )
-            
-            extracted_name = response.text.strip().replace('"', '')
-            cac_doc.extracted_name = extracted_name # Save for our records
-            
-            # Use 'in' for a more flexible match
-            if self.profile.business_name.lower() in extracted_name.lower():
-                self.score += 40 # Heavy weight for matching names
-                cac_doc.verified = True
-            else:
-                self.score -= 40
-                self.fail_reasons.append(f"CAC name ({extracted_name}) does not match profile name ({self.profile.business_name}).")
-            
-            cac_doc.save()
+        )
+        logger.info(
+            f"CAC OCR for {self.user.email}: {document.original_bytes} -> {document.processed_bytes} bytes "
+            f"({document.bytes_saved} saved, preprocessing {document.elapsed_ms:.0f}ms, "
+            f"model call {(time.monotonic() - started) * 1000:.0f}ms)"
+        )
+        return {
+            'extracted_name': response.text.strip().replace('"', ''),
+            'raw_response': response.text,
+            'preprocessing': document.as_dict(),
+        }
+
+    def _finish_cac(self, check, analysis):
+        """Compares the extracted name to the Stated Truth and saves the result."""
+        cac_doc = check['doc']
+        extracted_name = analysis['extracted_name']
+        if check['cached'] is None:
+            self.cache.put(
+                AIResultCache.Kind.CAC, check['content_hash'], CAC_PROMPT_VERSION, GEMINI_MODEL,
+                {'extracted_name': extracted_name}, analysis['raw_response']
+            )
+        cac_doc.extracted_name = extracted_name # Save for our records
         
-        except Exception as e:
-            logger.error(f"CAC verification failed for {self.user.email}: {e}")
-            self.score -= 40
-            self.fail_reasons.append("AI analysis of CAC document failed.")
+        # Normalized match: ignores LTD/LIMITED/NIG, punctuation and word order
+        if names_match(self.profile.business_name, extracted_name):
+            self._record(40, check='cac', fingerprint=check['fingerprint']) # Heavy weight for matching names
+            cac_doc.verified = True
+        else:
+            self._record(-40, f"CAC name ({extracted_name}) does not match profile name ({self.profile.business_name}).",
+                         check='cac', fingerprint=check['fingerprint'])
+        
+        cac_doc.save()
+        self._emit('cac', 'finished', matched=cac_doc.verified, points=40 if cac_doc.verified else -40,
+                   extractedName=extracted_name)
 
     def verify_bank_vs_stated(self):
         """
@@ -121,100 +405,203 @@ class PulseEngine:
         The name is fetched by the view and passed in.
         """
         if not self.bank_account_name:
-            self.score -= 40
-            self.fail_reasons.append("Bank account name could not be retrieved from Mono.")
+            self._record(-40, "Bank account name could not be retrieved from Mono.", check='bank')
+            self._emit('bank', 'missing', points=-40)
+            return
+
+        fingerprint = check_fingerprint('bank-name-v1', self.bank_account_name, self.profile.business_name)
+        if self._reuse('bank', fingerprint):
             return
 
-        # Real comparison. Use 'in' for flexibility (e.g., "My Biz LTD" vs "My Biz")
-        if self.profile.business_name.lower() in self.bank_account_name.lower():
-            self.score += 40 # Heavy weight for matching names
+        # Real comparison, normalized for flexibility (e.g., "My Biz LTD" vs "MY BIZ LIMITED")
+        if names_match(self.profile.business_name, self.bank_account_name):
+            self._record(40, check='bank', fingerprint=fingerprint) # Heavy weight for matching names
+            self._emit('bank', 'finished', matched=True, points=40)
         else:
-            self.score -= 40
-            self.fail_reasons.append(f"Bank account name ({self.bank_account_name}) does not match profile name ({self.profile.business_name}).")
+            self._record(-40, f"Bank account name ({self.bank_account_name}) does not match profile name ({self.profile.business_name}).",
+                         check='bank', fingerprint=fingerprint)
+            self._emit('bank', 'finished', matched=False, points=-40)
+
+    def verify_identity_unique(self):
+        """
+        Flags a profile whose name, RC number or bank account is already used
+        by other businesses. Uses the indexed identity table, not a scan of
+        the profiles; flagged for review without changing the score.
+        """
+        self.collisions = find_collisions(self.profile)
+        if self.collisions:
+            # Depends on every other profile, so it is re-checked on each run
+            self._record(0, check='identity')
+        for field, profile_ids in self.collisions.items():
+            self.review_flags.append(
+                f"Identity collision: {IDENTITY_LABELS[field]} is also used by {len(profile_ids)} other business profile(s)."
+            )
+        self._emit('identity', 'finished', collisions=sorted(self.collisions))
 
     def verify_video_vs_stated(self):
         """
         Performs REAL AI video analysis and compares to Stated Truth
         """
+        check = self._guarded('video', self._prepare_video)
+        if check is not None:
+            analysis = self._guarded('video', self._analyse_video, check)
+            if analysis is not None:
+                self._guarded('video', self._finish_video, check, analysis)
+        self._flush_events()
+
+    def _prepare_video(self):
+        """Locates the video, builds the prompt and looks up any cached analysis."""
         try:
             video_doc = BusinessVideo.objects.get(user=self.user)
         except BusinessVideo.DoesNotExist:
-            self.score -= 20
-            self.fail_reasons.append("Business Video missing.")
-            return
-
-        try:
-            # Read file from storage
-            video_file_path = video_doc.video_file.path
-            mime_type = guess_type(video_file_path)[0]
-            
-            # Upload file to Gemini File API first (good for large files)
-            uploaded_file = self.client.files.upload(
-                file=video_file_path,
-                display_name=f"video_{self.user.id}"
-            )
-            # Wait for file to be processed
-            while uploaded_file.state.name == "PROCESSING":
-                pass # This is blocking, but fine for a hackathon
-
-            if uploaded_file.state.name == "FAILED":
-                raise Exception("Gemini file upload failed.")
+            self._record(-20, "Business Video missing.", check='video')
+            self._emit('video', 'missing', points=-20)
+            return None
 
-            prompt = f"""
-            Analyze this live video recording of a small business.
-            The business owner states their industry is: '{self.profile.industry}'.
-            The business name is '{self.profile.business_name}'.
+        prompt = f"""
+        Analyze this live video recording of a small business.
+        The business owner states their industry is: '{self.profile.industry}'.
+        The business name is '{self.profile.business_name}'.
 
-            Analyze the video for visual cues (e.g., products, office, equipment, signage).
-            1. Briefly summarize what you see.
-            2. Based *only* on the visuals, state "YES" if this summary is consistent with the stated industry, or "NO" if it is not.
+        Analyze the video for visual cues (e.g., products, office, equipment, signage).
+        1. Briefly summarize what you see.
+        2. Based *only* on the visuals, state "YES" if this summary is consistent with the stated industry, or "NO" if it is not.
 
-            Format your response as:
-            Summary: [Your summary]
-            Match: [YES/NO]
-            """
+        Format your response as:
+        Summary: [Your summary]
+        Match: [YES/NO]
+        """
+        # The prompt embeds industry/name, so they are part of the cache key,
+        # as is the sampling mode (the model sees different inputs)
+        keyframe_mode = getattr(settings, 'VIDEO_KEYFRAME_MODE', False)
+        content_hash = file_sha256(video_doc.video_file)
+        prompt_version = prompt_fingerprint(
+            VIDEO_PROMPT_VERSION + (':keyframes' if keyframe_mode else ''),
+            prompt
+        )
+        return {
+            'doc': video_doc,
+            'path': video_doc.video_file.path,
+            'prompt': prompt,
+            'keyframe_mode': keyframe_mode,
+            'content_hash': content_hash,
+            'prompt_version': prompt_version,
+            # The prompt carries the industry and name; the business description is not an input
+            'fingerprint': check_fingerprint(prompt_version, GEMINI_MODEL, content_hash),
+            'cached': self.cache.get(AIResultCache.Kind.VIDEO, content_hash, prompt_version, GEMINI_MODEL),
+        }
 
-            response = self.client.models.generate_content(
-                model='gemini-2.5-flash',
-                contents=[prompt, uploaded_file],
-                config=genai.types.GenerateContentConfig(
-                    temperature=0.2,
-                    top_p=1,
-                    top_k=1,
-                    max_output_tokens=256,
-                    safety_settings=self.safety_settings
-                )
+    def _analyse_video(self, check):
+        """
+        Asks Gemini for a summary and industry match (Gemini only, no DB).
+        In keyframe mode a few scene-change frames are sent inline; the full
+        upload is only used if sampling fails.
+        """
+        if check['cached'] is not None:
+            return check['cached']
+
+        if check['keyframe_mode']:
+            try:
+                return self._analyse_video_keyframes(check)
+            except KeyframeExtractionError as e:
+                logger.warning(f"Keyframe sampling failed for {self.user.email}, uploading full video: {e}")
+        return self._analyse_video_upload(check)
+
+    def _analyse_video_keyframes(self, check):
+        frames = extract_keyframes(
+            check['path'],
+            max_frames=getattr(settings, 'VIDEO_KEYFRAME_COUNT', 6),
+            scene_threshold=getattr(settings, 'VIDEO_KEYFRAME_SCENE_THRESHOLD', 0.3),
+            max_side=getattr(settings, 'VIDEO_KEYFRAME_MAX_SIDE', 640),
+        )
+        self._emit('video', 'analysing', keyframes=len(frames))
+        prompt = (
+            f"The video is provided as {len(frames)} keyframes sampled at scene changes, in order.\n"
+            + check['prompt']
+        )
+        response = self.client.models.generate_content(
+            model=GEMINI_MODEL,
+            contents=[prompt] + [
+                genai.types.Part.from_bytes(data=frame, mime_type='image/jpeg') for frame in frames
+            ],
+            config=genai.types.GenerateContentConfig(
+                temperature=0.2,
+                top_p=1,
+                top_k=1,
+                max_output_tokens=256,
+                safety_settings=self.safety_settings
             )
-
-            # Clean up the file from Gemini
+        )
+        return self._parse_video_response(response.text)
+
+    def _analyse_video_upload(self, check):
+        # Upload file to Gemini File API first (good for large files)
+        self._emit('video', 'uploading', bytes=os.path.getsize(check['path']))
+        uploaded_file = self.client.files.upload(
+            file=check['path'],
+            config={"display_name": f"video_{self.user.id}"}
+        )
+        self._emit('video', 'processing')
+        # Wait for file to be processed (backoff polling, shared thread)
+        try:
+            uploaded_file = get_file_poller().wait(self.client, uploaded_file)
+        except Exception:
             self.client.files.delete(name=uploaded_file.name)
+            raise
+        self._emit('video', 'analysing')
+
+        response = self.client.models.generate_content(
+            model=GEMINI_MODEL,
+            contents=[check['prompt'], uploaded_file],
+            config=genai.types.GenerateContentConfig(
+                temperature=0.2,
+                top_p=1,
+                top_k=1,
+                max_output_tokens=256,
+                safety_settings=self.safety_settings
+            )
+        )
 
-            response_text = response.text
-            summary_line = next((line for line in response_text.split('\n') if line.startswith("Summary:")), "Summary: N/A")
-            match_line = next((line for line in response_text.split('\n') if line.startswith("Match:")), "Match: NO")
-            
-            summary = summary_line.split(":", 1)[-1].strip()
-            match = match_line.split(":", 1)[-1].strip()
+        # Clean up the file from Gemini
+        self.client.files.delete(name=uploaded_file.name)
 
-            video_doc.video_summary = summary # Save for our records
-            
-            if match == "YES":
-                self.score += 20
-                video_doc.verified = True
-            else:
-                self.score -= 20
-                self.fail_reasons.append(f"Video summary ({summary}) does not match stated industry ({self.profile.industry}).")
-            
-            video_doc.save()
+        return self._parse_video_response(response.text)
 
-        except Exception as e:
-            logger.error(f"Video verification failed for {self.user.email}: {e}")
-            self.score -= 20
-            self.fail_reasons.append("AI analysis of business video failed.")
+    def _parse_video_response(self, response_text):
+        summary_line = next((line for line in response_text.split('\n') if line.startswith("Summary:")), "Summary: N/A")
+        match_line = next((line for line in response_text.split('\n') if line.startswith("Match:")), "Match: NO")
+        
+        return {
+            'video_summary': summary_line.split(":", 1)[-1].strip(),
+            'match': match_line.split(":", 1)[-1].strip(),
+            'raw_response': response_text,
+        }
+
+    def _finish_video(self, check, analysis):
+        """Scores the video analysis against the Stated Truth and saves the result."""
+        video_doc = check['doc']
+        summary = analysis['video_summary']
+        if check['cached'] is None:
+            self.cache.put(
+                AIResultCache.Kind.VIDEO, check['content_hash'], check['prompt_version'], GEMINI_MODEL,
+                {'video_summary': summary, 'match': analysis['match']}, analysis['raw_response']
+            )
+        video_doc.video_summary = summary # Save for our records
+        
+        if analysis['match'] == "YES":
+            self._record(20, check='video', fingerprint=check['fingerprint'])
+            video_doc.verified = True
+        else:
+            self._record(-20, f"Video summary ({summary}) does not match stated industry ({self.profile.industry}).",
+                         check='video', fingerprint=check['fingerprint'])
+        
+        video_doc.save()
+        self._emit('video', 'finished', matched=video_doc.verified, points=20 if video_doc.verified else -20,
+                   summary=summary)
 
 # --- NEWLY ADDED PROFIT ENGINE ---
 
-class ProfitEngine:
+class ProfitEngine(PooledClientMixin):
     """
     The Core "Profit Engine" AI Service.
     Fetches Mono transactions and uses AI to analyze financial health.
@@ -224,7 +611,9 @@ class ProfitEngine:
         self.mono_account_id = mono_account_id
         self.mono_api_key = settings.MONO_SECRET_KEY
         self.mono_base_url = settings.MONO_BASE_URL
-        self.client = genai.Client(api_key=settings.GOOGLE_AI_API_KEY)
+        self.features = None  # CashFlowFeatures of the last analysis (see core.cashflow)
+        self.compaction = None  # CompactedTransactions sent in the last prompt (see core.compaction)
+        self.risk = None  # NarrationRisk of the last analysis (see core.narrations)
         self.safety_settings = [
             {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
             {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
@@ -232,28 +621,33 @@ class ProfitEngine:
             {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
         ]
 
-    def _get_mono_transactions(self) -> dict | None:
+    def _get_mono_transactions(self) -> list | None:
         """
-        Fetches the last 12 months of transactions from Mono.
+        Returns the last 12 months of transactions from the local store,
+        after fetching from Mono only those newer than the previous sync
+        (see core.mono).
         """
         try:
-            headers = {'mono-sec-key': self.mono_api_key}
-            # Fetch last 12 months of transactions
-            url = f"{self.mono_base_url}/accounts/{self.mono_account_id}/transactions?months=12"
-            
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            
-            data = response.json()
-            if not data or 'data' not in data:
-                logger.warning(f"No transaction data returned from Mono for user {self.user.email}")
-                return None
-            
-            return data['data']
-        
-        except requests.exceptions.RequestException as e:
+            result = sync_transactions(
+                self.mono_account_id,
+                user=self.user,
+                client=MonoClient(self.mono_api_key, self.mono_base_url)
+            )
+            logger.info(
+                f"Mono sync for {self.user.email}: {result.added} new of {result.fetched} fetched "
+                f"over {result.pages} page(s){' (full window)' if result.full else ''}"
+            )
+        except MonoError as e:
+            # Score from what was stored by earlier syncs, if anything
             logger.error(f"Mono API request failed for {self.user.email} (ProfitEngine): {e}")
+
+        transactions = list(
+            account_transactions(self.mono_account_id).values('date', 'type', 'amount', 'balance', 'narration', 'risk_category')
+        )
+        if not transactions:
+            logger.warning(f"No transaction data returned from Mono for user {self.user.email}")
             return None
+        return transactions
 
     def analyze_financial_health(self) -> (int, str):
         """
@@ -264,32 +658,36 @@ class ProfitEngine:
         if not transactions:
             return 0, "Could not retrieve bank transactions from Mono."
 
-        # Simplify transactions for the AI prompt
-        simplified_txns = []
-        for txn in transactions:
-            simplified_txns.append({
-                "date": txn.get('date'),
-                "type": txn.get('type'),
-                "amount": txn.get('amount') / 100, # Convert from kobo
-                "narration": txn.get('narration')
-            })
+        # Exact figures, so the model judges them instead of adding up raw lines
+        self.features = extract_features(transactions)
+        features_string = json.dumps(self.features.as_dict())
+        self.risk = summarise_risk(transactions)
+        risk_string = json.dumps(self.risk.as_dict())
 
-        # Create a string representation for the prompt
-        txn_string = "\n".join([json.dumps(txn) for txn in simplified_txns])
-
-        prompt = f"""
+        template = """
         You are an expert SME financial analyst and risk assessor for a Nigerian lender.
-        Here is the last 12 months of bank transactions for a business:
-        
-        {txn_string}
+        Here is a summary of the last 12 months of bank transactions for a business
+        (amounts in Naira): period totals, the largest counterparties, every transaction
+        whose narration looks risky, and a sample of the other transactions.
+
+        {txn_summary}
+
+        These cash-flow features were computed exactly from all of the transactions (amounts in Naira):
+
+        {features}
+
+        Gambling and payday-loan transactions, found from the narrations of all of the transactions
+        (counts, amounts in Naira, share of all money out, and a 0-100 risk sub-score):
+
+        {risk}
 
         Analyze this data to determine a 'Profit Score' from 0-100. 
         100 is a perfect, highly profitable, and stable business. 0 is a business with no income or high risk.
 
         Base your score on these key factors:
-        1.  **Revenue Consistency:** Is there a stable, predictable inflow of cash (credits)?
-        2.  **Cash Flow:** Is the net cash flow (credits vs. debits) generally positive?
-        3.  **Risk Indicators:** Are there many gambling (e.g., 'bet9ja', 'sportybet') or payday loan (e.g., 'branch', 'carbon') transactions?
+        1.  **Revenue Consistency:** Is there a stable, predictable inflow of cash (credits)? See revenue_cv and inflow_slope.
+        2.  **Cash Flow:** Is the net cash flow (credits vs. debits) generally positive? See net_cash_flow and overdraft_days.
+        3.  **Risk Indicators:** How much goes to gambling or payday loans? See the risk signals and the flagged transactions.
         4.  **Customer Behavior:** What do the narrations suggest about the *source* of income?
         5.  **Average Balance:** What does the balance trend look like?
 
@@ -298,9 +696,30 @@ class ProfitEngine:
         Analysis: [Your 2-3 sentence summary explaining the score.]
         """
 
+        # The transactions get whatever the rest of the prompt leaves of the budget
+        budget = getattr(settings, 'PROFIT_PROMPT_TOKEN_BUDGET', 8000)
+        fixed_tokens = estimate_text_tokens(template.format(txn_summary='', features=features_string, risk=risk_string))
+        if fixed_tokens > budget:
+            # Without the JSON whitespace, before giving up
+            features_string = json.dumps(self.features.as_dict(), separators=(',', ':'))
+            risk_string = json.dumps(self.risk.as_dict(), separators=(',', ':'))
+            fixed_tokens = estimate_text_tokens(template.format(txn_summary='', features=features_string, risk=risk_string))
+        if fixed_tokens > budget:
+            logger.error(f"Profit prompt for {self.user.email} needs {fixed_tokens} tokens before any transactions; budget is {budget}")
+            raise PromptBudgetExceeded(
+                f"PROFIT_PROMPT_TOKEN_BUDGET ({budget}) is below the {fixed_tokens} tokens the fixed profit prompt needs."
+            )
+        self.compaction = compact_transactions(transactions, max(0, budget - fixed_tokens))
+        prompt = template.format(txn_summary=self.compaction.text, features=features_string, risk=risk_string)
+        logger.info(
+            f"Profit prompt for {self.user.email}: {self.compaction.row_count} transactions in "
+            f"{estimate_text_tokens(prompt)} of {budget} tokens ({self.compaction.sampled_rows} sampled, "
+            f"{self.compaction.flagged_rows} flagged, {self.compaction.compression_ratio}x compression)"
+        )
+
         try:
             response = self.client.models.generate_content(
-                model='gemini-2.5-flash',
+                model=GEMINI_MODEL,
                 contents=[prompt],
                 config=genai.types.GenerateContentConfig(
                     temperature=0.3,
@@ -314,21 +733,25 @@ class ProfitEngine:
             response_text = response.text
             
             # Parse the response
-            score = 0
+            score = None
             analysis = "AI analysis failed."
             
             for line in response_text.split('\n'):
                 if line.startswith("Score:"):
                     score_str = line.split(":", 1)[-1].strip()
                     try:
-                        score = int(score_str)
+                        score = max(0, min(100, int(score_str)))
                     except ValueError:
-                        score = 0
+                        score = None
                 elif line.startswith("Analysis:"):
                     analysis = line.split(":", 1)[-1].strip()
-            
+
+            if score is None:
+                return self.features.fallback_score(self.risk.risk_score), "Scored from cash-flow features (AI response had no score)."
             return score, analysis
 
+        except UpstreamUnavailable:
+            raise  # Not the SME's fault; let the caller retry later
         except Exception as e:
             logger.error(f"ProfitEngine AI analysis failed for {self.user.email}: {e}")
-            return 0, f"AI analysis of transactions failed: {e}"
\ No newline at end of file
+            return self.features.fallback_score(self.risk.risk_score), f"Scored from cash-flow features (AI analysis failed: {e})."
\ No newline at end of file
@@ -0,0 +1,300 @@
+"""
+Local HTTP stand-ins for Mono and Paystack.
+
+Point MONO_BASE_URL / PAYSTACK_BASE_URL at them (`manage.py
+runsimulators`) to exercise the sync, scoring and escrow paths end to end
+on an offline machine, with the provider being slow, paginating or
+failing as configured:
+
+  latency      per-request delay: 'fixed' (latency_ms), 'normal'
+               (latency_ms +/- jitter_ms) or 'lognormal' (median
+               latency_ms, spread sigma; a long tail like real APIs)
+  error_rate   fraction of requests answered with error_code
+  page_size    Mono transactions per page
+
+Mono accounts are generated from the account id, so every run (and every
+simulator process) serves the same history for an account: mostly
+customer payments and supplier debits, with some betting and loan
+narrations. Paystack keeps initialised transactions, recipients and
+transfers in memory.
+"""
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+MONO_DATE_FORMAT = '%d-%m-%Y'
+
+_CREDIT_NARRATIONS = (
+    'NIP TRF FROM {name}/{ref}', 'TRANSFER FROM {name}', 'POS SETTLEMENT {ref}', 'USSD TRF FROM {name}',
+)
+_DEBIT_NARRATIONS = (
+    'TRF TO {name} SUPPLIES/{ref}', 'POS PURCHASE {ref}', 'RENT PAYMENT', 'SALARY {name}',
+    'WEB TRF TO BET9JA {ref}', 'FAIRMONEY LOAN RPMT {ref}',
+)
+_NAMES = ('ADEBAYO STORES', 'KEMI OJO', 'MAMA NKECHI FOODS', 'EMEKA PARTS', 'ZAINAB TEXTILES', 'TUNDE LOGISTICS')
+
+
+class LatencyModel:
+    def __init__(self, distribution='fixed', latency_ms=0.0, jitter_ms=0.0, sigma=0.5):
+        if distribution not in ('fixed', 'normal', 'lognormal'):
+            raise ValueError(f"Unknown latency distribution '{distribution}'")
+        self.distribution = distribution
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.sigma = sigma
+
+    def sample(self, rng) -> float:
+        """A delay in seconds."""
+        if self.distribution == 'normal':
+            delay = rng.gauss(self.latency_ms, self.jitter_ms)
+        elif self.distribution == 'lognormal' and self.latency_ms > 0:
+            delay = rng.lognormvariate(math.log(self.latency_ms), self.sigma)
+        else:
+            delay = self.latency_ms
+        return max(0.0, delay) / 1000.0
+
+
+class Simulator(ABC):
+    """Routes requests, injecting latency and errors before each one."""
+    name = ''
+
+    def __init__(self, latency=None, error_rate=0.0, error_code=503, seed=None, sleep=time.sleep):
+        self.latency = latency or LatencyModel()
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.sleep = sleep
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.base_url = ''  # Set once serving, for absolute paging links
+
+    def handle(self, method, path, query, body, headers):
+        """Returns (status, JSON body) for a request."""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency.sample(self._random)
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if delay:
+            self.sleep(delay)
+        if fail:
+            return self.error_code, {'status': False, 'message': f'Injected {self.name} error'}
+        return self.route(method, path, query, body, headers)
+
+    @abstractmethod
+    def route(self, method, path, query, body, headers):
+        """Returns (status, JSON body) for a request that was not failed on purpose."""
+
+
+class MonoSimulator(Simulator):
+    """GET /accounts/<id>/transactions with Mono's start/end filters and paging."""
+    name = 'mono'
+
+    def __init__(self, page_size=100, transactions_per_account=1000, months=12, today=None, **kwargs):
+        super().__init__(**kwargs)
+        self.page_size = page_size
+        self.transactions_per_account = transactions_per_account
+        self.months = months
+        self.today = today or date.today()
+        self._accounts = {}
+
+    def account(self, account_id) -> list:
+        """The account's generated transactions, oldest first."""
+        with self._lock:
+            if account_id not in self._accounts:
+                self._accounts[account_id] = self._generate(account_id)
+            return self._accounts[account_id]
+
+    def _generate(self, account_id) -> list:
+        rng = random.Random(f"mono:{account_id}")
+        span_days = round(self.months * 365 / 12)
+        start = datetime.combine(self.today - timedelta(days=span_days), datetime.min.time(), dt_timezone.utc)
+        offsets = sorted(rng.uniform(0, span_days * 86400) for _ in range(self.transactions_per_account))
+        balance = rng.randint(50_000, 500_000) * 100
+        transactions = []
+        for index, offset in enumerate(offsets):
+            is_credit = rng.random() < 0.55
+            template = rng.choice(_CREDIT_NARRATIONS if is_credit else _DEBIT_NARRATIONS)
+            amount = int(rng.lognormvariate(math.log(25_000), 0.8)) * 100
+            balance += amount if is_credit else -amount
+            transactions.append({
+                '_id': f"{account_id}-{index:06d}",
+                'type': 'credit' if is_credit else 'debit',
+                'amount': amount,
+                'balance': balance,
+                'narration': template.format(name=rng.choice(_NAMES), ref=rng.randint(10_000, 99_999)),
+                'date': (start + timedelta(seconds=offset)).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+                'category': 'unknown',
+            })
+        return transactions
+
+    def route(self, method, path, query, body, headers):
+        parts = path.strip('/').split('/')
+        if method != 'GET' or len(parts) != 3 or parts[0] != 'accounts' or parts[2] != 'transactions':
+            return 404, {'message': 'Not found'}
+        if not headers.get('mono-sec-key'):
+            return 401, {'message': 'Missing mono-sec-key'}
+
+        try:
+            start = datetime.strptime(query['start'], MONO_DATE_FORMAT).date() if 'start' in query else None
+            end = datetime.strptime(query['end'], MONO_DATE_FORMAT).date() if 'end' in query else None
+            page = max(1, int(query.get('page', 1)))
+        except ValueError:
+            return 400, {'message': 'Invalid start, end or page'}
+
+        rows = [
+            txn for txn in self.account(parts[1])
+            if (start is None or txn['date'][:10] >= start.isoformat())
+            and (end is None or txn['date'][:10] <= end.isoformat())
+        ]
+        rows.reverse()  # Mono lists newest first
+        if query.get('paginate') == 'false':
+            return 200, {'data': rows, 'paging': {'total': len(rows), 'page': 1, 'previous': None, 'next': None}}
+
+        pages = max(1, math.ceil(len(rows) / self.page_size))
+
+        def link(number):
+            if not 1 <= number <= pages or number == page:
+                return None
+            return f"{self.base_url}{path}?{urlencode({**query, 'page': number})}"
+
+        return 200, {
+            'data': rows[(page - 1) * self.page_size:page * self.page_size],
+            'paging': {'total': len(rows), 'page': page, 'previous': link(page - 1), 'next': link(page + 1)},
+        }
+
+
+class PaystackSimulator(Simulator):
+    """transaction/initialize, transaction/verify/<ref>, transferrecipient and transfer."""
+    name = 'paystack'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.transactions = {}
+        self.recipients = {}
+        self.transfers = {}
+
+    def route(self, method, path, query, body, headers):
+        if not headers.get('authorization', '').startswith('Bearer '):
+            return 401, {'status': False, 'message': 'Invalid key'}
+        route = path.strip('/')
+
+        if method == 'POST' and route == 'transaction/initialize':
+            if not body.get('email') or not body.get('amount'):
+                return 400, {'status': False, 'message': 'Email and amount are required'}
+            reference = body.get('reference') or uuid.uuid4().hex[:12]
+            access_code = uuid.uuid4().hex[:14]
+            with self._lock:
+                if reference in self.transactions:
+                    return 400, {'status': False, 'message': 'Duplicate Transaction Reference'}
+                self.transactions[reference] = {
+                    'reference': reference, 'amount': int(body['amount']), 'currency': body.get('currency', 'NGN'),
+                    'status': 'success', 'customer': {'email': body['email']},
+                }
+            return 200, {'status': True, 'message': 'Authorization URL created', 'data': {
+                'authorization_url': f"{self.base_url}/checkout/{access_code}",
+                'access_code': access_code,
+                'reference': reference,
+            }}
+
+        if method == 'GET' and route.startswith('transaction/verify/'):
+            transaction = self.transactions.get(route.rsplit('/', 1)[-1])
+            if transaction is None:
+                return 400, {'status': False, 'message': 'Transaction reference not found'}
+            return 200, {'status': True, 'message': 'Verification successful', 'data': {
+                **transaction, 'paid_at': datetime.now(dt_timezone.utc).isoformat(), 'gateway_response': 'Successful',
+            }}
+
+        if method == 'POST' and route == 'transferrecipient':
+            if not body.get('account_number') or not body.get('bank_code'):
+                return 400, {'status': False, 'message': 'Account number and bank code are required'}
+            code = f"RCP_{uuid.uuid4().hex[:12]}"
+            with self._lock:
+                self.recipients[code] = body
+            return 201, {'status': True, 'message': 'Transfer recipient created successfully', 'data': {
+                'recipient_code': code, 'name': body.get('name'), 'type': body.get('type', 'nuban'),
+                'details': {'account_number': body['account_number'], 'bank_code': body['bank_code']},
+            }}
+
+        if method == 'POST' and route == 'transfer':
+            if body.get('recipient') not in self.recipients:
+                return 400, {'status': False, 'message': 'Recipient specified is invalid'}
+            code = f"TRF_{uuid.uuid4().hex[:12]}"
+            transfer = {
+                'transfer_code': code, 'reference': body.get('reference') or uuid.uuid4().hex[:16],
+                'amount': int(body.get('amount') or 0), 'recipient': body['recipient'], 'status': 'success',
+            }
+            with self._lock:
+                self.transfers[code] = transfer
+            return 200, {'status': True, 'message': 'Transfer has been queued', 'data': transfer}
+
+        return 404, {'status': False, 'message': 'Not found'}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real APIs
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        body = {}
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            try:
+                body = json.loads(self.rfile.read(length))
+            except ValueError:
+                body = {}
+        headers = {key.lower(): value for key, value in self.headers.items()}
+        status, payload = self.server.simulator.handle(method, url.path, query, body, headers)
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def log_message(self, format, *args):
+        pass  # One line per request drowns a load test
+
+
+class SimulatorServer:
+    """Serves a simulator on a background thread; port 0 picks a free one."""
+
+    def __init__(self, simulator, host='127.0.0.1', port=0):
+        self.simulator = simulator
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.simulator = simulator
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        simulator.base_url = self.url
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name=f"{self.simulator.name}-simulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,138 @@
+"""
+Content-addressed media storage.
+
+Uploaded CAC documents and videos are stored under their SHA-256
+(`videos/3f/3fa9...c1.mp4`), so uploading the same file again, by the
+same SME or another, reuses the existing blob instead of writing a
+suffixed copy. Each StoredBlob row counts the documents pointing at
+its file. Storing a file takes a reference on behalf of the document
+being saved; once that document's row is written, the sme signals keep
+it (`claim`), or hand it back if the row already pointed at the same
+blob, and release the file the row pointed at before. The blob goes
+once nothing refers to it. `manage.py gc_media` repairs the counts and
+removes files left over from before.
+
+The digest is in the name, so `digest_from_name` gives the AI result
+cache its content hash without reading the file again.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import threading
+import uuid
+from collections import Counter
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+from .models import StoredBlob
+
+# References this thread's saves took, not yet claimed by a saved document
+_unclaimed = threading.local()
+
+_BLOB_NAME = re.compile(r'(?:^|/)([0-9a-f]{2})/(\1[0-9a-f]{62})(?:\.\w+)?$')
+
+
+def digest_from_name(name) -> str | None:
+    """The SHA-256 encoded in a blob name, or None for other files."""
+    match = _BLOB_NAME.search(name or '')
+    return match.group(2) if match else None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by content hash and counts references to them."""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is picked in _save, and an existing file with that name is the same content
+        return name
+
+    def blob_name(self, name, digest) -> str:
+        directory = posixpath.dirname(name.replace('\\', '/'))
+        extension = os.path.splitext(name)[1].lower()[:10]
+        return posixpath.join(directory, digest[:2], f"{digest}{extension}")
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in content.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+        name = self.blob_name(name, digest.hexdigest())
+
+        with transaction.atomic():
+            # The row lock orders this against a release() deleting the same blob
+            blob, _ = StoredBlob.objects.select_for_update().get_or_create(
+                name=name,
+                defaults={'sha256': digest.hexdigest(), 'size': size}
+            )
+            if self.exists(name):
+                os.utime(self.path(name))  # Marks it in use for gc_media's --min-age
+            else:
+                self._write(name, content)
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+        self._unclaimed().update([name])
+        return name
+
+    @staticmethod
+    def _unclaimed() -> Counter:
+        if not hasattr(_unclaimed, 'names'):
+            _unclaimed.names = Counter()
+        return _unclaimed.names
+
+    def claim(self, name) -> bool:
+        """Takes over a reference this thread stored `name` with; False if it holds none."""
+        unclaimed = self._unclaimed()
+        if not unclaimed[name]:
+            return False
+        unclaimed[name] -= 1
+        if not unclaimed[name]:
+            del unclaimed[name]
+        return True
+
+    def acquire(self, name):
+        """Adds a reference to an existing blob (a name assigned without storing a file)."""
+        if name:
+            StoredBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+
+    def _write(self, name, content):
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        # Written aside and renamed, so a reader never sees a partial blob
+        tmp_path = f"{full_path}.{uuid.uuid4().hex}.part"
+        try:
+            if hasattr(content, 'temporary_file_path'):
+                file_move_safe(content.temporary_file_path(), tmp_path)
+            else:
+                with open(tmp_path, 'wb') as f:
+                    for chunk in content.chunks():
+                        f.write(chunk)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+
+    def release(self, name) -> bool:
+        """Drops one reference to a blob; returns True if that was the last and the file was deleted."""
+        if not name:
+            return False
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return False  # Not a blob (saved before content addressing); gc_media handles those
+            if blob.ref_count > 1:
+                StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return False
+            self.delete(name)
+            blob.delete()
+        return True
+
+
+def get_media_storage():
+    """Storage for uploaded documents and videos (used as the FileFields' `storage`)."""
+    return ContentAddressedStorage()
@@ -0,0 +1,126 @@
+"""
+Background job handlers. Registered with the queue in `core.jobs`
+and executed by `manage.py runworkers`.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from sme.models import BusinessProfile, Score
+from .breaker import UpstreamUnavailable
+from .events import EventRecorder
+from .jobs import enqueue, register, RetryLater
+from .models import Job
+
+User = get_user_model()
+
+
+@register(Job.Kind.PULSE_VERIFICATION)
+def run_pulse_verification(job: Job) -> dict:
+    """Runs the PulseEngine for the job's user and stores the score on their profile."""
+    from .services import PulseEngine
+
+    user = User.objects.get(pk=job.user_id)
+    engine = PulseEngine(user, job.payload.get('account_name'), on_event=EventRecorder(job))
+    pulse_score, fail_reason = engine.run_verification()
+
+    profile = BusinessProfile.objects.get(user=user)
+    if engine.deferred:
+        # Gemini was throttling or down: keep the old score and try again later
+        profile.verification_status = 'deferred'
+        profile.save(update_fields=['verification_status', 'updated_at'])
+        raise RetryLater(
+            f"Deferred checks: {', '.join(engine.deferred)}",
+            delay=timedelta(seconds=getattr(settings, 'PULSE_DEFERRED_RETRY_DELAY', 300))
+        )
+
+    profile.pulse_score = pulse_score
+    if fail_reason:
+        profile.verification_status = 'failed'
+    else:
+        profile.verification_status = 'verified'
+    profile.save(update_fields=['pulse_score', 'verification_status', 'updated_at'])
+
+    return {
+        "pulseScore": pulse_score,
+        "failReason": fail_reason,
+        "reviewFlags": engine.review_flags,
+        "verificationStatus": profile.verification_status
+    }
+
+
+def profit_score_is_fresh(profile) -> bool:
+    ttl = timedelta(hours=getattr(settings, 'PROFIT_SCORE_TTL_HOURS', 24))
+    return profile.profit_scored_at is not None and profile.profit_scored_at > timezone.now() - ttl
+
+
+def enqueue_profit_scoring(user, force=False) -> Job:
+    """
+    Queues profit scoring for the user, unless a run is already queued or
+    running. With force (e.g. after a bank reconnect) a queued run is made
+    to force too, and a running one is not relied on: it may already have
+    read the old account or kept the cached score.
+    """
+    pending = Job.objects.filter(
+        kind=Job.Kind.PROFIT_SCORING,
+        user=user,
+        status__in=[Job.Status.QUEUED, Job.Status.RUNNING]
+    ).order_by('id')
+    if not force:
+        job = pending.first()
+        if job is not None:
+            return job
+    else:
+        job = pending.filter(status=Job.Status.QUEUED).first()
+        if job is not None:
+            payload = {**job.payload, 'force': True}
+            # Only while still queued; a worker may have claimed it meanwhile
+            if Job.objects.filter(pk=job.pk, status=Job.Status.QUEUED).update(payload=payload):
+                job.payload = payload
+                return job
+    return enqueue(Job.Kind.PROFIT_SCORING, payload={'force': force}, user=user)
+
+
+@register(Job.Kind.PROFIT_SCORING)
+def run_profit_scoring(job: Job) -> dict:
+    """
+    Syncs the user's bank transactions, computes cash-flow features and
+    asks Gemini for a Profit Score (see ProfitEngine), then stores it on
+    the profile. A score younger than PROFIT_SCORE_TTL_HOURS is kept
+    unless the job was queued with force.
+    """
+    from .services import ProfitEngine
+
+    profile = BusinessProfile.objects.select_related('user').get(user_id=job.user_id)
+    if not profile.mono_account_id:
+        return {"skipped": "No bank account connected"}
+    if not job.payload.get('force') and profit_score_is_fresh(profile):
+        return {"profitScore": profile.profit_score, "cached": True}
+
+    engine = ProfitEngine(profile.user, profile.mono_account_id)
+    try:
+        profit_score, analysis = engine.analyze_financial_health()
+    except UpstreamUnavailable as e:
+        raise RetryLater(
+            f"Gemini unavailable: {e}",
+            delay=timedelta(seconds=getattr(settings, 'PULSE_DEFERRED_RETRY_DELAY', 300))
+        )
+    if engine.features is None:
+        # Nothing synced yet (Mono down, or no history); retried with backoff
+        raise RuntimeError(analysis)
+
+    profile.profit_score = profit_score
+    profile.profit_analysis = analysis
+    profile.profit_scored_at = timezone.now()
+    profile.save(update_fields=['profit_score', 'profit_analysis', 'profit_scored_at', 'updated_at'])
+    if profile.latest_score_id:
+        Score.objects.filter(pk=profile.latest_score_id).update(profit_score=profit_score)
+
+    return {
+        "profitScore": profit_score,
+        "analysis": analysis,
+        "transactionCount": engine.features.transaction_count,
+        "scoredAt": profile.profit_scored_at.isoformat()
+    }
@@ -1,7 +1,49 @@
-from django.test import TestCase
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+import httpx
+from asgiref.sync import async_to_sync
+from google.genai import errors as genai_errors
+from PIL import Image, ImageDraw
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.contrib.auth import get_user_model
-from sme.models import BusinessProfile, CACDocument, BusinessVideo
-from .services import PulseEngine
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from escrow.services import PaystackService
+from sme.models import BusinessProfile, CACDocument, BusinessVideo, Score, CashFlowForecast
+from .jobs import enqueue, claim_next, run_next, requeue_stale, register, HANDLERS, MAX_DEFERRALS, RetryLater
+from .tasks import enqueue_profit_scoring
+from . import clients, preprocessing
+from .cache import ExtractionCache, file_sha256
+from .cashflow import counterparty_key, extract_features
+from .compaction import PromptBudgetExceeded, compact_transactions
+from .forecasting import forecast_cash_flow
+from .narrations import AhoCorasick, classify_narration, summarise_risk
+from .simulators import LatencyModel, MonoSimulator, PaystackSimulator, SimulatorServer
+from .storage import digest_from_name
+from .events import stream_job_events
+from .clients import CountingTransport, get_genai_client
+from .models import Job, AIResultCache, StoredBlob, MonoSyncCursor, BankTransaction
+from .mono import MonoClient, MonoError, account_transactions, ingest_transactions, prune_transactions, sync_transactions
+from .preprocessing import preprocess_cac, preprocess_cac_document
+from .breaker import CircuitBreaker, UpstreamUnavailable, is_upstream_failure
+from .ratelimit import TokenBucket, QuotaLimiter, RateLimitedClient, FileBucketStore, estimate_tokens
+from .keyframes import extract_keyframes, split_jpeg_stream, thin_evenly, KeyframeExtractionError
+from .providers import ReplayProvider, RecordingProvider, ReplayMiss, request_key, get_ai_client
+from .polling import FileStatePoller, FileProcessingError, FileProcessingTimeout
+from .services import PulseEngine, ProfitEngine
 
 User = get_user_model()
 
@@ -58,3 +100,1535 @@ class PulseEngineTests(TestCase):
         self.assertEqual(engine.bank_account_name, 'Test Bank')
         self.assertEqual(engine.score, 0)
         self.assertEqual(engine.fail_reasons, [])
+
+
+@override_settings(GOOGLE_AI_API_KEY='test-key')
+class JobQueueTests(TestCase):
+    def setUp(self):
+        """Set up a user with a business profile and no documents"""
+        self.user = User.objects.create_user(
+            email='queue@example.com',
+            password='testpass123',
+            user_type='sme'
+        )
+        self.business_profile = BusinessProfile.objects.create(
+            user=self.user,
+            business_name='Queue Business Ltd',
+            industry='Retail'
+        )
+
+    def test_claim_marks_job_running(self):
+        """Test that claiming a job locks it to the worker"""
+        job = enqueue(Job.Kind.PULSE_VERIFICATION, user=self.user)
+        claimed = claim_next('worker-1')
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual(claimed.status, Job.Status.RUNNING)
+        self.assertEqual(claimed.locked_by, 'worker-1')
+        self.assertEqual(claimed.attempts, 1)
+        # Nothing else is ready
+        self.assertIsNone(claim_next('worker-2'))
+
+    def test_future_jobs_are_not_claimed(self):
+        """Test that jobs scheduled for later are skipped"""
+        enqueue(Job.Kind.PULSE_VERIFICATION, user=self.user, run_after=timezone.now() + timedelta(minutes=5))
+        self.assertIsNone(claim_next('worker-1'))
+
+    def test_run_pulse_verification_job(self):
+        """Test that the verification handler scores the profile"""
+        job = enqueue(
+            Job.Kind.PULSE_VERIFICATION,
+            payload={'account_name': 'Queue Business Ltd'},
+            user=self.user
+        )
+        job = run_next('worker-1')
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertIn('CAC document missing', job.result['failReason'])
+
+        self.business_profile.refresh_from_db()
+        self.assertEqual(self.business_profile.pulse_score, job.result['pulseScore'])
+        self.assertEqual(self.business_profile.verification_status, 'failed')
+
+    def _register_test_handler(self, handler):
+        register('test_kind')(handler)
+        self.addCleanup(HANDLERS.pop, 'test_kind', None)
+
+    def _make_due(self, job):
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+
+    def test_failed_job_is_retried_then_failed(self):
+        """Test failures are retried with doubling backoff until max_attempts"""
+        def flaky(job):
+            raise RuntimeError('upstream exploded')
+        self._register_test_handler(flaky)
+        job = enqueue('test_kind', user=self.user, max_attempts=3)
+
+        for attempt, delay in [(1, 30), (2, 60)]:
+            started = timezone.now()
+            job = run_next('worker-1')
+            self.assertEqual(job.status, Job.Status.QUEUED)
+            self.assertEqual(job.attempts, attempt)
+            self.assertEqual(job.locked_by, '')
+            backoff = (job.run_after - started).total_seconds()
+            self.assertAlmostEqual(backoff, delay, delta=5)
+            self.assertIsNone(run_next('worker-1'))  # Not due until the backoff passes
+            self._make_due(job)
+
+        job = run_next('worker-1')
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.attempts, 3)
+        self.assertEqual(job.error, 'upstream exploded')
+        self.assertIsNotNone(job.finished_at)
+
+    def test_unknown_kind_fails_without_retry(self):
+        """Test a job nobody can run is failed on its first attempt"""
+        enqueue('unknown_kind', user=self.user)
+        job = run_next('worker-1')
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertIn('No handler registered', job.error)
+
+    def test_deferrals_are_capped(self):
+        """Test RetryLater keeps the attempt but a job that always defers is eventually failed"""
+        def unavailable(job):
+            raise RetryLater('Gemini unavailable', delay=timedelta(minutes=5))
+        self._register_test_handler(unavailable)
+        job = enqueue('test_kind', user=self.user)
+
+        for deferral in range(1, MAX_DEFERRALS + 1):
+            job = run_next('worker-1')
+            self.assertEqual(job.status, Job.Status.QUEUED)
+            self.assertEqual((job.attempts, job.deferrals), (0, deferral))
+            self._make_due(job)
+
+        job = run_next('worker-1')
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertIn(f'Gave up after {MAX_DEFERRALS} deferrals', job.error)
+
+    def test_requeue_stale(self):
+        """Test that jobs abandoned by dead workers go back on the queue"""
+        job = enqueue(Job.Kind.PULSE_VERIFICATION, user=self.user)
+        claim_next('worker-1')
+        Job.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+
+
+class FakeFile:
+    def __init__(self, name, state):
+        self.name = name
+        self.state = SimpleNamespace(name=state)
+
+
+class FakeFilesAPI:
+    """Reports each file as PROCESSING for a fixed number of polls"""
+    def __init__(self, polls_until_active, final_state='ACTIVE'):
+        self.polls_until_active = polls_until_active
+        self.final_state = final_state
+        self.calls = {}
+
+    def get(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self.calls[name] >= self.polls_until_active:
+            return FakeFile(name, self.final_state)
+        return FakeFile(name, 'PROCESSING')
+
+
+class FileStatePollerTests(TestCase):
+    def setUp(self):
+        """Set up a fast poller"""
+        self.poller = FileStatePoller(initial_delay=0.001, max_delay=0.01, timeout=5)
+
+    def test_already_active_file_returns_immediately(self):
+        """Test no polling happens for files that are already ACTIVE"""
+        client = SimpleNamespace(files=FakeFilesAPI(1))
+        result = self.poller.wait(client, FakeFile('files/a', 'ACTIVE'))
+        self.assertEqual(result.name, 'files/a')
+        self.assertEqual(client.files.calls, {})
+
+    def test_polls_until_active(self):
+        """Test the file state is refreshed until processing completes"""
+        client = SimpleNamespace(files=FakeFilesAPI(3))
+        result = self.poller.wait(client, FakeFile('files/a', 'PROCESSING'))
+        self.assertEqual(result.state.name, 'ACTIVE')
+        self.assertEqual(client.files.calls['files/a'], 3)
+
+    def test_tracks_many_uploads_on_one_thread(self):
+        """Test many in-flight uploads resolve independently"""
+        client = SimpleNamespace(files=FakeFilesAPI(4))
+        futures = [
+            self.poller.submit(client, FakeFile(f'files/{i}', 'PROCESSING'))
+            for i in range(25)
+        ]
+        names = {future.result(timeout=5).name for future in futures}
+        self.assertEqual(len(names), 25)
+        self.assertEqual(self.poller.pending_count(), 0)
+
+    def test_failed_processing_raises(self):
+        """Test FAILED files raise FileProcessingError"""
+        client = SimpleNamespace(files=FakeFilesAPI(2, final_state='FAILED'))
+        with self.assertRaises(FileProcessingError):
+            self.poller.wait(client, FakeFile('files/a', 'PROCESSING'))
+
+    def test_deadline_raises_timeout(self):
+        """Test a file stuck in PROCESSING hits the hard deadline"""
+        client = SimpleNamespace(files=FakeFilesAPI(10 ** 6))
+        with self.assertRaises(FileProcessingTimeout):
+            self.poller.wait(client, FakeFile('files/a', 'PROCESSING'), timeout=0.05)
+
+
+class ExtractionCacheTests(TestCase):
+    def setUp(self):
+        """Set up a small cache (no random eviction on put, so counts are deterministic)"""
+        self.cache = ExtractionCache(ttl=timedelta(days=1), max_entries=2)
+        sampling = patch('core.cache.EVICTION_SAMPLE_RATE', 0)
+        sampling.start()
+        self.addCleanup(sampling.stop)
+
+    def test_put_and_get(self):
+        """Test results are keyed by hash, prompt version and model"""
+        self.cache.put('cac', 'abc', 'v1', 'model-a', {'extracted_name': 'ACME LTD'}, 'ACME LTD')
+        self.assertEqual(self.cache.get('cac', 'abc', 'v1', 'model-a'), {'extracted_name': 'ACME LTD'})
+        self.assertIsNone(self.cache.get('cac', 'abc', 'v2', 'model-a'))
+        self.assertIsNone(self.cache.get('cac', 'abc', 'v1', 'model-b'))
+
+    def test_expired_entries_are_ignored(self):
+        """Test TTL expiry"""
+        entry = self.cache.put('cac', 'abc', 'v1', 'model-a', {'extracted_name': 'ACME LTD'})
+        AIResultCache.objects.filter(pk=entry.pk).update(created_at=timezone.now() - timedelta(days=2))
+        self.assertIsNone(self.cache.get('cac', 'abc', 'v1', 'model-a'))
+        self.assertEqual(AIResultCache.objects.count(), 0)
+
+    def test_evict_least_recently_used(self):
+        """Test LRU eviction beyond max_entries"""
+        for content_hash in ['a', 'b', 'c']:
+            self.cache.put('cac', content_hash, 'v1', 'm', {'extracted_name': content_hash})
+        AIResultCache.objects.filter(content_hash='a').update(last_accessed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertFalse(AIResultCache.objects.filter(content_hash='a').exists())
+
+    def test_invalidate(self):
+        """Test explicit invalidation by hash"""
+        self.cache.put('cac', 'a', 'v1', 'm', {'extracted_name': 'A'})
+        self.cache.put('video', 'b', 'v1', 'm', {'video_summary': 'B', 'match': 'YES'})
+        self.assertEqual(self.cache.invalidate(content_hash='a'), 1)
+        self.assertIsNone(self.cache.get('cac', 'a', 'v1', 'm'))
+        self.assertIsNotNone(self.cache.get('video', 'b', 'v1', 'm'))
+
+
+@override_settings(GOOGLE_AI_API_KEY='test-key', MEDIA_ROOT=tempfile.mkdtemp())
+class PulseEngineCacheTests(TestCase):
+    def setUp(self):
+        """Set up a profile with an uploaded CAC document"""
+        self.user = User.objects.create_user(
+            email='cache@example.com',
+            password='testpass123',
+            user_type='sme'
+        )
+        self.business_profile = BusinessProfile.objects.create(
+            user=self.user,
+            business_name='Test Business Ltd',
+            industry='Technology'
+        )
+        CACDocument.objects.create(
+            user=self.user,
+            cac_file=SimpleUploadedFile('cac.png', b'fake image bytes', content_type='image/png')
+        )
+
+    def test_reverification_reuses_cached_cac_result(self):
+        """Test the CAC model call is skipped when the file is unchanged"""
+        engine = PulseEngine(self.user, 'Test Business Ltd')
+        engine.client = MagicMock()
+        engine.client.models.generate_content.return_value = SimpleNamespace(text='TEST BUSINESS LTD')
+        engine.run_verification()
+        self.assertEqual(engine.client.models.generate_content.call_count, 1)
+
+        # Profile name edit: the extraction is still cached
+        self.business_profile.business_name = 'Test Business'
+        self.business_profile.save()
+        engine = PulseEngine(self.user, 'Test Business Ltd')
+        engine.client = MagicMock()
+        engine.run_verification()
+        engine.client.models.generate_content.assert_not_called()
+        self.assertEqual(CACDocument.objects.get(user=self.user).extracted_name, 'TEST BUSINESS LTD')
+
+
+class FakeMono:
+    """Mono transactions API over httpx.MockTransport, paginated `page_size` at a time."""
+    def __init__(self, transactions, page_size=2):
+        self.transactions = transactions
+        self.page_size = page_size
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        start = datetime.strptime(request.url.params['start'], '%d-%m-%Y').date().isoformat()
+        matching = [txn for txn in self.transactions if txn['date'][:10] >= start]
+        page = int(request.url.params.get('page', 1))
+        data = matching[(page - 1) * self.page_size:page * self.page_size]
+        more = page * self.page_size < len(matching)
+        next_url = request.url.copy_set_param('page', page + 1) if more else None
+        return httpx.Response(200, json={
+            'paging': {'total': len(matching), 'page': page, 'next': str(next_url) if next_url else None},
+            'data': data,
+        })
+
+    def client(self):
+        return MonoClient('test-key', 'https://mono.test', http=httpx.Client(transport=httpx.MockTransport(self)))
+
+
+def _mono_txn(txn_id, days_ago, amount=100000, txn_type='credit', narration=None):
+    day = timezone.now().date() - timedelta(days=days_ago)
+    return {'_id': txn_id, 'date': f"{day.isoformat()}T10:00:00.000Z", 'type': txn_type,
+            'amount': amount, 'narration': narration or f"TRF {txn_id}", 'balance': 500000}
+
+
+class MonoSyncTests(TestCase):
+    def test_later_syncs_fetch_only_new_transactions(self):
+        """Test the first sync walks every page and the next one starts from the cursor"""
+        mono = FakeMono([_mono_txn(f't{i}', days) for i, days in enumerate([300, 200, 100, 40, 10])])
+        result = sync_transactions('acc_1', client=mono.client())
+        self.assertTrue(result.full)
+        self.assertEqual((result.fetched, result.added, result.pages), (5, 5, 3))
+        self.assertEqual(list(account_transactions('acc_1').values_list('transaction_id', flat=True)),
+                         ['t0', 't1', 't2', 't3', 't4'])
+
+        mono.transactions += [_mono_txn('t5', 10, txn_type='debit'), _mono_txn('t6', 2)]
+        mono.requests.clear()
+        result = sync_transactions('acc_1', client=mono.client())
+        self.assertFalse(result.full)
+        # Only the boundary day and after: t4 again (skipped), t5 posted later that day, t6
+        self.assertEqual((result.fetched, result.added), (3, 2))
+        self.assertEqual(BankTransaction.objects.filter(account_id='acc_1').count(), 7)
+        cursor = MonoSyncCursor.objects.get(account_id='acc_1')
+        self.assertEqual(cursor.last_transaction_date, timezone.now().date() - timedelta(days=2))
+        self.assertEqual(mono.requests[0].headers['mono-sec-key'], 'test-key')
+
+    def test_ingestion_batches_and_retention(self):
+        """Test batched inserts skip stored ids, scoring reads 12 months and old rows are pruned"""
+        transactions = [_mono_txn(f't{i}', days) for i, days in enumerate([900, 400, 30, 20, 10])]
+        with self.assertNumQueries(3):
+            ingest_transactions('acc_2', transactions, batch_size=2)
+        ingest_transactions('acc_2', transactions + [{'date': transactions[0]['date'], 'amount': 5, 'type': 'debit'}])
+        self.assertEqual(BankTransaction.objects.filter(account_id='acc_2').count(), 6)
+        self.assertEqual(list(account_transactions('acc_2', months=12).values_list('transaction_id', flat=True)),
+                         ['t2', 't3', 't4'])
+        self.assertEqual(prune_transactions(retention_days=730, batch_size=1), 2)
+        self.assertEqual(BankTransaction.objects.filter(account_id='acc_2').count(), 4)
+
+    def test_profit_engine_uses_the_sync(self):
+        """Test the ProfitEngine reads transactions through the pooled client"""
+        user = User.objects.create_user(email='profit@example.com', password='testpass123', user_type='sme')
+        mono = FakeMono([_mono_txn('t1', 5)])
+        with patch('core.mono.get_mono_http_client', return_value=httpx.Client(transport=httpx.MockTransport(mono))):
+            transactions = ProfitEngine(user, 'acc_3')._get_mono_transactions()
+        self.assertEqual([txn['narration'] for txn in transactions], ['TRF t1'])
+        self.assertEqual(MonoSyncCursor.objects.get(account_id='acc_3').user, user)
+
+
+class SimulatorTests(TestCase):
+    def test_mono_sync_pages_through_simulator(self):
+        """Test a full then incremental sync against the paginating Mono simulator"""
+        simulator = MonoSimulator(page_size=40, transactions_per_account=150)
+        with SimulatorServer(simulator) as server, httpx.Client() as http:
+            client = MonoClient('sk_sim', server.url, http)
+            first = sync_transactions('acc_sim', client=client)
+            self.assertEqual((first.fetched, first.added, first.pages, first.full), (150, 150, 4, True))
+            second = sync_transactions('acc_sim', client=client)
+            self.assertFalse(second.full)
+            self.assertEqual(second.added, 0)
+            self.assertLess(second.fetched, 40)
+        self.assertEqual(simulator.account('acc_sim'), MonoSimulator(transactions_per_account=150).account('acc_sim'))
+
+    def test_injected_errors_and_latency(self):
+        """Test error injection reaches callers as MonoError and latency is drawn per request"""
+        delays = []
+        simulator = MonoSimulator(error_rate=1.0, latency=LatencyModel('lognormal', 20, sigma=0.3), seed=1, sleep=delays.append)
+        with SimulatorServer(simulator) as server, httpx.Client() as http:
+            with self.assertRaises(MonoError):
+                sync_transactions('acc_down', client=MonoClient('sk_sim', server.url, http))
+        self.assertEqual((simulator.requests, simulator.errors), (1, 1))
+        self.assertTrue(0.005 < delays[0] < 0.08)
+
+    def test_paystack_service_against_simulator(self):
+        """Test PaystackService initialises, verifies and disburses through the simulator"""
+        with SimulatorServer(PaystackSimulator()) as server, \
+                override_settings(PAYSTACK_BASE_URL=server.url, PAYSTACK_SECRET_KEY='sk_test_simulator'):
+            paystack = PaystackService()
+            initialized = paystack.initialize_transaction('lender@example.com', Decimal('2500.50'), 'ref_sim_1')
+            self.assertTrue(initialized['success'])
+            self.assertTrue(initialized['authorization_url'].startswith(server.url))
+            verified = paystack.verify_transaction('ref_sim_1')
+            self.assertEqual(verified['amount'], Decimal('2500.50'))
+            self.assertFalse(paystack.verify_transaction('ref_unknown')['success'])
+            recipient = paystack.create_transfer_recipient('Profit Ltd', '0123456789', '044')
+            transfer = paystack.transfer_to_subaccount(Decimal('1000'), recipient['recipient_code'], 'Loan disbursement')
+            self.assertTrue(transfer['transfer_code'].startswith('TRF_'))
+
+
+def _txn(day, txn_type, naira, narration='', balance=None):
+    return {'date': datetime(2025, *day, 12, 0), 'type': txn_type, 'amount': naira * 100,
+            'narration': narration, 'balance': balance * 100 if balance is not None else None}
+
+
+class CashFlowFeatureTests(TestCase):
+    def test_features(self):
+        """Test monthly series, consistency, growth, concentration and overdraft days"""
+        features = extract_features([
+            _txn((1, 5), 'credit', 1000, 'NIP TRF FROM ADEBAYO STORES/001', 1000),
+            _txn((1, 20), 'debit', 400, 'POS PURCHASE', 600),
+            _txn((3, 2), 'credit', 2000, 'TRF FROM ADEBAYO STORES REF 99', 2600),
+            _txn((3, 2), 'debit', 3000, 'RENT', -400),
+            _txn((3, 3), 'credit', 1000, 'TRANSFER FROM KEMI OJO', 600),
+        ])
+        self.assertEqual(features.months, ['2025-01', '2025-02', '2025-03'])
+        self.assertEqual(features.monthly_inflow, [1000.0, 0.0, 3000.0])
+        self.assertEqual(features.monthly_outflow, [400.0, 0.0, 3000.0])
+        self.assertEqual(features.net_cash_flow, 600.0)
+        self.assertAlmostEqual(features.revenue_cv, 0.9354, places=4)
+        self.assertEqual(features.inflow_slope, 1000.0)
+        self.assertEqual(features.top_counterparty, 'ADEBAYO STORES')
+        self.assertEqual(features.top_counterparty_share, 0.75)
+        self.assertEqual(features.overdraft_days, 1)  # 2 March closed at -400
+        self.assertTrue(0 <= features.fallback_score() <= 100)
+
+    def test_counterparty_key_and_empty_input(self):
+        """Test channel words and references are dropped, and no transactions scores zero"""
+        self.assertEqual(counterparty_key('USSD TRF TO 0123/MAMA NKECHI FOODS LTD'), 'MAMA NKECHI FOODS')
+        self.assertEqual(extract_features([]).fallback_score(), 0)
+
+    def test_large_history_is_fast(self):
+        """Test 12k transactions are summarised well within a request's budget"""
+        rows = [
+            _txn((1 + i % 12, 1 + i % 28), 'debit' if i % 3 == 0 else 'credit', 500 + i % 97, f'TRF FROM CUSTOMER {i % 40}', 1000)
+            for i in range(12000)
+        ]
+        started = time.perf_counter()
+        features = extract_features(rows)
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(features.transaction_count, 12000)
+        self.assertEqual(len(features.months), 12)
+
+    def test_profit_engine_falls_back_to_features(self):
+        """Test a failed model call still yields a deterministic Profit Score"""
+        user = User.objects.create_user(email='fallback@example.com', password='testpass123', user_type='sme')
+        engine = ProfitEngine(user, 'acc_fallback')
+        engine.client = MagicMock()
+        engine.client.models.generate_content.side_effect = ValueError('blocked')
+        transactions = [_txn((1, 5), 'credit', 1000, 'TRF FROM A', 1000), _txn((2, 5), 'credit', 1200, 'TRF FROM B', 2200)]
+        with patch.object(ProfitEngine, '_get_mono_transactions', return_value=transactions):
+            score, analysis = engine.analyze_financial_health()
+        self.assertEqual(score, engine.features.fallback_score())
+        self.assertGreater(score, 0)
+        self.assertIn('Scored from cash-flow features', analysis)
+
+
+def _busy_year(count):
+    rows = []
+    for i in range(count):
+        day = datetime(2025, 1, 1) + timedelta(days=i * 365 // count)
+        rows.append(_txn((day.month, day.day), 'debit' if i % 3 == 0 else 'credit', 500 + i % 97, f'TRF FROM CUSTOMER {i % 40}', 1000))
+    return rows
+
+
+class ProfitScoringJobTests(TestCase):
+    def setUp(self):
+        """Set up a connected SME and a model that answers with a score"""
+        self.user = User.objects.create_user(email='profit@example.com', password='testpass123', user_type='sme')
+        self.profile = BusinessProfile.objects.create(
+            user=self.user, business_name='Profit Ltd', mono_connected=True, mono_account_id='acc_profit'
+        )
+        self.model = MagicMock()
+        self.model.models.generate_content.return_value = SimpleNamespace(text='Score: 68\nAnalysis: Healthy margins.')
+        transactions = [_txn((1, 5), 'credit', 1000, 'TRF FROM A', 1000), _txn((2, 5), 'debit', 400, 'RENT', 600)]
+        for target in (
+            patch.object(ProfitEngine, '_client', self.model),
+            patch.object(ProfitEngine, '_get_mono_transactions', return_value=transactions),
+        ):
+            target.start()
+            self.addCleanup(target.stop)
+
+    def test_job_scores_profile_then_uses_fresh_score(self):
+        """Test the job stores the score, and an unforced run within the TTL makes no model call"""
+        enqueue_profit_scoring(self.user, force=True)
+        job = run_next('worker-1')
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual(job.result['profitScore'], 68)
+        self.profile.refresh_from_db()
+        self.assertEqual((self.profile.profit_score, self.profile.profit_analysis), (68, 'Healthy margins.'))
+        self.assertIsNotNone(self.profile.profit_scored_at)
+
+        enqueue_profit_scoring(self.user)
+        self.assertTrue(run_next('worker-1').result['cached'])
+        self.assertEqual(self.model.models.generate_content.call_count, 1)
+
+    def test_forced_request_is_not_swallowed_by_pending_job(self):
+        """Test forcing upgrades a queued unforced run, and does not rely on one already running"""
+        queued = enqueue_profit_scoring(self.user)
+        self.assertEqual(enqueue_profit_scoring(self.user), queued)
+        self.assertEqual(enqueue_profit_scoring(self.user, force=True), queued)
+        queued.refresh_from_db()
+        self.assertTrue(queued.payload['force'])
+
+        claim_next('worker-1')
+        forced = enqueue_profit_scoring(self.user, force=True)
+        self.assertNotEqual(forced, queued)
+        self.assertTrue(forced.payload['force'])
+        self.assertEqual(enqueue_profit_scoring(self.user), queued)  # Unforced callers take any pending run
+
+    def test_upstream_outage_defers_job(self):
+        """Test a Gemini outage re-queues the job without using an attempt"""
+        self.model.models.generate_content.side_effect = UpstreamUnavailable('gemini')
+        enqueue_profit_scoring(self.user, force=True)
+        job = run_next('worker-1')
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertEqual(job.attempts, 0)
+        self.profile.refresh_from_db()
+        self.assertIsNone(self.profile.profit_scored_at)
+
+    def test_refresh_queues_stale_scores_once(self):
+        """Test the refresh command queues missing and expired scores, skipping fresh and pending ones"""
+        fresh_user = User.objects.create_user(email='fresh@example.com', password='testpass123', user_type='sme')
+        BusinessProfile.objects.create(
+            user=fresh_user, business_name='Fresh Ltd', mono_connected=True, mono_account_id='acc_fresh',
+            profit_scored_at=timezone.now()
+        )
+        stale_user = User.objects.create_user(email='stale@example.com', password='testpass123', user_type='sme')
+        BusinessProfile.objects.create(
+            user=stale_user, business_name='Stale Ltd', mono_connected=True, mono_account_id='acc_stale',
+            profit_scored_at=timezone.now() - timedelta(days=3)
+        )
+        out = StringIO()
+        call_command('refresh_profit_scores', stdout=out)
+        self.assertIn('Queued profit scoring for 2 profile(s)', out.getvalue())
+        queued = set(Job.objects.filter(kind=Job.Kind.PROFIT_SCORING).values_list('user__email', flat=True))
+        self.assertEqual(queued, {'profit@example.com', 'stale@example.com'})
+
+        call_command('refresh_profit_scores', stdout=out)
+        self.assertIn('Queued profit scoring for 0 profile(s)', out.getvalue())
+
+
+class PromptCompactionTests(TestCase):
+    def test_large_history_fits_budget(self):
+        """Test 20k transactions are summarised within the budget, keeping risky rows"""
+        rows = _busy_year(20000)
+        rows[5000] = _txn((4, 1), 'debit', 20000, 'WEB TRF TO BET9JA WALLET')
+        compacted = compact_transactions(rows, 2000)
+        self.assertLessEqual(compacted.tokens, 2000)
+        self.assertEqual(compacted.aggregate_period, 'week')
+        self.assertEqual(compacted.flagged_rows, 1)
+        self.assertIn('BET9JA', compacted.text)
+        self.assertIn('in,CUSTOMER,', compacted.text)
+        self.assertGreater(compacted.sampled_rows, 0)
+        self.assertGreater(compacted.compression_ratio, 50)
+
+    def test_small_history_is_sent_whole(self):
+        """Test every row is included when the budget allows, with daily totals"""
+        rows = [_txn((1, 5), 'credit', 1000, 'TRF FROM A'), _txn((1, 6), 'debit', 300, 'POS PURCHASE')]
+        compacted = compact_transactions(rows, 2000)
+        self.assertEqual(compacted.aggregate_period, 'day')
+        self.assertEqual(compacted.sampled_rows, 2)
+        self.assertIn('2025-01-05,1000.00,0.00,1', compacted.text)
+        self.assertIn('2025-01-06,D,300.00,POS PURCHASE', compacted.text)
+        self.assertEqual(compact_transactions([], 2000).text, '')
+
+    @override_settings(PROFIT_PROMPT_TOKEN_BUDGET=3000)
+    def test_profit_prompt_fits_budget(self):
+        """Test the whole profit prompt stays within PROFIT_PROMPT_TOKEN_BUDGET"""
+        user = User.objects.create_user(email='compact@example.com', password='testpass123', user_type='sme')
+        engine = ProfitEngine(user, 'acc_compact')
+        engine.client = MagicMock()
+        engine.client.models.generate_content.return_value = SimpleNamespace(text='Score: 70\nAnalysis: Steady.')
+        with patch.object(ProfitEngine, '_get_mono_transactions', return_value=_busy_year(20000)):
+            self.assertEqual(engine.analyze_financial_health(), (70, 'Steady.'))
+        prompt = engine.client.models.generate_content.call_args.kwargs['contents'][0]
+        self.assertLessEqual(estimate_tokens([prompt], max_output_tokens=0), 3000)
+        self.assertIn('revenue_cv', prompt)
+        self.assertIn('risk_score', prompt)
+
+    @override_settings(PROFIT_PROMPT_TOKEN_BUDGET=300)
+    def test_profit_prompt_over_budget_before_transactions(self):
+        """Test a budget the fixed prompt cannot fit is reported instead of sending a bigger prompt"""
+        user = User.objects.create_user(email='tight@example.com', password='testpass123', user_type='sme')
+        engine = ProfitEngine(user, 'acc_tight')
+        engine.client = MagicMock()
+        with patch.object(ProfitEngine, '_get_mono_transactions', return_value=_busy_year(500)):
+            with self.assertRaises(PromptBudgetExceeded):
+                engine.analyze_financial_health()
+        engine.client.models.generate_content.assert_not_called()
+
+    def test_sample_title_counts_rows_sent(self):
+        """Test the sample heading matches the rows that fit, spread over the whole period"""
+        rows = _busy_year(5000)
+        for budget in (900, 1500, 2500):
+            compacted = compact_transactions(rows, budget)
+            self.assertLessEqual(compacted.tokens, budget)
+            section = compacted.text.split('## Sample of ')[1]
+            self.assertTrue(section.startswith(f'{compacted.sampled_rows} of 5000 other transactions'))
+            self.assertEqual(len(section.splitlines()) - 1, compacted.sampled_rows)
+            self.assertIn('2025-12-', section.splitlines()[-1])  # The newest rows are not cut off
+
+
+class NarrationClassifierTests(TestCase):
+    def test_automaton_finds_overlapping_keywords(self):
+        """Test the automaton reports every keyword ending at each position"""
+        automaton = AhoCorasick([(word, word) for word in ('HE', 'SHE', 'HIS', 'HERS')])
+        self.assertEqual(list(automaton.find('USHERS')), [('SHE', 1, 4), ('HE', 2, 4), ('HERS', 2, 6)])
+
+    def test_classify(self):
+        """Test keywords match as whole words, and anchored regexes catch the rest"""
+        cases = {
+            'WEB TRF TO BET9JA WALLET': 'gambling',
+            'premier  lotto stake': 'gambling',
+            'BET TOP UP 0021': 'gambling',
+            'USSD TRF TO getcarbon/123': 'payday_loan',
+            'BRANCH INTL LOAN RPMT': 'payday_loan',
+            'LOAN REPAYMENT CHQ 44': 'payday_loan',
+            'ALPHABET SOUP LTD': '',
+            'CASH DEPOSIT LAGOS BRANCH': '',
+            '': '',
+        }
+        for narration, category in cases.items():
+            self.assertEqual(classify_narration(narration), category, narration)
+
+    def test_summarise_risk(self):
+        """Test per-category counts, amounts, outflow shares and the risk sub-score"""
+        risk = summarise_risk([
+            _txn((1, 5), 'credit', 5000, 'TRF FROM ADEBAYO STORES'),
+            _txn((1, 6), 'debit', 800, 'WEB TRF TO SPORTYBET'),
+            _txn((1, 7), 'credit', 300, 'SPORTYBET WINNINGS'),
+            _txn((1, 8), 'debit', 200, 'OKASH LOAN RPMT'),
+            _txn((1, 9), 'debit', 1000, 'SUPPLIER PAYMENT'),
+            {**_txn((1, 10), 'debit', 1000, 'STORED LABEL WINS'), 'risk_category': 'payday_loan'},
+        ])
+        self.assertEqual(risk.counts, {'gambling': 2, 'payday_loan': 2})
+        self.assertEqual(risk.amounts, {'gambling': 1100.0, 'payday_loan': 1200.0})
+        self.assertEqual(risk.outflow_shares, {'gambling': 0.2667, 'payday_loan': 0.4})
+        self.assertEqual(risk.risk_score, 100)
+        self.assertEqual(summarise_risk([_txn((1, 5), 'debit', 100, 'RENT')]).risk_score, 0)
+
+    def test_sync_labels_and_command_relabels(self):
+        """Test stored transactions get labels, and the command fills in and corrects them"""
+        ingest_transactions('acc_risk', [
+            _mono_txn('r1', 5, narration='BET9JA DEPOSIT'),
+            _mono_txn('r2', 4, narration='TRF FROM KEMI'),
+        ])
+        labels = dict(BankTransaction.objects.values_list('transaction_id', 'risk_category'))
+        self.assertEqual(labels, {'r1': 'gambling', 'r2': ''})
+
+        BankTransaction.objects.filter(transaction_id='r1').update(risk_category=None)
+        BankTransaction.objects.filter(transaction_id='r2').update(risk_category='gambling')
+        out = StringIO()
+        call_command('classify_narrations', stdout=out)
+        self.assertIn('Classified 1 narration(s)', out.getvalue())
+        call_command('classify_narrations', '--all', '--batch-size', '1', stdout=out)
+        labels = dict(BankTransaction.objects.values_list('transaction_id', 'risk_category'))
+        self.assertEqual(labels, {'r1': 'gambling', 'r2': ''})
+
+
+def _months_ago(count, day=10):
+    today = timezone.now()
+    month_index = today.year * 12 + today.month - 1 - count
+    return today.replace(year=month_index // 12, month=month_index % 12 + 1, day=day, hour=12)
+
+
+class CashFlowForecastTests(TestCase):
+    def test_trend_ignores_outlier_month(self):
+        """Test the Theil-Sen trend and band on a steady series with one freak month"""
+        noise = [20, -30, 10, -10, 30, -20, 0, 15]
+        inflow = [1000 + 100 * m + noise[m] for m in range(8)]
+        inflow[3] = 20000
+        outflow = [500] * 8
+        result = forecast_cash_flow([f'2025-{m + 1:02d}' for m in range(8)], inflow, outflow)
+        # Roughly 100 a month up from ~1200, as if the 20000 month never happened
+        self.assertAlmostEqual(result.monthly_forecast[0], 1300, delta=25)
+        self.assertAlmostEqual(result.net_3m, 4200, delta=75)
+        self.assertLessEqual(result.lower_6m, result.net_6m)
+        self.assertLess(result.upper_3m - result.lower_3m, result.upper_6m - result.lower_6m)
+        self.assertEqual(result.cash_flow_status, 'positive')
+        self.assertGreater(result.growth_rate, 0)
+        self.assertIsNone(forecast_cash_flow(['2025-01', '2025-02'], [1, 2], [0, 0]))
+
+    def test_nightly_command_upserts_forecasts(self):
+        """Test the command aggregates stored months into one forecast row per profile"""
+        user = User.objects.create_user(email='forecast@example.com', password='testpass123', user_type='sme')
+        profile = BusinessProfile.objects.create(
+            user=user, business_name='Forecast Ltd', mono_connected=True, mono_account_id='acc_fc'
+        )
+        rows = []
+        for months_ago in range(1, 7):
+            for index, (txn_type, naira) in enumerate([('credit', 60000 - 5000 * months_ago), ('debit', 20000)]):
+                rows.append(BankTransaction(
+                    transaction_id=f'fc-{months_ago}-{index}', account_id='acc_fc', date=_months_ago(months_ago),
+                    type=txn_type, amount=naira * 100
+                ))
+        # The current month is partial and left out of the fit
+        rows.append(BankTransaction(transaction_id='fc-now', account_id='acc_fc', date=timezone.now(), type='debit', amount=10 ** 9))
+        BankTransaction.objects.bulk_create(rows)
+
+        out = StringIO()
+        call_command('forecast_cash_flows', stdout=out)
+        call_command('forecast_cash_flows', stdout=out)
+        self.assertIn('Forecast 1 profile(s)', out.getvalue())
+        forecast = CashFlowForecast.objects.get(profile=profile)
+        self.assertEqual(forecast.months_observed, 6)
+        self.assertEqual(forecast.monthly_net, [10000.0, 15000.0, 20000.0, 25000.0, 30000.0, 35000.0])
+        self.assertEqual(forecast.net_3m, Decimal('135000.00'))
+        self.assertEqual(forecast.cash_flow_status, CashFlowForecast.Status.POSITIVE)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        """Set up two SMEs"""
+        self.first = User.objects.create_user(email='first@example.com', password='testpass123', user_type='sme')
+        self.second = User.objects.create_user(email='second@example.com', password='testpass123', user_type='sme')
+
+    def upload(self, user, content, name='shop.mp4'):
+        with self.captureOnCommitCallbacks(execute=True):
+            video = BusinessVideo.objects.filter(user=user).first() or BusinessVideo(user=user)
+            video.video_file = SimpleUploadedFile(name, content, content_type='video/mp4')
+            video.save()
+        return video
+
+    def test_identical_uploads_share_one_blob(self):
+        """Test the same bytes uploaded twice are stored once, named by their hash"""
+        first = self.upload(self.first, b'same video bytes', 'a.mp4')
+        second = self.upload(self.second, b'same video bytes', 'b.MP4')
+        self.assertEqual(first.video_file.name, second.video_file.name)
+        self.assertEqual(digest_from_name(first.video_file.name), hashlib.sha256(b'same video bytes').hexdigest())
+        self.assertEqual(StoredBlob.objects.get().ref_count, 2)
+        self.assertEqual(file_sha256(first.video_file), digest_from_name(first.video_file.name))
+
+    def test_replaced_files_are_collected(self):
+        """Test replacing or deleting a document drops the old blob once nothing refers to it"""
+        shared = self.upload(self.first, b'original bytes')
+        self.upload(self.second, b'original bytes')
+        old_name = shared.video_file.name
+        shared = self.upload(self.first, b'new bytes')
+        self.assertTrue(shared.video_file.storage.exists(old_name))  # Still used by the second SME
+        self.assertEqual(StoredBlob.objects.get(name=old_name).ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BusinessVideo.objects.get(user=self.second).delete()
+        self.assertFalse(shared.video_file.storage.exists(old_name))
+        self.assertEqual(list(StoredBlob.objects.values_list('name', flat=True)), [shared.video_file.name])
+
+    def test_resaving_same_content_keeps_count(self):
+        """Test uploading the same bytes again, or saving other fields, leaves the count alone"""
+        video = self.upload(self.first, b'same video bytes')
+        self.upload(self.first, b'same video bytes')
+        video.refresh_from_db()
+        video.save()
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+    def test_gc_media_spares_recent_blobs(self):
+        """Test a blob stored moments ago is kept even with no document pointing at it yet"""
+        storage = BusinessVideo._meta.get_field('video_file').storage
+        name = storage.save('videos/pending.mp4', SimpleUploadedFile('pending.mp4', b'in-flight bytes'))
+        StoredBlob.objects.filter(name=name).update(ref_count=0)
+
+        call_command('gc_media', stdout=StringIO())
+        self.assertTrue(storage.exists(name))
+        self.assertTrue(StoredBlob.objects.filter(name=name).exists())
+
+        call_command('gc_media', '--min-age', '0', stdout=StringIO())
+        self.assertFalse(storage.exists(name))
+
+    def test_gc_media_removes_orphaned_files(self):
+        """Test files from before content addressing are removed unless referenced"""
+        video = self.upload(self.first, b'kept bytes')
+        storage = video.video_file.storage
+        os.makedirs(storage.path('videos'), exist_ok=True)
+        for name in ('videos/test_video_C57ETTD.mp4', 'videos/test_video_ht5YEie.mp4'):
+            with open(storage.path(name), 'wb') as f:
+                f.write(b'old duplicate')
+        out = StringIO()
+        call_command('gc_media', '--min-age', '0', stdout=out)
+        self.assertIn('2 orphaned file(s)', out.getvalue())
+        self.assertFalse(storage.exists('videos/test_video_C57ETTD.mp4'))
+        self.assertTrue(storage.exists(video.video_file.name))
+
+
+@override_settings(GOOGLE_AI_API_KEY='test-key', MEDIA_ROOT=tempfile.mkdtemp())
+class PulseEngineIncrementalTests(TestCase):
+    def setUp(self):
+        """Set up a profile with a CAC document and a video"""
+        self.user = User.objects.create_user(
+            email='incremental@example.com',
+            password='testpass123',
+            user_type='sme'
+        )
+        self.business_profile = BusinessProfile.objects.create(
+            user=self.user,
+            business_name='Test Business Ltd',
+            industry='Retail',
+            business_description='We sell groceries'
+        )
+        CACDocument.objects.create(
+            user=self.user,
+            cac_file=SimpleUploadedFile('cac.png', b'fake image bytes', content_type='image/png')
+        )
+        BusinessVideo.objects.create(
+            user=self.user,
+            video_file=SimpleUploadedFile('shop.mp4', b'fake video bytes', content_type='video/mp4')
+        )
+        self.analyse_cac = MagicMock(return_value={'extracted_name': 'TEST BUSINESS LTD', 'raw_response': 'TEST BUSINESS LTD'})
+        self.analyse_video = MagicMock(return_value={'video_summary': 'A grocery shop', 'match': 'YES', 'raw_response': ''})
+
+    def verify(self):
+        with patch.object(PulseEngine, '_analyse_cac', self.analyse_cac), \
+                patch.object(PulseEngine, '_analyse_video', self.analyse_video):
+            engine = PulseEngine(self.user, 'Test Business Ltd')
+            engine.run_verification()
+        return engine
+
+    def test_unchanged_inputs_reuse_every_check(self):
+        """Test a description edit re-runs nothing and saves a new score version"""
+        first = self.verify()
+        self.business_profile.refresh_from_db()
+        self.business_profile.business_description = 'We sell groceries and household goods'
+        self.business_profile.save()
+        second = self.verify()
+
+        self.assertEqual(self.analyse_cac.call_count, 1)
+        self.assertEqual(self.analyse_video.call_count, 1)
+        self.assertEqual(second.score, first.score)
+        self.assertEqual(list(Score.objects.filter(user=self.user).values_list('version', flat=True).order_by('version')), [1, 2])
+        self.business_profile.refresh_from_db()
+        self.assertEqual(self.business_profile.latest_score, second.score_record)
+        self.assertEqual(
+            set(second.score_record.checks.filter(reused=True).values_list('name', flat=True)),
+            {'cac', 'video', 'bank'}
+        )
+
+    def test_changed_input_reruns_only_its_check(self):
+        """Test an industry change re-analyses the video but reuses the CAC result"""
+        self.verify()
+        self.business_profile.refresh_from_db()
+        self.business_profile.industry = 'Technology'
+        self.business_profile.save()
+        engine = self.verify()
+
+        self.assertEqual(self.analyse_cac.call_count, 1)
+        self.assertEqual(self.analyse_video.call_count, 2)
+        checks = {check.name: check for check in engine.score_record.checks.all()}
+        self.assertTrue(checks['cac'].reused)
+        self.assertFalse(checks['video'].reused)
+
+    def test_failed_checks_are_not_reused(self):
+        """Test a check that errored is retried on the next run"""
+        self.analyse_video.side_effect = [ValueError('bad response'), self.analyse_video.return_value]
+        first = self.verify()
+        self.assertIn("AI analysis of business video failed.", first.fail_reasons)
+        second = self.verify()
+        self.assertEqual(self.analyse_video.call_count, 2)
+        self.assertEqual(second.score, 100)
+
+
+@override_settings(GOOGLE_AI_API_KEY='test-key', MEDIA_ROOT=tempfile.mkdtemp())
+class PulseEngineConcurrencyTests(TestCase):
+    def setUp(self):
+        """Set up a profile with both a CAC document and a video"""
+        self.user = User.objects.create_user(
+            email='concurrent@example.com',
+            password='testpass123',
+            user_type='sme'
+        )
+        BusinessProfile.objects.create(
+            user=self.user,
+            business_name='Test Business Ltd',
+            industry='Technology'
+        )
+        CACDocument.objects.create(
+            user=self.user,
+            cac_file=SimpleUploadedFile('cac.png', b'cac bytes', content_type='image/png')
+        )
+        BusinessVideo.objects.create(
+            user=self.user,
+            video_file=SimpleUploadedFile('video.mp4', b'video bytes', content_type='video/mp4')
+        )
+
+    def slow_cac(self, check):
+        time.sleep(0.3)
+        return {'extracted_name': 'TEST BUSINESS LTD', 'raw_response': 'TEST BUSINESS LTD'}
+
+    def slow_video(self, check):
+        time.sleep(0.3)
+        return {'video_summary': 'A software office', 'match': 'YES', 'raw_response': ''}
+
+    def test_checks_run_concurrently(self):
+        """Test latency is close to the slowest check, not the sum"""
+        engine = PulseEngine(self.user, 'Test Business Ltd')
+        started = time.monotonic()
+        with patch.object(PulseEngine, '_analyse_cac', self.slow_cac), \
+                patch.object(PulseEngine, '_analyse_video', self.slow_video):
+            score, reason = engine.run_verification()
+        elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 0.55)
+        self.assertEqual(score, 100)
+        self.assertIsNone(reason)
+        self.assertTrue(BusinessVideo.objects.get(user=self.user).verified)
+
+    def test_check_deadline(self):
+        """Test a check that exceeds its deadline is penalised, others still count"""
+        engine = PulseEngine(self.user, 'Test Business Ltd')
+        engine.check_timeouts = {'cac': 0.05, 'video': 5}
+        with patch.object(PulseEngine, '_analyse_cac', self.slow_cac), \
+                patch.object(PulseEngine, '_analyse_video', self.slow_video):
+            score, reason = engine.run_verification()
+
+        self.assertIn('AI analysis of CAC document timed out', reason)
+        self.assertEqual(engine.score, -40 + 40 + 20)
+
+    def test_throttled_check_is_deferred_not_penalised(self):
+        """Test a check that timed out waiting for Gemini quota is deferred and no score is saved"""
+        limiter = QuotaLimiter(60, 1000000)  # One request a second
+        limiter.requests.try_acquire(60)  # The minute's requests are used up
+
+        def throttled_cac(engine, check):
+            limiter.acquire()
+            return self.slow_cac(check)
+
+        engine = PulseEngine(self.user, 'Test Business Ltd')
+        engine.check_timeouts = {'cac': 0.2, 'video': 5}
+        with patch.object(PulseEngine, '_analyse_cac', throttled_cac), \
+                patch.object(PulseEngine, '_analyse_video', self.slow_video):
+            score, reason = engine.run_verification()
+
+        self.assertEqual(engine.deferred, ['cac'])
+        self.assertIsNone(reason)
+        self.assertFalse(Score.objects.filter(user=self.user).exists())
+
+    def test_check_without_a_free_worker_is_deferred(self):
+        """Test checks that never got a pool thread before their deadline are deferred"""
+        release = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(pool.shutdown)
+        self.addCleanup(release.set)
+        pool.submit(release.wait)  # Another verification's check holds the only worker
+
+        engine = PulseEngine(self.user, 'Test Business Ltd')
+        engine.check_timeouts = {'cac': 0.05, 'video': 0.1}
+        with patch('core.services.get_check_pool', return_value=pool), \
+                patch.object(PulseEngine, '_analyse_cac', self.slow_cac), \
+                patch.object(PulseEngine, '_analyse_video', self.slow_video):
+            score, reason = engine.run_verification()
+
+        self.assertEqual(engine.deferred, ['cac', 'video'])
+        self.assertIsNone(reason)
+
+
+class _OkHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+class GeminiClientRegistryTests(TestCase):
+    @override_settings(GOOGLE_AI_API_KEY='test-key')
+    def test_client_is_shared_per_process(self):
+        """Test engines reuse one lazily created client"""
+        user = User.objects.create_user(email='pool@example.com', password='testpass123', user_type='sme')
+        first = PulseEngine(user, 'Name')
+        second = ProfitEngine(user, 'acc_123')
+        self.assertIs(first.client, second.client)
+        self.assertIs(first.client, get_ai_client('test-key'))
+        self.assertIs(first.client._client.client, get_genai_client('test-key'))
+
+    @override_settings(GOOGLE_AI_API_KEY='test-key')
+    def test_registry_resets_after_fork(self):
+        """Test a forked child builds its own client"""
+        parent_client = get_genai_client()
+        clients._reset_after_fork()
+        self.assertIsNot(get_genai_client(), parent_client)
+
+    def test_counting_transport_reports_reuse(self):
+        """Test keep-alive connections are counted as reused"""
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _OkHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        transport = CountingTransport()
+        try:
+            with httpx.Client(transport=transport) as http:
+                for _ in range(3):
+                    http.get(f"http://127.0.0.1:{server.server_port}/")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        stats = transport.stats()
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['connectionsOpened'], 1)
+        self.assertEqual(stats['reusedRequests'], 2)
+
+
+def make_document_image(size=(2400, 3200), skew=0, noise=False):
+    """A white page with dark text-like bars, optionally rotated and noisy like a phone photo"""
+    page = Image.new('L', size, 255)
+    draw = ImageDraw.Draw(page)
+    for y in range(size[1] // 5, size[1] * 4 // 5, 120):
+        draw.rectangle((size[0] // 6, y, size[0] * 5 // 6, y + 40), fill=0)
+    if noise:
+        page = Image.blend(page, Image.effect_noise(size, 40), 0.15)
+    if skew:
+        page = page.rotate(skew, expand=True, fillcolor=255)
+    return page
+
+
+class CACPreprocessingTests(TestCase):
+    def test_photo_is_cropped_deskewed_and_shrunk(self):
+        """Test a large skewed PNG becomes a small upright JPEG"""
+        buffer = BytesIO()
+        make_document_image(skew=3, noise=True).save(buffer, format='PNG')
+        original = buffer.getvalue()
+
+        result = preprocess_cac(original, 'image/png', max_side=1000)
+        self.assertTrue(result.applied)
+        self.assertEqual(result.mime_type, 'image/jpeg')
+        self.assertLess(result.processed_bytes, result.original_bytes)
+        self.assertEqual(result.bytes_saved, len(original) - len(result.content))
+
+        processed = Image.open(BytesIO(result.content))
+        self.assertLessEqual(max(processed.size), 1000)
+
+    def test_deskew_recovers_rotation(self):
+        """Test the deskew search undoes a small rotation"""
+        skewed = make_document_image(size=(1200, 1600), skew=2)
+        self.assertAlmostEqual(preprocessing._estimate_skew(skewed), -2, delta=0.5)
+        self.assertEqual(preprocessing._estimate_skew(make_document_image(size=(1200, 1600))), 0)
+
+    def test_only_first_pdf_page_is_rasterized(self):
+        """Test multi-page PDFs are reduced to their first page"""
+        pages = [make_document_image(size=(1240, 1754)).convert('RGB') for _ in range(3)]
+        buffer = BytesIO()
+        pages[0].save(buffer, format='PDF', save_all=True, append_images=pages[1:])
+
+        result = preprocess_cac(buffer.getvalue(), 'application/pdf')
+        self.assertTrue(result.applied)
+        self.assertEqual(Image.open(BytesIO(result.content)).format, 'JPEG')
+
+    def test_unreadable_file_passes_through(self):
+        """Test files Pillow cannot read are sent unchanged"""
+        result = preprocess_cac(b'dummy pdf content', 'application/pdf')
+        self.assertFalse(result.applied)
+        self.assertEqual(result.content, b'dummy pdf content')
+        self.assertEqual(result.bytes_saved, 0)
+
+    @override_settings(CAC_PREPROCESS_ENABLED=False)
+    def test_disabled_preprocessing_passes_through(self):
+        """Test the setting switches preprocessing off"""
+        result = preprocess_cac_document(b'abc', 'image/png')
+        self.assertFalse(result.applied)
+
+
+class KeyframeSamplingTests(TestCase):
+    def test_split_jpeg_stream(self):
+        """Test MJPEG pipe output is split into frames"""
+        frame_a = b'\xff\xd8' + b'aaaa' + b'\xff\xd9'
+        frame_b = b'\xff\xd8' + b'bb' + b'\xff\xd9'
+        self.assertEqual(split_jpeg_stream(frame_a + frame_b + b'\xff\xd8partial'), [frame_a, frame_b])
+
+    def test_thin_evenly(self):
+        """Test candidate frames are thinned across the whole clip"""
+        self.assertEqual(thin_evenly(list(range(10)), 4), [0, 3, 6, 9])
+        self.assertEqual(thin_evenly([1, 2], 6), [1, 2])
+
+    @patch('core.keyframes.shutil.which', side_effect=lambda name: f'/usr/bin/{name}')
+    def test_scene_changes_across_the_whole_clip_are_kept(self, _which):
+        """Test scene changes past the candidate count are not cut off and are thinned across the clip"""
+        frames = [b'\xff\xd8' + str(i).encode() + b'\xff\xd9' for i in range(40)]
+        commands = []
+
+        def run(command, **kwargs):
+            commands.append(command)
+            stdout = b'120.0\n' if command[0].endswith('ffprobe') else b''.join(frames)
+            return SimpleNamespace(stdout=stdout)
+
+        with patch('core.keyframes.subprocess.run', side_effect=run):
+            keyframes = extract_keyframes('/tmp/video.mp4', max_frames=6)
+
+        ffmpeg = commands[-1]
+        self.assertNotIn('-frames:v', ffmpeg)
+        self.assertIn('gte(t-prev_selected_t\\,5.000)', ffmpeg[ffmpeg.index('-vf') + 1])  # 120s over 24 candidates
+        self.assertEqual(keyframes, thin_evenly(frames, 6))
+        self.assertEqual(keyframes[-1], frames[-1])
+
+    @patch('core.keyframes.shutil.which', return_value=None)
+    def test_missing_ffmpeg_raises(self, _which):
+        """Test extraction fails cleanly without ffmpeg"""
+        with self.assertRaises(KeyframeExtractionError):
+            extract_keyframes('/tmp/video.mp4')
+
+
+@override_settings(GOOGLE_AI_API_KEY='test-key', MEDIA_ROOT=tempfile.mkdtemp(), VIDEO_KEYFRAME_MODE=True)
+class PulseEngineKeyframeTests(TestCase):
+    def setUp(self):
+        """Set up a profile with a video and a mocked Gemini client"""
+        self.user = User.objects.create_user(
+            email='keyframes@example.com',
+            password='testpass123',
+            user_type='sme'
+        )
+        self.business_profile = BusinessProfile.objects.create(
+            user=self.user,
+            business_name='Test Business Ltd',
+            industry='Retail'
+        )
+        BusinessVideo.objects.create(
+            user=self.user,
+            video_file=SimpleUploadedFile('video.mp4', b'video bytes', content_type='video/mp4')
+        )
+        self.engine = PulseEngine(self.user, 'Test Business Ltd')
+        self.engine.profile = self.business_profile
+        self.engine.client = MagicMock()
+        self.engine.client.models.generate_content.return_value = SimpleNamespace(
+            text="Summary: A shop with shelves of goods\nMatch: YES"
+        )
+
+    @patch('core.services.extract_keyframes', return_value=[b'\xff\xd8one\xff\xd9', b'\xff\xd8two\xff\xd9'])
+    def test_keyframes_sent_inline(self, _extract):
+        """Test keyframes go out in a single call without a file upload"""
+        self.engine.verify_video_vs_stated()
+        self.engine.client.files.upload.assert_not_called()
+        contents = self.engine.client.models.generate_content.call_args.kwargs['contents']
+        self.assertEqual(len(contents), 3)
+        self.assertEqual(self.engine.score, 20)
+
+    @patch('core.services.extract_keyframes', side_effect=KeyframeExtractionError('no ffmpeg'))
+    def test_falls_back_to_full_upload(self, _extract):
+        """Test a sampling failure falls back to the Files API upload"""
+        self.engine.client.files.upload.return_value = FakeFile('files/v', 'ACTIVE')
+        self.engine.verify_video_vs_stated()
+        self.engine.client.files.upload.assert_called_once()
+        self.engine.client.files.delete.assert_called_once_with(name='files/v')
+        self.assertEqual(self.engine.score, 20)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class QuotaLimiterTests(TestCase):
+    def test_bucket_blocks_until_refilled(self):
+        """Test a drained bucket waits for the per-minute refill"""
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock=clock, sleep=clock.sleep)
+        for _ in range(60):
+            bucket.acquire()
+        self.assertAlmostEqual(bucket.try_acquire(), 1.0)
+        bucket.acquire()
+        self.assertAlmostEqual(clock.now, 1.0)
+
+    def test_settle_charges_underestimates(self):
+        """Test real token usage is charged back to the bucket"""
+        clock = FakeClock()
+        limiter = QuotaLimiter(100, 1000, clock=clock, sleep=clock.sleep)
+        limiter.acquire(100)
+        limiter.settle(100, 1000)
+        self.assertAlmostEqual(limiter.tokens.try_acquire(100), 6.0)
+
+    def test_client_wrapper_limits_generate_content(self):
+        """Test generate_content goes through the limiter and files do not"""
+        inner = MagicMock()
+        inner.models.generate_content.return_value = SimpleNamespace(
+            text='ok', usage_metadata=SimpleNamespace(total_token_count=50)
+        )
+        limiter = MagicMock()
+        client = RateLimitedClient(inner, limiter)
+
+        client.models.generate_content(model='m', contents=['x' * 400], config=None)
+        client.files.delete(name='files/a')
+
+        limiter.acquire.assert_called_once_with(estimate_tokens(['x' * 400]))
+        limiter.settle.assert_called_once_with(estimate_tokens(['x' * 400]), 50)
+        inner.files.delete.assert_called_once_with(name='files/a')
+
+
+def _fake_pulse_engine(calls, names=None):
+    class FakePulseEngine:
+        def __init__(self, user, bank_account_name):
+            self.user = user
+            self.deferred = []
+            calls.append(user.pk)
+            if names is not None:
+                names[user.pk] = bank_account_name
+
+        def run_verification(self):
+            return 60, None
+    return FakePulseEngine
+
+
+@override_settings(GOOGLE_AI_API_KEY='test-key')
+class RescoreCommandTests(TransactionTestCase):
+    def setUp(self):
+        """Create a few profiles to re-score"""
+        self.profiles = []
+        for i in range(5):
+            user = User.objects.create_user(email=f'rescore{i}@example.com', password='testpass123', user_type='sme')
+            self.profiles.append(BusinessProfile.objects.create(
+                user=user, business_name=f'Biz {i}', mono_connected=True, mono_account_name=f'BIZ {i} LTD'
+            ))
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+
+    def test_rescores_all_profiles(self):
+        """Test every profile is scored, written back and checkpointed"""
+        calls = []
+        with patch('core.management.commands.rescore.PulseEngine', _fake_pulse_engine(calls)):
+            call_command('rescore', '--concurrency', '3', '--batch-size', '2',
+                         '--checkpoint', self.checkpoint, stdout=StringIO())
+
+        self.assertEqual(sorted(calls), sorted(p.user_id for p in self.profiles))
+        self.assertEqual(BusinessProfile.objects.filter(pulse_score=60, verification_status='verified').count(), 5)
+        with open(self.checkpoint) as f:
+            checkpoint = json.load(f)
+        self.assertEqual(checkpoint['last_pk'], self.profiles[-1].pk)
+        self.assertEqual(checkpoint['processed'], 5)
+
+    def test_resume_skips_finished_profiles(self):
+        """Test --resume continues after the checkpoint and retries failures"""
+        with open(self.checkpoint, 'w') as f:
+            json.dump({'last_pk': self.profiles[2].pk, 'processed': 3, 'failed': [self.profiles[0].pk]}, f)
+
+        calls = []
+        with patch('core.management.commands.rescore.PulseEngine', _fake_pulse_engine(calls)):
+            call_command('rescore', '--resume', '--checkpoint', self.checkpoint, stdout=StringIO())
+
+        expected = [self.profiles[i].user_id for i in (0, 3, 4)]
+        self.assertEqual(sorted(calls), sorted(expected))
+        with open(self.checkpoint) as f:
+            checkpoint = json.load(f)
+        self.assertEqual(checkpoint['processed'], 6)
+        self.assertEqual(checkpoint['failed'], [])
+
+    def test_account_name_falls_back_to_bank_details(self):
+        """Test profiles connected before the account name was stored are scored with the disbursement name or skipped"""
+        BusinessProfile.objects.filter(pk=self.profiles[1].pk).update(mono_account_name='', bank_account_name='BIZ ONE LTD')
+        BusinessProfile.objects.filter(pk=self.profiles[2].pk).update(mono_account_name='')
+
+        calls, names = [], {}
+        out = StringIO()
+        with patch('core.management.commands.rescore.PulseEngine', _fake_pulse_engine(calls, names)):
+            call_command('rescore', '--checkpoint', self.checkpoint, stdout=out)
+
+        self.assertEqual(names[self.profiles[0].user_id], 'BIZ 0 LTD')
+        self.assertEqual(names[self.profiles[1].user_id], 'BIZ ONE LTD')
+        self.assertNotIn(self.profiles[2].user_id, calls)
+        self.assertIn('1 connected profile(s) skipped', out.getvalue())
+        self.assertEqual(BusinessProfile.objects.get(pk=self.profiles[2].pk).verification_status, 'pending')
+
+    def test_unconnected_profiles_are_left_alone(self):
+        """Test SMEs that never connected a bank account are not scored or marked failed"""
+        BusinessProfile.objects.filter(pk=self.profiles[0].pk).update(mono_connected=False, mono_account_name='')
+
+        calls = []
+        out = StringIO()
+        with patch('core.management.commands.rescore.PulseEngine', _fake_pulse_engine(calls)):
+            call_command('rescore', '--checkpoint', self.checkpoint, stdout=out)
+
+        self.assertNotIn(self.profiles[0].user_id, calls)
+        self.assertEqual(len(calls), 4)
+        profile = BusinessProfile.objects.get(pk=self.profiles[0].pk)
+        self.assertEqual((profile.verification_status, profile.pulse_score), ('pending', 0))
+        self.assertNotIn('skipped', out.getvalue())
+
+
+def throttled():
+    return genai_errors.ClientError(429, {'error': {'message': 'Resource exhausted', 'status': 'RESOURCE_EXHAUSTED'}})
+
+
+class CircuitBreakerTests(TestCase):
+    def test_opens_after_upstream_failures_and_recovers(self):
+        """Test the breaker fails fast once tripped and closes after a good trial call"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+        failing = MagicMock(side_effect=throttled())
+
+        for _ in range(2):
+            with self.assertRaises(UpstreamUnavailable):
+                breaker.call(failing)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        # Open: no call goes out
+        with self.assertRaises(UpstreamUnavailable):
+            breaker.call(failing)
+        self.assertEqual(failing.call_count, 2)
+
+        clock.now += 31
+        self.assertEqual(breaker.call(lambda: 'ok'), 'ok')
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_caller_errors_do_not_trip_breaker(self):
+        """Test a bad request is re-raised as-is and not counted"""
+        breaker = CircuitBreaker(failure_threshold=1)
+        bad_request = genai_errors.ClientError(400, {'error': {'message': 'Bad image', 'status': 'INVALID_ARGUMENT'}})
+        with self.assertRaises(genai_errors.ClientError):
+            breaker.call(MagicMock(side_effect=bad_request))
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_file_store_shares_budget_across_limiters(self):
+        """Test two limiters (e.g. two processes) draw from the same file-backed budget"""
+        path = os.path.join(tempfile.mkdtemp(), 'quota.json')
+        clock = FakeClock()
+        first = TokenBucket(2, store=FileBucketStore(path), key='rpm', clock=clock)
+        second = TokenBucket(2, store=FileBucketStore(path), key='rpm', clock=clock)
+        self.assertEqual(first.try_acquire(), 0)
+        self.assertEqual(second.try_acquire(), 0)
+        self.assertGreater(first.try_acquire(), 0)
+
+
+@override_settings(GOOGLE_AI_API_KEY='test-key', MEDIA_ROOT=tempfile.mkdtemp())
+class PulseEngineDeferralTests(TestCase):
+    def setUp(self):
+        """Set up a profile with a CAC document and a throttled Gemini client"""
+        self.user = User.objects.create_user(
+            email='deferred@example.com',
+            password='testpass123',
+            user_type='sme'
+        )
+        self.business_profile = BusinessProfile.objects.create(
+            user=self.user,
+            business_name='Test Business Ltd',
+            industry='Technology',
+            pulse_score=55
+        )
+        CACDocument.objects.create(
+            user=self.user,
+            cac_file=SimpleUploadedFile('cac.png', b'fake image bytes', content_type='image/png')
+        )
+        self.inner = MagicMock()
+        self.inner.models.generate_content.side_effect = throttled()
+
+    def guarded_client(self):
+        return RateLimitedClient(self.inner, QuotaLimiter(100, 100000), CircuitBreaker())
+
+    def test_throttled_check_is_deferred_not_penalised(self):
+        """Test a 429 from Gemini defers the CAC check instead of costing 40 points"""
+        engine = PulseEngine(self.user, 'Test Business Ltd')
+        engine.client = self.guarded_client()
+        score, fail_reason = engine.run_verification()
+        self.assertEqual(engine.deferred, ['cac'])
+        self.assertEqual(score, 20)  # Bank name match, no video; CAC not counted either way
+        self.assertNotIn('CAC', fail_reason)
+
+    def test_video_stuck_in_processing_is_deferred(self):
+        """Test a video Gemini never finished processing is deferred rather than costing its points"""
+        engine = PulseEngine(self.user, 'Test Business Ltd')
+        error = FileProcessingTimeout("Gemini file files/a still processing after deadline")
+        self.assertTrue(is_upstream_failure(error))
+        engine._check_failed('video', error)
+        self.assertEqual(engine.deferred, ['video'])
+        self.assertEqual(engine.score, 0)
+        self.assertFalse(is_upstream_failure(FileProcessingError("Gemini failed to process files/a")))
+
+    def test_deferred_job_is_requeued_without_using_an_attempt(self):
+        """Test the verification job keeps the old score and is retried later"""
+        job = enqueue(Job.Kind.PULSE_VERIFICATION, payload={'account_name': 'Test Business Ltd'}, user=self.user)
+        with patch.object(PulseEngine, 'client', self.guarded_client()):
+            job = run_next('worker-1')
+
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertEqual(job.attempts, 0)
+        self.assertGreater(job.run_after, timezone.now())
+        self.business_profile.refresh_from_db()
+        self.assertEqual(self.business_profile.verification_status, 'deferred')
+        self.assertEqual(self.business_profile.pulse_score, 55)
+
+
+class ReplayProviderTests(TestCase):
+    def setUp(self):
+        """Create a fixture directory with one recorded response and a fallback"""
+        self.directory = tempfile.mkdtemp()
+        self.contents = ['Extract the name']
+        with open(os.path.join(self.directory, f"{request_key('m', self.contents)}.json"), 'w') as f:
+            json.dump({'text': 'EXACT LTD', 'usage': {'total': 12}}, f)
+        with open(os.path.join(self.directory, 'fallback.json'), 'w') as f:
+            json.dump([{'contains': 'video', 'text': 'Summary: shop\nMatch: YES'}], f)
+
+    def test_exact_then_fallback_then_miss(self):
+        """Test recorded responses win, fallbacks match on prompt text, and misses raise"""
+        provider = ReplayProvider(self.directory)
+        response = provider.models.generate_content(model='m', contents=self.contents)
+        self.assertEqual(response.text, 'EXACT LTD')
+        self.assertEqual(response.usage_metadata.total_token_count, 12)
+        self.assertEqual(provider.models.generate_content(model='m', contents=['Analyze this video']).text,
+                         'Summary: shop\nMatch: YES')
+        with self.assertRaises(ReplayMiss):
+            provider.models.generate_content(model='m', contents=['Something else'])
+
+    def test_injected_latency_and_errors(self):
+        """Test latency is slept and errors surface as upstream failures"""
+        slept = []
+        provider = ReplayProvider(self.directory, latency_ms=250, error_rate=1.0, error_code=429, sleep=slept.append)
+        with self.assertRaises(genai_errors.ClientError) as raised:
+            provider.models.generate_content(model='m', contents=self.contents)
+        self.assertEqual(raised.exception.code, 429)
+        self.assertEqual(slept, [0.25])
+
+    def test_recording_replays_with_uploaded_files(self):
+        """Test a recorded upload + generate call replays offline"""
+        video_path = os.path.join(self.directory, 'video.mp4')
+        with open(video_path, 'wb') as f:
+            f.write(b'video bytes')
+
+        live = MagicMock()
+        live.upload_file.return_value = SimpleNamespace(name='files/abc123', state='ACTIVE')
+        live.generate_content.return_value = SimpleNamespace(text='Summary: bakery\nMatch: NO', usage_metadata=None)
+        recorder = RecordingProvider(live, self.directory)
+        uploaded = recorder.files.upload(file=video_path)
+        recorder.models.generate_content(model='m', contents=['Describe the clip', uploaded])
+
+        replay = ReplayProvider(self.directory)
+        uploaded = replay.files.upload(file=video_path)
+        response = replay.models.generate_content(model='m', contents=['Describe the clip', uploaded])
+        self.assertEqual(response.text, 'Summary: bakery\nMatch: NO')
+
+
+@override_settings(GOOGLE_AI_API_KEY='test-key', MEDIA_ROOT=tempfile.mkdtemp(), AI_PROVIDER='replay',
+                   CAC_PREPROCESS_ENABLED=False)
+class BenchmarkVerificationTests(TransactionTestCase):
+    def test_benchmark_runs_offline(self):
+        """Test the benchmark verifies synthetic SMEs against the shipped replay fixtures"""
+        out = StringIO()
+        # One thread: SQLite's shared-cache test database locks tables across threads
+        call_command('benchmark_verification', '--profiles', '3', '--concurrency', '1', '--keep', stdout=out)
+        self.assertIn('3 verification(s)', out.getvalue())
+        self.assertIn('mean pulse score 100.0', out.getvalue())
+        self.assertEqual(CACDocument.objects.filter(extracted_name='PULSEFI BENCHMARK LTD').count(), 3)
+
+    @override_settings(AI_PROVIDER='gemini')
+    def test_benchmark_refuses_live_api_by_default(self):
+        """Test the benchmark does not spend real quota unless asked to"""
+        with self.assertRaises(CommandError):
+            call_command('benchmark_verification', '--profiles', '1', stdout=StringIO())
+
+
+class BenchmarkMarketplaceTests(TransactionTestCase):
+    @override_settings(DEBUG=True)
+    def test_indexes_serve_marketplace_queries(self):
+        """Test the benchmark reports indexed plans and rolls back its profiles and index changes"""
+        out = StringIO()
+        call_command('benchmark_marketplace', '--profiles', '500', '--repeat', '2', stdout=out)
+        before, after = out.getvalue().split('== After ==')
+        self.assertNotIn('USING INDEX sme_profile_', before)
+        self.assertIn('USING INDEX sme_profile_status_pulse', after)
+        self.assertIn('USING INDEX sme_profile_verified_category', after)
+        self.assertFalse(BusinessProfile.objects.exists())
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, BusinessProfile._meta.db_table)
+        self.assertTrue({index.name for index in BusinessProfile._meta.indexes} <= set(constraints))
+
+    def test_refuses_live_database_by_default(self):
+        """Test the benchmark does not lock a production profiles table unless asked to"""
+        with self.assertRaisesMessage(CommandError, '--allow-live'):
+            call_command('benchmark_marketplace', '--profiles', '10', stdout=StringIO())
+        self.assertFalse(BusinessProfile.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class PulseEngineIdentityTests(TestCase):
+    def setUp(self):
+        """Set up a profile whose bank account is already used by another business"""
+        first = User.objects.create_user(email='owner@example.com', password='testpass123', user_type='sme')
+        BusinessProfile.objects.create(user=first, business_name='Original Biz', bank_account_number='0123456789')
+        self.user = User.objects.create_user(email='copycat@example.com', password='testpass123', user_type='sme')
+        self.profile = BusinessProfile.objects.create(
+            user=self.user, business_name='Copy Biz Ltd', industry='Retail', bank_account_number='0123456789'
+        )
+
+    def test_collisions_are_flagged(self):
+        """Test a reused bank account is reported without changing the score or failing verification"""
+        engine = PulseEngine(self.user, 'COPY BIZ LIMITED')
+        score, fail_reason = engine.run_verification()
+        self.assertIn('bank_account_number', engine.collisions)
+        self.assertEqual(engine.review_flags, ['Identity collision: bank account number is also used by 1 other business profile(s).'])
+        self.assertNotIn('Identity collision', fail_reason)
+        self.assertEqual(score, 0)  # Bank name match (+40), no CAC (-40), no video (-20)
+        self.assertEqual(engine.score_record.review_flags, engine.review_flags)
+
+    def test_colliding_valid_profile_stays_verified(self):
+        """Test a profile that passes every check is verified despite the collision, with the flag in the job result"""
+        CACDocument.objects.create(user=self.user, cac_file=SimpleUploadedFile('cac.png', b'cac bytes', content_type='image/png'))
+        BusinessVideo.objects.create(user=self.user, video_file=SimpleUploadedFile('video.mp4', b'video bytes', content_type='video/mp4'))
+        enqueue(Job.Kind.PULSE_VERIFICATION, payload={'account_name': 'COPY BIZ LIMITED'}, user=self.user)
+
+        cac = {'extracted_name': 'COPY BIZ LTD', 'raw_response': 'COPY BIZ LTD'}
+        video = {'video_summary': 'A shop with stocked shelves', 'match': 'YES', 'raw_response': ''}
+        with patch.object(PulseEngine, '_analyse_cac', return_value=cac), \
+                patch.object(PulseEngine, '_analyse_video', return_value=video):
+            job = run_next('worker-1')
+
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.verification_status, 'verified')
+        self.assertEqual(self.profile.pulse_score, 100)
+        self.assertIsNone(job.result['failReason'])
+        self.assertIn('bank account number', job.result['reviewFlags'][0])
+        self.assertEqual(self.profile.latest_score.status, Score.Status.VERIFIED)
+
+
+@override_settings(GOOGLE_AI_API_KEY='test-key', MEDIA_ROOT=tempfile.mkdtemp())
+class VerificationEventTests(TestCase):
+    def setUp(self):
+        """Set up a profile with a CAC document"""
+        self.user = User.objects.create_user(
+            email='events@example.com',
+            password='testpass123',
+            user_type='sme'
+        )
+        BusinessProfile.objects.create(user=self.user, business_name='Test Business Ltd', industry='Retail')
+        CACDocument.objects.create(
+            user=self.user,
+            cac_file=SimpleUploadedFile('cac.png', b'fake image bytes', content_type='image/png')
+        )
+
+    def test_engine_reports_each_stage(self):
+        """Test progress events cover every check and end with the final score"""
+        events = []
+        engine = PulseEngine(self.user, 'Test Business Ltd', on_event=lambda *event: events.append(event))
+        engine.client = MagicMock()
+        engine.client.models.generate_content.return_value = SimpleNamespace(text='TEST BUSINESS LTD')
+        score, _ = engine.run_verification()
+
+        stages = [(stage, status) for stage, status, _ in events]
+        self.assertEqual(stages[0], ('verification', 'started'))
+        for expected in [('cac', 'started'), ('cac', 'ocr_started'), ('cac', 'finished'),
+                         ('bank', 'finished'), ('identity', 'finished'), ('video', 'missing')]:
+            self.assertIn(expected, stages)
+        self.assertEqual(events[-1], ('verification', 'finished',
+                                      {'pulseScore': score, 'failReason': 'Business Video missing.', 'deferred': [], 'reviewFlags': []}))
+
+    def test_job_records_events_and_stream_replays_them(self):
+        """Test the job stores numbered events and the SSE stream resumes after Last-Event-ID"""
+        job = enqueue(Job.Kind.PULSE_VERIFICATION, payload={'account_name': 'Test Business Ltd'}, user=self.user)
+        with patch.object(PulseEngine, 'client', MagicMock()):
+            job = run_next('worker-1')
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+
+        seqs = list(job.events.values_list('seq', flat=True).order_by('seq'))
+        self.assertEqual(seqs, list(range(1, len(seqs) + 1)))
+
+        async def collect(last_seq):
+            return [frame async for frame in stream_job_events(job.id, last_seq, poll_interval=0.01)]
+
+        frames = async_to_sync(collect)(0)
+        self.assertEqual(frames[0], "retry: 3000\n\n")
+        self.assertTrue(frames[1].startswith("id: 1\nevent: verification\n"))
+        self.assertTrue(frames[-1].startswith("event: end\n"))
+        self.assertEqual(len(frames), len(seqs) + 2)
+
+        resumed = async_to_sync(collect)(seqs[-2])
+        self.assertEqual(len(resumed), 3)
+        self.assertIn('"pulseScore"', resumed[1])
@@ -48,7 +48,7 @@ class PaystackService:
 
     def __init__(self):
         self.secret_key = getattr(settings, 'PAYSTACK_SECRET_KEY', 'sk_test_...')
-        self.base_url = "https://api.paystack.co"
+        self.base_url = getattr(settings, 'PAYSTACK_BASE_URL', 'https://api.paystack.co').rstrip('/')
         self.headers = {
             "Authorization": f"Bearer {self.secret_key}",
             "Content-Type": "application/json"
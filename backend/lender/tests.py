@@ -3,7 +3,7 @@ from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from sme.models import BusinessProfile
+from sme.models import BusinessProfile, CashFlowForecast
 from .models import LenderProfile, SMEInterest
 
 User = get_user_model()
@@ -96,6 +96,49 @@ class LenderAPITests(APITestCase):
         # Should return the verified SMEs
         self.assertGreaterEqual(len(response.data), 2)
 
+    def test_marketplace_ranks_by_cash_flow_forecast(self):
+        """Test forecast fields replace the mocked growth rate and sortBy=forecastCashFlow ranks by them"""
+        CashFlowForecast.objects.create(
+            profile=self.sme_profile1, months_observed=9, monthly_net=[100000.0] * 9,
+            monthly_forecast=[110000.0] * 6, net_3m=330000, lower_3m=250000, upper_3m=410000,
+            net_6m=660000, lower_6m=500000, upper_6m=820000, growth_rate=0.0425,
+            cash_flow_status=CashFlowForecast.Status.POSITIVE
+        )
+        url = reverse('marketplace-list')
+
+        smes = self.client.get(url).data['data']['smes']
+        self.assertEqual(smes[0]['businessName'], 'Retail Store')  # Default: highest Pulse Score first
+        self.assertIsNone(smes[0]['growthRate'])
+        self.assertEqual(smes[0]['cashFlowStatus'], 'unknown')
+
+        smes = self.client.get(url, {'sortBy': 'forecastCashFlow'}).data['data']['smes']
+        self.assertEqual(smes[0]['businessName'], 'Tech Startup 1')
+        self.assertEqual(smes[0]['growthRate'], 4.2)
+        self.assertEqual(smes[0]['cashFlowStatus'], 'positive')
+        self.assertEqual(smes[0]['cashFlowForecast']['next6Months'], {'netCashFlow': 660000.0, 'low': 500000.0, 'high': 820000.0})
+
+    def test_marketplace_tracks_page_views_in_constant_queries(self):
+        """Test a page load records views for the returned SMEs only, with the same query count at any size"""
+        url = reverse('marketplace-list')
+        # Lender profile, the page and one bulk insert of views
+        with self.assertNumQueries(3):
+            self.client.get(url)
+        self.assertEqual(SMEInterest.objects.filter(lender=self.lender_profile, status='viewed').count(), 2)
+
+        SMEInterest.objects.filter(sme_business=self.sme_profile1).update(status='interested')
+        for index in range(12):
+            user = User.objects.create_user(email=f'bulk{index}@example.com', password='testpass123', user_type='sme')
+            BusinessProfile.objects.create(
+                user=user, business_name=f'Bulk SME {index}', verification_status='verified', pulse_score=76
+            )
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        shown = {int(sme['id']) for sme in response.data['data']['smes']}
+        tracked = set(SMEInterest.objects.filter(lender=self.lender_profile).values_list('sme_business_id', flat=True))
+        self.assertEqual(len(shown), 10)
+        self.assertEqual(tracked, shown)  # 14 verified SMEs, only the page of 10 recorded
+        self.assertEqual(SMEInterest.objects.get(sme_business=self.sme_profile1).status, 'interested')
+
     def test_marketplace_detail(self):
         """Test marketplace detail view"""
         url = reverse('marketplace-detail', kwargs={'pk': self.sme_profile1.pk})
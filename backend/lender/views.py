@@ -3,7 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
-from django.db.models import Q
+from django.db.models import F, Q
 from django.shortcuts import get_object_or_404
 from datetime import datetime
 from .models import LenderProfile, SMEInterest, SearchFilter
@@ -32,6 +32,67 @@ class LenderProfileViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+# sortBy values for the marketplace list; forecast rankings use the nightly CashFlowForecast
+MARKETPLACE_ORDERINGS = {
+    'pulseScore': [F('pulse_score').desc()],
+    'forecastGrowth': [F('cash_flow_forecast__growth_rate').desc(nulls_last=True), F('pulse_score').desc()],
+    'forecastCashFlow': [F('cash_flow_forecast__net_6m').desc(nulls_last=True), F('pulse_score').desc()],
+}
+
+
+def _forecast_window(net, lower, upper):
+    return {"netCashFlow": float(net), "low": float(lower), "high": float(upper)}
+
+
+def _forecast_data(sme):
+    """The SME's precomputed cash-flow forecast, or None if it has none yet."""
+    forecast = getattr(sme, 'cash_flow_forecast', None)
+    if forecast is None:
+        return None
+    return {
+        "next3Months": _forecast_window(forecast.net_3m, forecast.lower_3m, forecast.upper_3m),
+        "next6Months": _forecast_window(forecast.net_6m, forecast.lower_6m, forecast.upper_6m),
+        "monthly": forecast.monthly_forecast,
+        "monthsObserved": forecast.months_observed,
+        "method": forecast.method,
+        "computedAt": forecast.computed_at.isoformat()
+    }
+
+
+def _growth_rate(sme):
+    forecast = getattr(sme, 'cash_flow_forecast', None)
+    return round(forecast.growth_rate * 100, 1) if forecast else None
+
+
+def _cash_flow_status(sme):
+    forecast = getattr(sme, 'cash_flow_forecast', None)
+    return forecast.cash_flow_status if forecast else "unknown"
+
+
+def filter_marketplace(queryset, params):
+    """
+    Applies the marketplace list's query params (industry, minPulseScore,
+    minProfitScore, sortBy) to verified profiles. The sme_profile_* indexes
+    on BusinessProfile are shaped for these queries; `manage.py
+    benchmark_marketplace` times them.
+    """
+    ordering = MARKETPLACE_ORDERINGS.get(params.get('sortBy'), MARKETPLACE_ORDERINGS['pulseScore'])
+    queryset = queryset.filter(pulse_score__gte=75).order_by(*ordering)
+
+    industry = params.get('industry')
+    if industry:
+        queryset = queryset.filter(business_category=industry)
+
+    min_pulse_score = params.get('minPulseScore')
+    if min_pulse_score:
+        queryset = queryset.filter(pulse_score__gte=int(min_pulse_score))
+
+    min_profit_score = params.get('minProfitScore')
+    if min_profit_score:
+        queryset = queryset.filter(profit_score__gte=int(min_profit_score))
+    return queryset
+
+
 class MarketplaceViewSet(viewsets.GenericViewSet):
     """GET /lender/marketplace - Get list of verified SMEs for lenders"""
     permission_classes = [IsAuthenticated]
@@ -41,7 +102,7 @@ class MarketplaceViewSet(viewsets.GenericViewSet):
     def get_queryset(self):
         # --- MODIFIED THIS ---
         # Return a base queryset, even if empty, to help spectacular
-        return BusinessProfile.objects.filter(verification_status='verified')
+        return BusinessProfile.objects.filter(verification_status='verified').select_related('cash_flow_forecast')
     
     def list(self, request):
         try:
@@ -53,32 +114,18 @@ class MarketplaceViewSet(viewsets.GenericViewSet):
             }, status=status.HTTP_404_NOT_FOUND)
         
         # Get verified SMEs
-        queryset = self.get_queryset().filter(pulse_score__gte=75).order_by('-pulse_score')
-        
-        # Apply filters from query params
-        industry = request.query_params.get('industry')
-        if industry:
-            queryset = queryset.filter(business_category=industry)
-        
-        min_pulse_score = request.query_params.get('minPulseScore')
-        if min_pulse_score:
-            queryset = queryset.filter(pulse_score__gte=int(min_pulse_score))
-        
-        min_profit_score = request.query_params.get('minProfitScore')
-        if min_profit_score:
-            queryset = queryset.filter(profit_score__gte=int(min_profit_score))
-        
-        # Track views
-        for sme in queryset:
-            SMEInterest.objects.get_or_create(
-                lender=lender_profile,
-                sme_business=sme,
-                defaults={'status': 'viewed'}
-            )
+        queryset = filter_marketplace(self.get_queryset(), request.query_params)
+        page = list(queryset[:10])  # Limit to 10 for demo
+
+        # Track views of the SMEs on this page in one insert; existing rows (and their status) are kept
+        SMEInterest.objects.bulk_create(
+            [SMEInterest(lender=lender_profile, sme_business=sme, status='viewed') for sme in page],
+            ignore_conflicts=True
+        )
         
         # Format response
         smes_data = []
-        for sme in queryset[:10]:  # Limit to 10 for demo
+        for sme in page:
             smes_data.append({
                 "id": str(sme.id),
                 "businessName": sme.business_name,
@@ -91,7 +138,9 @@ class MarketplaceViewSet(viewsets.GenericViewSet):
                 "yearEstablished": 2020,
                 "employeeCount": sme.number_of_employees or 10,
                 "monthlyRevenue": sme.monthly_revenue or 2500000,
-                "growthRate": 15,
+                "growthRate": _growth_rate(sme),
+                "cashFlowStatus": _cash_flow_status(sme),
+                "cashFlowForecast": _forecast_data(sme),
                 "riskLevel": "low" if sme.pulse_score > 80 else "medium",
                 "lastActive": datetime.now().isoformat()
             })
@@ -128,7 +177,7 @@ class MarketplaceViewSet(viewsets.GenericViewSet):
             }, status=status.HTTP_404_NOT_FOUND)
         
         try:
-            sme_business = BusinessProfile.objects.get(
+            sme_business = self.get_queryset().get(
                 id=pk, 
                 verification_status='verified', 
                 pulse_score__gte=75
@@ -171,10 +220,11 @@ class MarketplaceViewSet(viewsets.GenericViewSet):
                 "financialHighlights": { # Sample
                     "monthlyRevenue": sme_business.monthly_revenue or 2500000,
                     "profitMargin": 28,
-                    "growthRate": 15,
-                    "cashFlowStatus": "positive",
+                    "growthRate": _growth_rate(sme_business),
+                    "cashFlowStatus": _cash_flow_status(sme_business),
                     "debtToIncomeRatio": 0.3
                 },
+                "cashFlowForecast": _forecast_data(sme_business),
                 "fundingRequest": { # Sample
                     "amount": 5000000,
                     "purpose": "Expand inventory and open new location",
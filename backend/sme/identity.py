@@ -0,0 +1,107 @@
+"""
+Normalized business identifiers for fraud checks.
+
+Each BusinessProfile has a BusinessIdentity row holding its normalized
+name, RC number and bank account number, all indexed. Finding other
+profiles that reuse any of them is then a few index lookups instead of
+a scan of the profiles table.
+"""
+import re
+
+from django.db.models import Q
+
+# Trailing words that don't distinguish one business from another
+NAME_SUFFIXES = {
+    'LTD', 'LIMITED', 'NIG', 'NIGERIA', 'ENTERPRISE', 'ENTERPRISES', 'ENT',
+    'PLC', 'CO', 'COMPANY', 'INC', 'BN',
+}
+
+_NON_ALNUM = re.compile(r'[^A-Z0-9]+')
+
+
+def _name_tokens(name) -> list[str]:
+    text = (name or '').upper().replace('&', ' AND ')
+    tokens = _NON_ALNUM.sub(' ', text).split()
+    stripped = list(tokens)
+    while stripped and stripped[-1] in NAME_SUFFIXES:
+        stripped.pop()
+    # A name made only of suffixes ("Enterprises Ltd") is kept as-is
+    return stripped or tokens
+
+
+def normalize_business_name(name) -> str:
+    """'Acme Ventures (Nig.) Ltd.' -> 'ACME VENTURES'"""
+    return ' '.join(_name_tokens(name))
+
+
+def name_signature(name) -> str:
+    """Order-insensitive form of the normalized name: 'VENTURES ACME' and 'ACME VENTURES' agree."""
+    return ' '.join(sorted(_name_tokens(name)))
+
+
+def normalize_rc_number(rc_number) -> str:
+    """'rc-123 456' -> '123456'. Business Name (BN) numbers keep their prefix."""
+    value = _NON_ALNUM.sub('', (rc_number or '').upper())
+    if value.startswith('RC'):
+        value = value[2:]
+    return value
+
+
+def normalize_account_number(account_number) -> str:
+    return re.sub(r'\D', '', account_number or '')
+
+
+def names_match(stated, observed) -> bool:
+    """
+    True if the stated business name appears in the observed one (CAC or
+    bank account name) once both are normalized, in any word order.
+    """
+    stated_name = normalize_business_name(stated)
+    observed_name = normalize_business_name(observed)
+    if not stated_name or not observed_name:
+        return False
+    if f' {stated_name} ' in f' {observed_name} ':
+        return True
+    return name_signature(stated) == name_signature(observed)
+
+
+def identity_values(profile) -> dict:
+    return {
+        'normalized_name': normalize_business_name(profile.business_name),
+        'name_signature': name_signature(profile.business_name),
+        'rc_number': normalize_rc_number(profile.business_registration_number),
+        'bank_account_number': normalize_account_number(profile.bank_account_number),
+    }
+
+
+def sync_identity(profile):
+    """Creates or refreshes the profile's BusinessIdentity row."""
+    from .models import BusinessIdentity
+    identity, _ = BusinessIdentity.objects.update_or_create(profile=profile, defaults=identity_values(profile))
+    return identity
+
+
+def find_collisions(profile) -> dict:
+    """
+    Other profiles sharing this profile's name, RC number or bank account,
+    as {'name': [profile ids], 'rc_number': [...], 'bank_account_number': [...]}.
+    Only identifiers with at least one collision are included.
+    """
+    from .models import BusinessIdentity
+    values = identity_values(profile)
+    others = BusinessIdentity.objects.exclude(profile_id=profile.pk)
+
+    lookups = {}
+    if values['normalized_name']:
+        lookups['name'] = Q(normalized_name=values['normalized_name']) | Q(name_signature=values['name_signature'])
+    if values['rc_number']:
+        lookups['rc_number'] = Q(rc_number=values['rc_number'])
+    if values['bank_account_number']:
+        lookups['bank_account_number'] = Q(bank_account_number=values['bank_account_number'])
+
+    collisions = {}
+    for field, condition in lookups.items():
+        profile_ids = list(others.filter(condition).values_list('profile_id', flat=True))
+        if profile_ids:
+            collisions[field] = profile_ids
+    return collisions
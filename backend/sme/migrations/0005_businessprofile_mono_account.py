@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sme', '0004_businessprofile_bank_account_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='businessprofile',
+            name='mono_account_id',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='businessprofile',
+            name='mono_account_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sme', '0005_businessprofile_mono_account'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='businessprofile',
+            name='verification_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('verified', 'Verified'), ('rejected', 'Rejected'), ('deferred', 'Deferred')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from sme.identity import identity_values
+
+
+def backfill_identities(apps, schema_editor):
+    BusinessProfile = apps.get_model('sme', 'BusinessProfile')
+    BusinessIdentity = apps.get_model('sme', 'BusinessIdentity')
+    batch = []
+    for profile in BusinessProfile.objects.iterator(chunk_size=1000):
+        batch.append(BusinessIdentity(profile_id=profile.pk, **identity_values(profile)))
+        if len(batch) >= 1000:
+            BusinessIdentity.objects.bulk_create(batch)
+            batch = []
+    BusinessIdentity.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sme', '0006_businessprofile_deferred_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusinessIdentity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('normalized_name', models.CharField(db_index=True, max_length=255)),
+                ('name_signature', models.CharField(db_index=True, max_length=255)),
+                ('rc_number', models.CharField(blank=True, db_index=True, max_length=100)),
+                ('bank_account_number', models.CharField(blank=True, db_index=True, max_length=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='identity', to='sme.businessprofile')),
+            ],
+        ),
+        migrations.RunPython(backfill_identities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:39
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sme', '0007_businessidentity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreCheck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20)),
+                ('points', models.IntegerField(default=0)),
+                ('fail_reason', models.TextField(blank=True)),
+                ('fingerprint', models.CharField(blank=True, max_length=64)),
+                ('reused', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='businessprofile',
+            name='latest_score',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='sme.score'),
+        ),
+        migrations.AddField(
+            model_name='score',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='score',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name='score',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='score',
+            constraint=models.UniqueConstraint(fields=('user', 'version'), name='sme_score_user_version'),
+        ),
+        migrations.AddField(
+            model_name='scorecheck',
+            name='score',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checks', to='sme.score'),
+        ),
+        migrations.AddConstraint(
+            model_name='scorecheck',
+            constraint=models.UniqueConstraint(fields=('score', 'name'), name='sme_scorecheck_score_name'),
+        ),
+    ]
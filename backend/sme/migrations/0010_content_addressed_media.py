@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:47
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sme', '0009_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='businessvideo',
+            name='video_file',
+            field=models.FileField(storage=core.storage.get_media_storage, upload_to='videos/'),
+        ),
+        migrations.AlterField(
+            model_name='cacdocument',
+            name='cac_file',
+            field=models.FileField(storage=core.storage.get_media_storage, upload_to='cac_files/'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sme', '0010_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='businessprofile',
+            name='profit_analysis',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='businessprofile',
+            name='profit_scored_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sme', '0011_profit_scoring'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CashFlowForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(default='theil_sen', max_length=20)),
+                ('months_observed', models.PositiveSmallIntegerField()),
+                ('monthly_net', models.JSONField(default=list)),
+                ('monthly_forecast', models.JSONField(default=list)),
+                ('net_3m', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('lower_3m', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('upper_3m', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('net_6m', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('lower_6m', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('upper_6m', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('growth_rate', models.FloatField()),
+                ('cash_flow_status', models.CharField(choices=[('positive', 'Positive'), ('negative', 'Negative'), ('mixed', 'Mixed')], max_length=10)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cash_flow_forecast', to='sme.businessprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-net_6m'], name='sme_forecast_net_6m'), models.Index(fields=['-growth_rate'], name='sme_forecast_growth')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sme', '0012_cashflowforecast'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='businessprofile',
+            index=models.Index(fields=['verification_status', '-pulse_score'], name='sme_profile_status_pulse'),
+        ),
+        migrations.AddIndex(
+            model_name='businessprofile',
+            index=models.Index(condition=models.Q(('verification_status', 'verified')), fields=['business_category', '-pulse_score'], name='sme_profile_verified_category'),
+        ),
+    ]
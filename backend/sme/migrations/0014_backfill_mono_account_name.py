@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+def backfill_mono_account_name(apps, schema_editor):
+    """
+    Profiles connected before mono_account_name existed only have the name
+    in their verification jobs' payloads (or, failing that, the
+    disbursement account name). Without it a rescore fails them for an
+    unreadable bank account name.
+    """
+    BusinessProfile = apps.get_model('sme', 'BusinessProfile')
+    Job = apps.get_model('core', 'Job')
+    updated = []
+    for profile in BusinessProfile.objects.filter(mono_connected=True, mono_account_name='').iterator():
+        payloads = (
+            Job.objects
+            .filter(user_id=profile.user_id, kind='pulse_verification')
+            .order_by('-created_at')
+            .values_list('payload', flat=True)
+        )
+        names = (payload.get('account_name') for payload in payloads if isinstance(payload, dict))
+        name = next((name for name in names if name), '') or profile.bank_account_name
+        if name:
+            profile.mono_account_name = name
+            updated.append(profile)
+    BusinessProfile.objects.bulk_update(updated, ['mono_account_name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('sme', '0013_businessprofile_marketplace_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_mono_account_name, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sme', '0014_backfill_mono_account_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='score',
+            name='review_flags',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
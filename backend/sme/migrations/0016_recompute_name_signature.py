@@ -0,0 +1,30 @@
+from django.db import migrations
+
+from sme.identity import name_signature
+
+
+def recompute_name_signatures(apps, schema_editor):
+    """
+    Signatures used to drop word boundaries and repeated words, so
+    'Gear Top' and 'Geart Op' shared one. Rebuilds them from the profile
+    names in the current form.
+    """
+    BusinessIdentity = apps.get_model('sme', 'BusinessIdentity')
+    updated = []
+    for identity in BusinessIdentity.objects.select_related('profile').iterator(chunk_size=500):
+        signature = name_signature(identity.profile.business_name)
+        if identity.name_signature != signature:
+            identity.name_signature = signature
+            updated.append(identity)
+    BusinessIdentity.objects.bulk_update(updated, ['name_signature'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sme', '0015_score_review_flags'),
+    ]
+
+    operations = [
+        migrations.RunPython(recompute_name_signatures, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,10 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+
+from core.storage import get_media_storage
 
 class BusinessProfile(models.Model):
     """
@@ -21,6 +26,7 @@ class BusinessProfile(models.Model):
         ('pending', 'Pending'),
         ('verified', 'Verified'),
         ('rejected', 'Rejected'),
+        ('deferred', 'Deferred'),  # AI checks postponed while Gemini was unavailable
     ]
 
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='profile')
@@ -38,8 +44,21 @@ class BusinessProfile(models.Model):
     business_description = models.TextField(blank=True)
     pulse_score = models.IntegerField(default=0)
     profit_score = models.IntegerField(default=0)
+    # Set by the profit scoring job (core.tasks); re-scored once older than PROFIT_SCORE_TTL_HOURS
+    profit_analysis = models.TextField(blank=True)
+    profit_scored_at = models.DateTimeField(null=True, blank=True)
     verification_status = models.CharField(max_length=20, choices=VERIFICATION_STATUS, default='pending')
     mono_connected = models.BooleanField(default=False)
+    # Kept so the account can be re-scored without the SME reconnecting
+    mono_account_id = models.CharField(max_length=100, blank=True)
+    mono_account_name = models.CharField(max_length=255, blank=True)
+    latest_score = models.ForeignKey(
+        'Score',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
     location = models.CharField(max_length=255, blank=True)
     description = models.TextField(blank=True)
     founded_date = models.DateField(null=True, blank=True)
@@ -51,15 +70,40 @@ class BusinessProfile(models.Model):
     bank_account_name = models.CharField(max_length=255, blank=True)
     bank_name = models.CharField(max_length=100, blank=True)
 
+    class Meta:
+        indexes = [
+            # Marketplace list (lender.views.filter_marketplace) and lender dashboard counts
+            models.Index(fields=['verification_status', '-pulse_score'], name='sme_profile_status_pulse'),
+            models.Index(
+                fields=['business_category', '-pulse_score'], name='sme_profile_verified_category',
+                condition=models.Q(verification_status='verified')
+            ),
+        ]
+
     def __str__(self):
         return self.business_name
 
+class BusinessIdentity(models.Model):
+    """
+    Normalized identifiers of a BusinessProfile (see sme.identity), kept in
+    sync on save so reuse across profiles is an index lookup.
+    """
+    profile = models.OneToOneField(BusinessProfile, on_delete=models.CASCADE, related_name='identity')
+    normalized_name = models.CharField(max_length=255, db_index=True)
+    name_signature = models.CharField(max_length=255, db_index=True)
+    rc_number = models.CharField(max_length=100, blank=True, db_index=True)
+    bank_account_number = models.CharField(max_length=20, blank=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Identity for {self.normalized_name}"
+
 class CACDocument(models.Model):
     """
     Stores the "Document Truth"
     """
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='cac_document')
-    cac_file = models.FileField(upload_to='cac_files/')
+    cac_file = models.FileField(upload_to='cac_files/', storage=get_media_storage)  # Deduplicated by content
     uploaded_at = models.DateTimeField(auto_now_add=True)
     verified = models.BooleanField(default=False)
     extracted_name = models.CharField(max_length=255, blank=True, null=True) # To be filled by AI
@@ -72,7 +116,7 @@ class BusinessVideo(models.Model):
     Stores the "Visual Truth"
     """
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='business_video')
-    video_file = models.FileField(upload_to='videos/')
+    video_file = models.FileField(upload_to='videos/', storage=get_media_storage)  # Deduplicated by content
     uploaded_at = models.DateTimeField(auto_now_add=True)
     verified = models.BooleanField(default=False)
     video_summary = models.TextField(blank=True, null=True) # To be filled by AI
@@ -80,21 +124,119 @@ class BusinessVideo(models.Model):
     def __str__(self):
         return f"Video for {self.user.email}"
 
+class UploadSession(models.Model):
+    """
+    A resumable chunked upload of a business video or CAC document (see
+    sme.uploads). Chunks are appended to a temp file until the session is
+    finalized and the file attached to the user's BusinessVideo/CACDocument.
+    """
+    class Kind(models.TextChoices):
+        VIDEO = 'video', 'Business Video'
+        CAC = 'cac', 'CAC Document'
+
+    class Status(models.TextChoices):
+        OPEN = 'open', 'Open'
+        COMPLETE = 'complete', 'Complete'
+        FAILED = 'failed', 'Failed'
+
+    upload_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    file_name = models.CharField(max_length=255)
+    total_size = models.BigIntegerField()
+    checksum = models.CharField(max_length=64, blank=True)  # Expected SHA-256 (hex), if given up front
+    mime_type = models.CharField(max_length=100, blank=True)  # Sniffed from the first chunk
+    received_bytes = models.BigIntegerField(default=0)
+    chunk_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.OPEN)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.kind} upload {self.upload_id} ({self.received_bytes}/{self.total_size} bytes)"
+
 class Score(models.Model):
     """
-    Stores the Pulse and Profit Scores
+    Stores the Pulse and Profit Scores.
+    One row per verification run (versioned per user); the profile's
+    `latest_score` points at the current one.
     """
     class Status(models.TextChoices):
         PENDING = 'pending', 'Pending'
         VERIFIED = 'verified', 'Verified'
         FAILED = 'failed', 'Failed'
 
-    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='score')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='scores')
+    version = models.PositiveIntegerField(default=1)
     pulse_score = models.IntegerField(default=0)
     profit_score = models.IntegerField(default=0)
     status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
     pulse_fail_reason = models.TextField(blank=True, null=True) # To explain failure
+    review_flags = models.JSONField(default=list, blank=True)  # E.g. identity collisions; for review, not failure
+    created_at = models.DateTimeField(default=timezone.now)
     last_updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'version'], name='sme_score_user_version'),
+        ]
+
+    def __str__(self):
+        return f"Scores v{self.version} for {self.user.email}: Pulse({self.pulse_score}), Profit({self.profit_score})"
+
+class ScoreCheck(models.Model):
+    """
+    One check's contribution to a Score (cac, bank, video, identity), with a
+    fingerprint of the inputs it was computed from. A later run whose
+    inputs fingerprint the same reuses the result instead of re-running it.
+    """
+    score = models.ForeignKey(Score, on_delete=models.CASCADE, related_name='checks')
+    name = models.CharField(max_length=20)
+    points = models.IntegerField(default=0)
+    fail_reason = models.TextField(blank=True)
+    fingerprint = models.CharField(max_length=64, blank=True)  # Empty: never reused (e.g. missing input)
+    reused = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['score', 'name'], name='sme_scorecheck_score_name'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.points:+d}) for score #{self.score_id}"
+
+class CashFlowForecast(models.Model):
+    """
+    Forecast net cash flow for the next 3 and 6 months (Naira), with ~90%
+    bands, precomputed nightly by `manage.py forecast_cash_flows` (see
+    core.forecasting) so the marketplace reads it with the profile.
+    """
+    class Status(models.TextChoices):
+        POSITIVE = 'positive', 'Positive'
+        NEGATIVE = 'negative', 'Negative'
+        MIXED = 'mixed', 'Mixed'
+
+    profile = models.OneToOneField(BusinessProfile, on_delete=models.CASCADE, related_name='cash_flow_forecast')
+    method = models.CharField(max_length=20, default='theil_sen')
+    months_observed = models.PositiveSmallIntegerField()
+    monthly_net = models.JSONField(default=list)       # Observed complete months, oldest first
+    monthly_forecast = models.JSONField(default=list)  # The next 6 months
+    net_3m = models.DecimalField(max_digits=15, decimal_places=2)
+    lower_3m = models.DecimalField(max_digits=15, decimal_places=2)
+    upper_3m = models.DecimalField(max_digits=15, decimal_places=2)
+    net_6m = models.DecimalField(max_digits=15, decimal_places=2)
+    lower_6m = models.DecimalField(max_digits=15, decimal_places=2)
+    upper_6m = models.DecimalField(max_digits=15, decimal_places=2)
+    growth_rate = models.FloatField()  # Monthly inflow trend as a share of mean monthly inflow
+    cash_flow_status = models.CharField(max_length=10, choices=Status.choices)
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Marketplace ranking
+            models.Index(fields=['-net_6m'], name='sme_forecast_net_6m'),
+            models.Index(fields=['-growth_rate'], name='sme_forecast_growth'),
+        ]
+
     def __str__(self):
-        return f"Scores for {self.user.email}: Pulse({self.pulse_score}), Profit({self.profit_score})"
\ No newline at end of file
+        return f"Forecast for {self.profile.business_name}: {self.net_6m} over 6 months ({self.cash_flow_status})"
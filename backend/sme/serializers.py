@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import BusinessProfile, CACDocument, BusinessVideo, Score
+from .models import BusinessProfile, CACDocument, BusinessVideo, Score, UploadSession
 from users.models import User
 
 class BusinessProfileSerializer(serializers.ModelSerializer):
@@ -21,6 +21,15 @@ class VideoUploadSerializer(serializers.ModelSerializer):
         model = BusinessVideo
         fields = ['video_file']
 
+class UploadSessionSerializer(serializers.Serializer):
+    kind = serializers.ChoiceField(choices=UploadSession.Kind.choices)
+    fileName = serializers.CharField(max_length=255)
+    fileSize = serializers.IntegerField(min_value=1)
+    checksum = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False)  # SHA-256 (hex)
+
+class UploadCompleteSerializer(serializers.Serializer):
+    checksum = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False)
+
 class MonoConnectSerializer(serializers.Serializer):
     mono_token = serializers.CharField()
 
@@ -0,0 +1,81 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.storage import ContentAddressedStorage
+
+from .identity import sync_identity
+from .models import BusinessProfile, BusinessVideo, CACDocument
+
+IDENTITY_FIELDS = {'business_name', 'business_registration_number', 'bank_account_number'}
+
+
+@receiver(post_save, sender=BusinessProfile)
+def sync_business_identity(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """
+    Keeps the profile's BusinessIdentity row in step with its name, RC number
+    and bank account. Saves that only touch other fields (scores, status) skip it.
+    """
+    if raw:
+        return
+    if update_fields is not None and not IDENTITY_FIELDS.intersection(update_fields):
+        return
+    sync_identity(instance)
+
+
+# Document file fields backed by core.storage.ContentAddressedStorage
+MEDIA_FIELDS = {CACDocument: 'cac_file', BusinessVideo: 'video_file'}
+
+
+def _release_on_commit(field_file, name):
+    storage = field_file.storage
+    if isinstance(storage, ContentAddressedStorage):
+        transaction.on_commit(lambda: storage.release(name))
+
+
+@receiver(pre_save, sender=CACDocument)
+@receiver(pre_save, sender=BusinessVideo)
+def remember_stored_media(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Notes the file the row points at before this save, for count_media_references."""
+    field_name = MEDIA_FIELDS[sender]
+    instance._stored_media_name = None
+    if raw or instance.pk is None or (update_fields is not None and field_name not in update_fields):
+        return
+    instance._stored_media_name = sender.objects.filter(pk=instance.pk).values_list(field_name, flat=True).first()
+
+
+@receiver(post_save, sender=CACDocument)
+@receiver(post_save, sender=BusinessVideo)
+def count_media_references(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Moves the blob references once the row is written. The reference taken
+    when the file was stored becomes the row's; if the row already pointed
+    at that blob (the same content uploaded again) it is handed back, so
+    the blob's count is unchanged. The file the row pointed at before is
+    released when the transaction commits.
+    """
+    field_name = MEDIA_FIELDS[sender]
+    if raw or (update_fields is not None and field_name not in update_fields):
+        return
+    field_file = getattr(instance, field_name)
+    storage = field_file.storage
+    if not isinstance(storage, ContentAddressedStorage):
+        return
+    old_name, new_name = getattr(instance, '_stored_media_name', None), field_file.name
+    claimed = bool(new_name) and storage.claim(new_name)
+    if old_name == new_name:
+        if claimed:
+            storage.release(new_name)  # The row keeps the reference it already had
+        return
+    if new_name and not claimed:
+        storage.acquire(new_name)
+    if old_name:
+        _release_on_commit(field_file, old_name)
+
+
+@receiver(post_delete, sender=CACDocument)
+@receiver(post_delete, sender=BusinessVideo)
+def release_deleted_media(sender, instance, **kwargs):
+    field_file = getattr(instance, MEDIA_FIELDS[sender])
+    if field_file.name:
+        _release_on_commit(field_file, field_file.name)
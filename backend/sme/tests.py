@@ -1,10 +1,21 @@
-from django.test import TestCase
+import hashlib
+import os
+import tempfile
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from .models import BusinessProfile, CACDocument, BusinessVideo, Score
+from .models import BusinessProfile, CACDocument, BusinessVideo, Score, UploadSession
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.models import Job, StoredBlob, VerificationEvent
+from .identity import (
+    normalize_business_name, name_signature, normalize_rc_number, normalize_account_number,
+    names_match, find_collisions
+)
+from .uploads import temp_path
 import json
 
 User = get_user_model()
@@ -79,6 +90,30 @@ class SMEAPITests(APITestCase):
         response = self.client.post(url, {}, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_mono_connect_queues_verification(self):
+        """Test Mono connect enqueues a verification job and returns 202"""
+        BusinessProfile.objects.create(user=self.user, business_name='Test Business Ltd')
+        url = reverse('sme-mono-connect')
+        response = self.client.post(url, {'monoCode': 'code_123', 'accountName': 'Test Business Ltd'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.data['data']['verificationJobId']
+        job = Job.objects.get(id=job_id)
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertEqual(job.payload['account_name'], 'Test Business Ltd')
+
+        # Profit scoring is queued too, instead of a placeholder score
+        profit_job = Job.objects.get(id=response.data['data']['profitScoringJobId'])
+        self.assertEqual(profit_job.kind, Job.Kind.PROFIT_SCORING)
+        self.assertEqual(BusinessProfile.objects.get(user=self.user).profit_score, 0)
+        response = self.client.post(url, {'monoCode': 'code_123', 'accountName': 'Test Business Ltd'}, format='json')
+        self.assertEqual(response.data['data']['profitScoringJobId'], str(profit_job.id))
+
+        # Poll the status endpoint
+        status_url = reverse('sme-verification-status', kwargs={'job_id': job.id})
+        response = self.client.get(status_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['status'], 'queued')
+
     def test_dashboard_access(self):
         """Test dashboard access"""
         url = reverse('sme-dashboard')
@@ -86,3 +121,197 @@ class SMEAPITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         # Should create a score object if it doesn't exist
         self.assertEqual(Score.objects.count(), 1)
+
+
+class BusinessIdentityTests(TestCase):
+    def make_profile(self, email, **fields):
+        user = User.objects.create_user(email=email, password='testpass123', user_type='sme')
+        return BusinessProfile.objects.create(user=user, **fields)
+
+    def test_normalization(self):
+        """Test names, RC numbers and account numbers normalize to comparable keys"""
+        self.assertEqual(normalize_business_name('Acme Ventures (Nig.) Ltd.'), 'ACME VENTURES')
+        self.assertEqual(normalize_business_name('ACME VENTURES LIMITED'), 'ACME VENTURES')
+        self.assertEqual(normalize_business_name('Enterprises Ltd'), 'ENTERPRISES LTD')
+        self.assertEqual(name_signature('Ventures Acme Enterprises'), name_signature('Acme Ventures'))
+        self.assertEqual(normalize_rc_number('rc-123 456'), '123456')
+        self.assertEqual(normalize_rc_number('BN 998877'), 'BN998877')
+        self.assertEqual(normalize_account_number('0123-456 789'), '0123456789')
+        self.assertTrue(names_match('Acme Ventures Ltd', 'ACME VENTURES NIGERIA LIMITED'))
+        self.assertFalse(names_match('Acme', 'Acmeville Foods Ltd'))
+
+    def test_near_miss_names_do_not_match(self):
+        """Test names with the same letters but different words or repeats stay distinct"""
+        self.assertNotEqual(name_signature('Gear Top'), name_signature('Geart Op'))
+        self.assertNotEqual(name_signature('Acme Acme Foods'), name_signature('Acme Foods'))
+        self.assertFalse(names_match('AB CD', 'ABC D'))
+        self.assertFalse(names_match('Gear Top Ltd', 'GEART OP LIMITED'))
+        self.assertFalse(names_match('Acme Acme Foods', 'Foods Acme'))
+
+        original = self.make_profile('gear@example.com', business_name='Gear Top Ltd')
+        self.make_profile('geart@example.com', business_name='Geart Op Ltd')
+        self.assertEqual(find_collisions(original), {})
+
+    def test_identity_kept_in_sync_on_save(self):
+        """Test the identity row follows profile edits"""
+        profile = self.make_profile('sync@example.com', business_name='Acme Ltd', business_registration_number='RC 1')
+        self.assertEqual(profile.identity.normalized_name, 'ACME')
+        self.assertEqual(profile.identity.rc_number, '1')
+
+        profile.business_name = 'Zenith Foods Limited'
+        profile.save()
+        profile.identity.refresh_from_db()
+        self.assertEqual(profile.identity.normalized_name, 'ZENITH FOODS')
+
+        # Score-only saves don't touch the identity table
+        with self.assertNumQueries(1):
+            profile.pulse_score = 80
+            profile.save(update_fields=['pulse_score'])
+
+    def test_find_collisions(self):
+        """Test shared names, RC numbers and accounts are found with one query each"""
+        original = self.make_profile(
+            'first@example.com', business_name='Acme Ventures Ltd',
+            business_registration_number='RC123456', bank_account_number='0123456789'
+        )
+        self.make_profile('second@example.com', business_name='ACME VENTURES NIG LIMITED')
+        self.make_profile('third@example.com', business_name='Other Biz', bank_account_number='0123456789')
+        self.make_profile('fourth@example.com', business_name='Unrelated', business_registration_number='rc 123456')
+        self.make_profile('fifth@example.com', business_name='Clean Co')
+
+        with self.assertNumQueries(3):
+            collisions = find_collisions(original)
+        self.assertEqual(len(collisions['name']), 1)
+        self.assertEqual(len(collisions['rc_number']), 1)
+        self.assertEqual(len(collisions['bank_account_number']), 1)
+        self.assertEqual(find_collisions(BusinessProfile.objects.get(business_name='Clean Co')), {})
+
+
+class VerificationEventStreamTests(TestCase):
+    def setUp(self):
+        """Set up a finished verification job with a couple of events"""
+        self.user = User.objects.create_user(email='stream@example.com', password='testpass123', user_type='sme')
+        self.job = Job.objects.create(kind=Job.Kind.PULSE_VERIFICATION, user=self.user, status=Job.Status.SUCCEEDED)
+        VerificationEvent.objects.create(job=self.job, seq=1, stage='verification', status='started')
+        VerificationEvent.objects.create(job=self.job, seq=2, stage='verification', status='finished',
+                                         data={'pulseScore': 80})
+        self.url = reverse('sme-verification-events', args=[self.job.id])
+
+    async def read_stream(self, response):
+        return b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+    async def test_stream_requires_token(self):
+        """Test the stream rejects anonymous clients"""
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+    async def test_stream_with_query_token_and_last_event_id(self):
+        """Test EventSource-style auth and resuming after Last-Event-ID"""
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.user).access_token))()
+        response = await self.async_client.get(f"{self.url}?token={token}", headers={'Last-Event-ID': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = await self.read_stream(response)
+        self.assertNotIn('id: 1\n', body)
+        self.assertIn('id: 2\nevent: verification\n', body)
+        self.assertIn('event: end\n', body)
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(),
+    UPLOAD_TEMP_DIR=tempfile.mkdtemp(),
+    UPLOAD_CHUNK_SIZE=32,
+    UPLOAD_MAX_SIZES={'video': 1024, 'cac': 64}
+)
+class ChunkedUploadTests(APITestCase):
+    VIDEO = b'\x00\x00\x00\x18ftypmp42' + bytes(range(88))  # 100 bytes, MP4 header
+
+    def setUp(self):
+        """Set up an authenticated SME"""
+        self.user = User.objects.create_user(email='uploader@example.com', password='testpass123', user_type='sme')
+        self.client.force_authenticate(user=self.user)
+
+    def start(self, content, kind='video', name='shop.mp4'):
+        response = self.client.post(reverse('sme-upload-sessions'), {
+            'kind': kind,
+            'fileName': name,
+            'fileSize': len(content),
+            'checksum': hashlib.sha256(content).hexdigest()
+        }, format='json')
+        return response, response.data.get('data') or {}
+
+    def put_chunk(self, upload_id, index, offset, chunk):
+        return self.client.put(
+            reverse('sme-upload-chunk', args=[upload_id, index]), chunk,
+            content_type='application/octet-stream', headers={'Upload-Offset': str(offset)}
+        )
+
+    def test_chunked_upload_with_retry_and_resume(self):
+        """Test chunks are appended in order, a re-sent chunk is accepted and the video attached"""
+        response, session = self.start(self.VIDEO)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        upload_id = session['uploadId']
+
+        self.assertEqual(self.put_chunk(upload_id, 0, 0, self.VIDEO[:32]).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.put_chunk(upload_id, 1, 32, self.VIDEO[32:64]).status_code, status.HTTP_200_OK)
+        # Response to chunk 1 was lost: the client sends it again
+        self.assertEqual(self.put_chunk(upload_id, 1, 32, self.VIDEO[32:64]).data['data']['receivedBytes'], 64)
+        # A gap is refused, with the offset to resume from
+        response = self.put_chunk(upload_id, 3, 96, self.VIDEO[96:])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['data'], {'receivedBytes': 64})
+
+        resumed = self.client.get(reverse('sme-upload-session', args=[upload_id])).data['data']
+        offset = resumed['receivedBytes']
+        for index, start in enumerate(range(offset, len(self.VIDEO), 32), start=resumed['chunkCount']):
+            self.assertEqual(self.put_chunk(upload_id, index, start, self.VIDEO[start:start + 32]).status_code, 200)
+
+        response = self.client.post(reverse('sme-upload-complete', args=[upload_id]), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['data']['mimeType'], 'video/mp4')
+        video = BusinessVideo.objects.get(user=self.user)
+        with video.video_file.open('rb') as f:
+            self.assertEqual(f.read(), self.VIDEO)
+        session = UploadSession.objects.get(upload_id=upload_id)
+        self.assertEqual(session.status, UploadSession.Status.COMPLETE)
+        self.assertFalse(os.path.exists(temp_path(session)))
+
+    def upload(self, content):
+        _, session = self.start(content)
+        for index, start in enumerate(range(0, len(content), 32)):
+            self.put_chunk(session['uploadId'], index, start, content[start:start + 32])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('sme-upload-complete', args=[session['uploadId']]), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return BusinessVideo.objects.get(user=self.user).video_file.name
+
+    def test_repeated_uploads_keep_one_reference(self):
+        """Test finalizing the same bytes again doesn't add references, and a replacement releases them"""
+        name = self.upload(self.VIDEO)
+        self.assertEqual(self.upload(self.VIDEO), name)
+        self.assertEqual(self.upload(self.VIDEO), name)
+        self.assertEqual(StoredBlob.objects.get(name=name).ref_count, 1)
+
+        replacement = self.VIDEO[:-1] + b'!'
+        new_name = self.upload(replacement)
+        self.assertFalse(StoredBlob.objects.filter(name=name).exists())
+        self.assertEqual(StoredBlob.objects.get(name=new_name).ref_count, 1)
+        self.assertEqual(BusinessVideo.objects.count(), 1)
+
+    def test_early_rejection(self):
+        """Test oversized files and unrecognised formats are refused before the rest is sent"""
+        response, _ = self.start(b'%PDF-' + b'x' * 100, kind='cac', name='cac.pdf')
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        _, session = self.start(b'MZ not a video at all', name='setup.mp4')
+        response = self.put_chunk(session['uploadId'], 0, 0, b'MZ not a video at all')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        self.assertEqual(UploadSession.objects.get(upload_id=session['uploadId']).status, UploadSession.Status.FAILED)
+
+    def test_checksum_mismatch(self):
+        """Test a file that doesn't match its checksum is not attached"""
+        _, session = self.start(self.VIDEO[:32])
+        self.put_chunk(session['uploadId'], 0, 0, self.VIDEO[:31] + b'!')
+        response = self.client.post(reverse('sme-upload-complete', args=[session['uploadId']]), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertFalse(BusinessVideo.objects.filter(user=self.user).exists())
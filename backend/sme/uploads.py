@@ -0,0 +1,233 @@
+"""
+Resumable chunked uploads for business videos and CAC documents.
+
+A client opens an UploadSession (file name, size and, optionally, its
+SHA-256), PUTs the file as numbered chunks at increasing offsets, then
+finalizes it. Each chunk is streamed from the request into a temp file
+in UPLOAD_TEMP_DIR, so nothing is held in memory whole and a dropped
+connection only costs the chunk in flight: the client reads the
+session's `receivedBytes` and carries on from there.
+
+The declared size is checked when the session opens, and the format is
+sniffed from the first bytes of chunk 0, so a bad upload is turned away
+before the rest of it is sent.
+"""
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from .models import UploadSession, BusinessVideo, CACDocument
+
+COPY_BUFFER_SIZE = 64 * 1024
+SNIFF_BYTES = 16
+
+# Accepted formats per upload kind: (mime type, ((offset, leading bytes), ...)), most specific first
+SIGNATURES = {
+    UploadSession.Kind.VIDEO: [
+        ('video/quicktime', ((4, b'ftypqt  '),)),
+        ('video/mp4', ((4, b'ftyp'),)),  # Also 3GP, which phones record
+        ('video/webm', ((0, b'\x1a\x45\xdf\xa3'),)),  # WebM/Matroska
+        ('video/x-msvideo', ((0, b'RIFF'), (8, b'AVI '))),
+    ],
+    UploadSession.Kind.CAC: [
+        ('application/pdf', ((0, b'%PDF-'),)),
+        ('image/png', ((0, b'\x89PNG\r\n\x1a\n'),)),
+        ('image/jpeg', ((0, b'\xff\xd8\xff'),)),
+        ('image/webp', ((0, b'RIFF'), (8, b'WEBP'))),
+    ],
+}
+
+
+class UploadError(Exception):
+    """A rejected upload request; `data` is returned to the client (e.g. the offset to resume from)."""
+    def __init__(self, message, status_code=400, **data):
+        super().__init__(message)
+        self.status_code = status_code
+        self.data = data
+
+
+def sniff_mime_type(kind, head: bytes) -> str | None:
+    for mime_type, parts in SIGNATURES[kind]:
+        if all(head[offset:offset + len(magic)] == magic for offset, magic in parts):
+            return mime_type
+    return None
+
+
+def temp_path(session) -> str:
+    return os.path.join(settings.UPLOAD_TEMP_DIR, f"{session.upload_id}.part")
+
+
+def expires_at(session):
+    return session.updated_at + timedelta(seconds=getattr(settings, 'UPLOAD_SESSION_TTL', 24 * 60 * 60))
+
+
+def create_session(user, kind, file_name, total_size, checksum='') -> UploadSession:
+    max_size = settings.UPLOAD_MAX_SIZES[kind]
+    if total_size <= 0:
+        raise UploadError("File is empty")
+    if total_size > max_size:
+        raise UploadError(f"File is larger than the {max_size // (1024 * 1024)}MB limit", 413, maxSize=max_size)
+
+    # One open upload per user and kind: starting again abandons the previous one
+    for stale in UploadSession.objects.filter(user=user, kind=kind, status=UploadSession.Status.OPEN):
+        discard(stale)
+
+    os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+    session = UploadSession.objects.create(
+        user=user,
+        kind=kind,
+        file_name=os.path.basename(file_name),
+        total_size=total_size,
+        checksum=checksum.lower()
+    )
+    open(temp_path(session), 'wb').close()
+    return session
+
+
+def discard(session):
+    """Marks the session failed and removes its temp file."""
+    try:
+        os.remove(temp_path(session))
+    except FileNotFoundError:
+        pass
+    session.status = UploadSession.Status.FAILED
+    session.save(update_fields=['status', 'updated_at'])
+
+
+def _check_open(session):
+    if session.status != UploadSession.Status.OPEN:
+        raise UploadError(f"Upload session is {session.status}", 409)
+    if expires_at(session) < timezone.now():
+        discard(session)
+        raise UploadError("Upload session has expired; start a new upload", 410)
+
+
+def _read(stream, size) -> bytes:
+    """Reads up to `size` bytes, short only if the client stopped sending."""
+    data = b''
+    while len(data) < size:
+        piece = stream.read(size - len(data))
+        if not piece:
+            break
+        data += piece
+    return data
+
+
+def write_chunk(session, index, offset, stream, length) -> int:
+    """
+    Streams one chunk of `length` bytes from `stream` into the session's
+    temp file at `offset`, and returns the number of bytes received so far.
+    """
+    _check_open(session)
+    if length is None:
+        raise UploadError("Content-Length is required", 411)
+    if length <= 0 or length > settings.UPLOAD_CHUNK_SIZE:
+        raise UploadError(f"Chunks must be 1 to {settings.UPLOAD_CHUNK_SIZE} bytes", 413,
+                          chunkSize=settings.UPLOAD_CHUNK_SIZE)
+    if offset + length > session.total_size:
+        raise UploadError("Chunk runs past the declared file size", 413, fileSize=session.total_size)
+
+    mime_type = session.mime_type
+    with open(temp_path(session), 'r+b') as f:
+        # Exclusive while writing, so two requests for one session can't interleave
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            received = os.fstat(f.fileno()).st_size
+            if offset > received:
+                raise UploadError("Chunk offset is past the bytes received so far", 409, receivedBytes=received)
+            # Re-sent chunks (their response was lost) overwrite what they sent before
+            f.seek(offset)
+            f.truncate()
+
+            remaining = length
+            if offset == 0:
+                head = _read(stream, min(SNIFF_BYTES, length))
+                mime_type = sniff_mime_type(session.kind, head)
+                if mime_type is None:
+                    discard(session)
+                    raise UploadError(f"Unsupported file type for {session.get_kind_display()}", 415)
+                f.write(head)
+                remaining -= len(head)
+            while remaining:
+                data = stream.read(min(COPY_BUFFER_SIZE, remaining))
+                if not data:
+                    break  # Client went away; what arrived is kept and can be resumed from
+                f.write(data)
+                remaining -= len(data)
+            f.flush()
+            received = f.tell()
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    UploadSession.objects.filter(pk=session.pk).update(
+        received_bytes=received,
+        chunk_count=max(session.chunk_count, index + 1),
+        mime_type=mime_type,
+        updated_at=timezone.now()
+    )
+    session.refresh_from_db()
+    if remaining:
+        raise UploadError("Chunk ended before Content-Length bytes were received", 400, receivedBytes=received)
+    return received
+
+
+class _SessionFile(File):
+    """Lets FileSystemStorage move the finished temp file into place instead of copying it."""
+    def __init__(self, file, name, path):
+        super().__init__(file, name)
+        self._path = path
+
+    def temporary_file_path(self):
+        return self._path
+
+
+def finalize(session, checksum=''):
+    """
+    Verifies the complete file against its SHA-256 and attaches it to the
+    user's BusinessVideo or CACDocument, which is returned.
+    """
+    _check_open(session)
+    expected = (checksum or session.checksum).lower()
+    if not expected:
+        raise UploadError("A SHA-256 checksum of the file is required")
+
+    path = temp_path(session)
+    received = os.path.getsize(path)
+    if received != session.total_size:
+        raise UploadError("Upload is incomplete", 409, receivedBytes=received)
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+            digest.update(chunk)
+    if digest.hexdigest() != expected:
+        discard(session)
+        raise UploadError("Checksum mismatch; the file was corrupted in transit, please upload it again", 422)
+
+    if session.kind == UploadSession.Kind.VIDEO:
+        doc = BusinessVideo.objects.filter(user=session.user).first() or BusinessVideo(user=session.user)
+        field = doc.video_file
+    else:
+        doc = CACDocument.objects.filter(user=session.user).first() or CACDocument(user=session.user)
+        field = doc.cac_file
+    with open(path, 'rb') as f:
+        field.save(session.file_name, _SessionFile(f, session.file_name, path), save=True)
+    try:
+        os.remove(path)  # Still there if the storage copied it rather than moving it
+    except FileNotFoundError:
+        pass
+
+    session.status = UploadSession.Status.COMPLETE
+    session.save(update_fields=['status', 'updated_at'])
+    return doc
@@ -3,7 +3,13 @@ from .views import (
     BusinessProfileView, 
     CACUploadView, 
     VideoUploadView, 
+    UploadSessionView,
+    UploadSessionDetailView,
+    UploadChunkView,
+    UploadCompleteView,
     MonoConnectView,
+    VerificationStatusView,
+    verification_events,
     SMEDashboardView,
     VerifyCACView,
     BusinessTypeView,
@@ -15,9 +21,15 @@ urlpatterns = [
     path('profile', BusinessProfileView.as_view(), name='sme-profile'),
     path('upload/cac', CACUploadView.as_view(), name='sme-upload-cac'),
     path('upload/video', VideoUploadView.as_view(), name='sme-upload-video'),
+    path('upload/sessions', UploadSessionView.as_view(), name='sme-upload-sessions'),
+    path('upload/sessions/<uuid:upload_id>', UploadSessionDetailView.as_view(), name='sme-upload-session'),
+    path('upload/sessions/<uuid:upload_id>/chunks/<int:index>', UploadChunkView.as_view(), name='sme-upload-chunk'),
+    path('upload/sessions/<uuid:upload_id>/complete', UploadCompleteView.as_view(), name='sme-upload-complete'),
     path('verify-cac', VerifyCACView.as_view(), name='sme-verify-cac'),
     path('business-type', BusinessTypeView.as_view(), name='sme-business-type'),
     path('mono/connect', MonoConnectView.as_view(), name='sme-mono-connect'),
+    path('verification/<int:job_id>', VerificationStatusView.as_view(), name='sme-verification-status'),
+    path('verification/<int:job_id>/events', verification_events, name='sme-verification-events'),
     path('dashboard', SMEDashboardView.as_view(), name='sme-dashboard'),
     path('offers', SMEOffersView.as_view(), name='sme-offers'),
     path('offers/<str:offerId>/respond', SMEOfferResponseView.as_view(), name='sme-offer-respond'),
@@ -8,11 +8,13 @@ import requests
 from django.conf import settings
 from datetime import datetime
 # --- UPDATED IMPORTS ---
-from .models import BusinessProfile, CACDocument, BusinessVideo
+from .models import BusinessProfile, CACDocument, BusinessVideo, UploadSession
 from .serializers import (
     BusinessProfileSerializer,
     CACUploadSerializer,
     VideoUploadSerializer,
+    UploadSessionSerializer,
+    UploadCompleteSerializer,
     MonoConnectSerializer,
     SMEDashboardSerializer,
     VerifyCACSerializer,      # Added
@@ -20,6 +22,15 @@ from .serializers import (
     SMEOfferResponseSerializer # Added
 )
 from rest_framework import serializers # Added
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from core.events import stream_job_events
+from core.jobs import enqueue
+from core.models import Job
+from core.tasks import enqueue_profit_scoring
+from . import uploads
 
 class BusinessProfileView(APIView):
     """POST /sme/profile - Submit business information"""
@@ -269,6 +280,132 @@ class VideoUploadView(APIView):
                 "message": f"Video upload failed: {str(e)}"
             }, status=status.HTTP_400_BAD_REQUEST)
 
+def _upload_session_data(session):
+    return {
+        "uploadId": str(session.upload_id),
+        "kind": session.kind,
+        "fileName": session.file_name,
+        "fileSize": session.total_size,
+        "receivedBytes": session.received_bytes,
+        "chunkCount": session.chunk_count,
+        "chunkSize": settings.UPLOAD_CHUNK_SIZE,
+        "mimeType": session.mime_type or None,
+        "status": session.status,
+        "expiresAt": uploads.expires_at(session).isoformat()
+    }
+
+def _upload_error(error):
+    return Response({
+        "success": False,
+        "message": str(error),
+        "data": error.data or None
+    }, status=error.status_code)
+
+class UploadSessionView(APIView):
+    """POST /sme/upload/sessions - Start a resumable chunked upload (video or CAC)"""
+    permission_classes = [IsAuthenticated]
+    serializer_class = UploadSessionSerializer
+
+    def post(self, request):
+        serializer = UploadSessionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                "success": False,
+                "message": "Invalid upload details",
+                "errors": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        try:
+            session = uploads.create_session(
+                request.user, data['kind'], data['fileName'], data['fileSize'], data.get('checksum', '')
+            )
+        except uploads.UploadError as e:
+            return _upload_error(e)
+
+        return Response({
+            "success": True,
+            "message": "Upload session created",
+            "data": _upload_session_data(session)
+        }, status=status.HTTP_201_CREATED)
+
+class UploadSessionDetailView(APIView):
+    """GET /sme/upload/sessions/:uploadId - Bytes received so far, to resume from"""
+    permission_classes = [IsAuthenticated]
+    serializer_class = serializers.Serializer # Dummy
+
+    def get(self, request, upload_id):
+        session = get_object_or_404(UploadSession, upload_id=upload_id, user=request.user)
+        return Response({
+            "success": True,
+            "data": _upload_session_data(session)
+        })
+
+class UploadChunkView(APIView):
+    """
+    PUT /sme/upload/sessions/:uploadId/chunks/:index - Append a chunk.
+    The raw request body is the chunk; the `Upload-Offset` header gives its byte offset.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = serializers.Serializer # Dummy
+
+    def put(self, request, upload_id, index):
+        session = get_object_or_404(UploadSession, upload_id=upload_id, user=request.user)
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.headers['Content-Length']) if request.headers.get('Content-Length') else None
+        except ValueError:
+            return Response({
+                "success": False,
+                "message": "Upload-Offset header is required"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Read the body straight from the request stream; it never goes through a parser
+        try:
+            uploads.write_chunk(session, index, offset, request.stream, length)
+        except uploads.UploadError as e:
+            return _upload_error(e)
+
+        return Response({
+            "success": True,
+            "message": "Chunk received",
+            "data": _upload_session_data(session)
+        })
+
+class UploadCompleteView(APIView):
+    """POST /sme/upload/sessions/:uploadId/complete - Verify the checksum and attach the file"""
+    permission_classes = [IsAuthenticated]
+    serializer_class = UploadCompleteSerializer
+
+    def post(self, request, upload_id):
+        session = get_object_or_404(UploadSession, upload_id=upload_id, user=request.user)
+        serializer = UploadCompleteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                "success": False,
+                "message": "Invalid checksum",
+                "errors": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            doc = uploads.finalize(session, serializer.validated_data.get('checksum', ''))
+        except uploads.UploadError as e:
+            return _upload_error(e)
+
+        return Response({
+            "success": True,
+            "message": f"{session.get_kind_display()} uploaded successfully",
+            "data": {
+                "fileId": str(doc.id),
+                "fileName": session.file_name,
+                "fileSize": session.total_size,
+                "mimeType": session.mime_type,
+                "uploadedAt": datetime.now().isoformat(),
+                "status": "uploaded",
+                "nextStep": "bank_connection" if session.kind == UploadSession.Kind.VIDEO else "business_type_check"
+            }
+        }, status=status.HTTP_201_CREATED)
+
 class MonoConnectView(APIView):
     """POST /sme/mono/connect - Connect bank account via Mono"""
     permission_classes = [IsAuthenticated]
@@ -293,20 +430,19 @@ class MonoConnectView(APIView):
             # Update user profile with bank connection
             profile = BusinessProfile.objects.get(user=request.user)
             profile.mono_connected = True
-            
-            # Trigger AI verification (This part is real)
-            from core.services import PulseEngine
-            engine = PulseEngine(request.user, account_name)
-            pulse_score, fail_reason = engine.run_verification()
-            
-            profile.pulse_score = pulse_score
-            profile.profit_score = 74  # Sample profit score
-            if fail_reason:
-                profile.verification_status = 'failed'
-            else:
-                profile.verification_status = 'verified'
+            profile.mono_account_id = request.data.get('accountId', '')
+            profile.mono_account_name = account_name
             profile.save()
             
+            # Queue the AI verification; it runs on a background worker
+            job = enqueue(
+                Job.Kind.PULSE_VERIFICATION,
+                payload={'account_name': account_name},
+                user=request.user
+            )
+            # Profit scoring (transaction sync, cash-flow features, Gemini) runs in the background too
+            profit_job = enqueue_profit_scoring(request.user, force=True)
+            
             return Response({
                 "success": True,
                 "message": "Bank account connected successfully",
@@ -317,9 +453,12 @@ class MonoConnectView(APIView):
                     "accountName": account_name,
                     "connectedAt": datetime.now().isoformat(),
                     "status": "connected",
+                    "verificationJobId": str(job.id),
+                    "profitScoringJobId": str(profit_job.id),
+                    "eventsUrl": f"/api/sme/verification/{job.id}/events",
                     "nextStep": "processing"
                 }
-            }, status=status.HTTP_201_CREATED)
+            }, status=status.HTTP_202_ACCEPTED)
                 
         except Exception as e:
             return Response({
@@ -327,6 +466,76 @@ class MonoConnectView(APIView):
                 "message": f"Mono connection failed: {str(e)}"
             }, status=status.HTTP_400_BAD_REQUEST)
 
+class VerificationStatusView(APIView):
+    """GET /sme/verification/:jobId - Poll the status of a queued verification"""
+    permission_classes = [IsAuthenticated]
+    serializer_class = serializers.Serializer # Dummy
+
+    def get(self, request, job_id):
+        try:
+            job = Job.objects.get(id=job_id, user=request.user)
+        except Job.DoesNotExist:
+            return Response({
+                "success": False,
+                "message": "Verification job not found"
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            "success": True,
+            "data": {
+                "jobId": str(job.id),
+                "status": job.status,
+                "attempts": job.attempts,
+                "result": job.result,
+                "error": job.error or None,
+                "createdAt": job.created_at.isoformat(),
+                "finishedAt": job.finished_at.isoformat() if job.finished_at else None
+            }
+        })
+
+def _authenticate_stream(request):
+    """
+    JWT auth for the event stream. Browsers' EventSource can't send headers,
+    so the access token may also come as ?token=.
+    """
+    authenticator = JWTAuthentication()
+    try:
+        token = request.GET.get('token')
+        if token:
+            return authenticator.get_user(authenticator.get_validated_token(token))
+        result = authenticator.authenticate(request)
+        return result[0] if result else None
+    except (InvalidToken, TokenError):
+        return None
+
+async def verification_events(request, job_id):
+    """GET /sme/verification/:jobId/events - Server-Sent Events stream of verification progress"""
+    user = await sync_to_async(_authenticate_stream)(request)
+    if user is None:
+        return JsonResponse({
+            "success": False,
+            "message": "Authentication credentials were not provided or are invalid."
+        }, status=status.HTTP_401_UNAUTHORIZED)
+
+    job = await Job.objects.filter(id=job_id, user=user).afirst()
+    if job is None:
+        return JsonResponse({
+            "success": False,
+            "message": "Verification job not found"
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    # Reconnecting clients resume after the last event they saw
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('lastEventId') or '0'
+    try:
+        last_seq = int(last_event_id)
+    except ValueError:
+        last_seq = 0
+
+    response = StreamingHttpResponse(stream_job_events(job.id, last_seq), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let nginx buffer the stream
+    return response
+
 class SMEDashboardView(APIView):
     """GET /sme/dashboard - Get SME dashboard data"""
     permission_classes = [IsAuthenticated]
@@ -371,6 +580,8 @@ class SMEDashboardView(APIView):
                         },
                         "profitScore": {
                             "total": profile.profit_score,
+                            "analysis": profile.profit_analysis or None,
+                            "scoredAt": profile.profit_scored_at.isoformat() if profile.profit_scored_at else None,
                             "components": {
                                 "profitability": 18,
                                 "cashFlow": 20,